@@ -0,0 +1,254 @@
+"""
+Decoder for FIT (Flexible and Interoperable Data Transfer) activity files.
+
+Only what a track needs is decoded: the 'record' messages (global message
+number 20) with their timestamp, position, altitude, speed and GPS
+accuracy fields. Everything else is skipped by its defined size.
+
+The file is memory-mapped and walked through a memoryview. Every
+definition message is compiled once into a struct.Struct covering the
+whole data message, with pad bytes ('x') for the fields that are not
+wanted, so decoding a record is a single unpack_from() at an offset into
+the mapping. No payload bytes are sliced or copied.
+
+Protocol summary (FIT SDK, "FIT File Types / Protocol"):
+- File header: size (12 or 14), protocol and profile version, data size,
+  ".FIT" signature, optional header CRC
+- Record header byte: bit 7 set = compressed timestamp header (local
+  message type in bits 5-6, 5-bit time offset); otherwise bit 6 =
+  definition message, bit 5 = developer data, bits 0-3 = local type
+- Definition: reserved, architecture (0 little / 1 big endian), global
+  message number, field count, then (number, size, base type) triples
+- Two byte file CRC after the data; several FIT files may be chained
+"""
+
+import mmap
+import struct
+from datetime import timezone
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+from gpx_track import Track
+
+FIT_SIGNATURE = b'.FIT'
+FIT_CRC_SIZE = 2
+
+# Seconds between the Unix epoch and the FIT epoch (1989-12-31T00:00:00Z)
+FIT_EPOCH_OFFSET = 631065600
+
+MESG_RECORD = 20
+
+# Record message field numbers
+FIELD_POSITION_LAT = 0
+FIELD_POSITION_LONG = 1
+FIELD_ALTITUDE = 2
+FIELD_SPEED = 6
+FIELD_GPS_ACCURACY = 31
+FIELD_ENHANCED_SPEED = 73
+FIELD_ENHANCED_ALTITUDE = 78
+FIELD_TIMESTAMP = 253
+
+SEMICIRCLES_TO_DEGREES = 180.0 / 2 ** 31
+
+# Base type number (low 5 bits of the base type byte) -> struct code
+_BASE_TYPES = {
+    0: 'B',   # enum
+    1: 'b',   # sint8
+    2: 'B',   # uint8
+    3: 'h',   # sint16
+    4: 'H',   # uint16
+    5: 'i',   # sint32
+    6: 'I',   # uint32
+    8: 'f',   # float32
+    9: 'd',   # float64
+    10: 'B',  # uint8z
+    11: 'H',  # uint16z
+    12: 'I',  # uint32z
+    14: 'q',  # sint64
+    15: 'Q',  # uint64
+    16: 'Q',  # uint64z
+}
+
+# "Invalid" sentinel of each struct code (all bits set, or max positive for signed)
+_INVALID = {
+    'B': 0xFF,
+    'b': 0x7F,
+    'H': 0xFFFF,
+    'h': 0x7FFF,
+    'I': 0xFFFFFFFF,
+    'i': 0x7FFFFFFF,
+    'Q': 0xFFFFFFFFFFFFFFFF,
+    'q': 0x7FFFFFFFFFFFFFFF,
+}
+
+# Record message fields decoded into a point
+_WANTED_FIELDS = (
+    FIELD_TIMESTAMP,
+    FIELD_POSITION_LAT,
+    FIELD_POSITION_LONG,
+    FIELD_ALTITUDE,
+    FIELD_ENHANCED_ALTITUDE,
+    FIELD_SPEED,
+    FIELD_ENHANCED_SPEED,
+    FIELD_GPS_ACCURACY,
+)
+
+
+class FitDecodeError(ValueError):
+    """Raised for input that is not a readable FIT file."""
+
+
+class _Definition(NamedTuple):
+    global_number: int
+    size: int  # bytes of the data message payload
+    layout: Optional[struct.Struct]  # None when no wanted field is present
+    fields: Tuple[int, ...]  # field numbers returned by layout, in order
+    invalid: Tuple[Optional[int], ...]  # invalid sentinel per returned field
+
+
+def _compile_definition(global_number: int, little_endian: bool, field_defs) -> _Definition:
+    """
+    Build the data-message layout for one definition message: every wanted
+    field of a record, or just the timestamp of any other message (needed to
+    resolve compressed timestamps).
+    """
+    size = sum(field_size for _, field_size, _ in field_defs)
+    wanted = _WANTED_FIELDS if global_number == MESG_RECORD else (FIELD_TIMESTAMP,)
+
+    codes = ['<' if little_endian else '>']
+    fields, invalid = [], []
+    for number, field_size, base_type in field_defs:
+        code = _BASE_TYPES.get(base_type & 0x1F)
+        if number in wanted and code is not None and struct.calcsize(code) == field_size:
+            codes.append(code)
+            fields.append(number)
+            invalid.append(_INVALID.get(code))
+        else:
+            codes.append(f'{field_size}x')
+    if not fields:
+        return _Definition(global_number, size, None, (), ())
+    return _Definition(global_number, size, struct.Struct(''.join(codes)), tuple(fields), tuple(invalid))
+
+
+def iter_fit_points(filepath: str) -> Iterator[tuple]:
+    """
+    Stream (lat, lon, elevation, epoch_us, accuracy, speed) rows from a FIT file.
+
+    Records without a timestamp or a position fix are skipped. Speeds are
+    m/s and accuracy metres, as the fields are defined by the FIT profile.
+    """
+    with open(filepath, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise FitDecodeError(f"{filepath}: empty file")
+    view = memoryview(mapped)
+    try:
+        yield from _iter_fit_chain(view, filepath)
+    finally:
+        view.release()
+        mapped.close()
+
+
+def _iter_fit_chain(view: memoryview, filepath: str) -> Iterator[tuple]:
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < 12:
+            if offset:
+                return  # trailing padding after a chained file
+            raise FitDecodeError(f"{filepath}: file too small")
+        header_size = view[offset]
+        if header_size < 12 or view[offset + 8:offset + 12] != FIT_SIGNATURE:
+            raise FitDecodeError(f"{filepath}: not a FIT file")
+        data_size, = struct.unpack_from('<I', view, offset + 4)
+        start = offset + header_size
+        end = start + data_size
+        if end > len(view):
+            raise FitDecodeError(f"{filepath}: truncated FIT data")
+        yield from _iter_records(view, start, end, filepath)
+        offset = end + FIT_CRC_SIZE
+
+
+def _iter_records(view: memoryview, offset: int, end: int, filepath: str) -> Iterator[tuple]:
+    definitions: Dict[int, _Definition] = {}
+    last_timestamp = None
+
+    while offset < end:
+        header = view[offset]
+        offset += 1
+
+        if header & 0x80:
+            # Compressed timestamp header: 5-bit offset against the last full timestamp
+            local = (header >> 5) & 0x03
+            time_offset = header & 0x1F
+            if last_timestamp is not None:
+                last_timestamp += (time_offset - (last_timestamp & 0x1F)) & 0x1F
+            compressed_time = last_timestamp
+        elif header & 0x40:
+            # Definition message
+            local = header & 0x0F
+            little_endian = view[offset + 1] == 0
+            global_number, = struct.unpack_from('<H' if little_endian else '>H', view, offset + 2)
+            field_count = view[offset + 4]
+            offset += 5
+            field_defs = [(view[offset + 3 * i], view[offset + 3 * i + 1], view[offset + 3 * i + 2])
+                          for i in range(field_count)]
+            offset += 3 * field_count
+            definition = _compile_definition(global_number, little_endian, field_defs)
+            if header & 0x20:
+                developer_count = view[offset]
+                developer_size = sum(view[offset + 1 + 3 * i + 1] for i in range(developer_count))
+                offset += 1 + 3 * developer_count
+                definition = definition._replace(size=definition.size + developer_size)
+            definitions[local] = definition
+            continue
+        else:
+            local = header & 0x0F
+            compressed_time = None
+
+        definition = definitions.get(local)
+        if definition is None:
+            raise FitDecodeError(f"{filepath}: data message at byte {offset - 1} has no definition")
+        if offset + definition.size > end:
+            raise FitDecodeError(f"{filepath}: truncated message at byte {offset - 1}")
+
+        timestamp = compressed_time
+        if definition.layout is not None:
+            values = dict(zip(definition.fields, (
+                None if value == sentinel else value
+                for value, sentinel in zip(definition.layout.unpack_from(view, offset), definition.invalid)
+            )))
+            if values.get(FIELD_TIMESTAMP) is not None:
+                timestamp = last_timestamp = values[FIELD_TIMESTAMP]
+            if definition.global_number == MESG_RECORD:
+                row = _record_row(values, timestamp)
+                if row is not None:
+                    yield row
+        offset += definition.size
+
+
+def _record_row(values: dict, timestamp: Optional[int]) -> Optional[tuple]:
+    lat = values.get(FIELD_POSITION_LAT)
+    lon = values.get(FIELD_POSITION_LONG)
+    if timestamp is None or lat is None or lon is None:
+        return None
+
+    altitude = values.get(FIELD_ENHANCED_ALTITUDE)
+    if altitude is None:
+        altitude = values.get(FIELD_ALTITUDE)
+    speed = values.get(FIELD_ENHANCED_SPEED)
+    if speed is None:
+        speed = values.get(FIELD_SPEED)
+
+    return (
+        lat * SEMICIRCLES_TO_DEGREES,
+        lon * SEMICIRCLES_TO_DEGREES,
+        altitude / 5.0 - 500.0 if altitude is not None else 0.0,
+        (timestamp + FIT_EPOCH_OFFSET) * 1_000_000,
+        float(values[FIELD_GPS_ACCURACY]) if values.get(FIELD_GPS_ACCURACY) is not None else None,
+        speed / 1000.0 if speed is not None else None,
+    )
+
+
+def parse_fit_file(filepath: str) -> Track:
+    """Decode a FIT file into a time-ordered Track (timestamps are UTC)."""
+    return Track.from_rows(iter_fit_points(filepath), tz=timezone.utc).sorted()
@@ -2,10 +2,12 @@
 """
 GPX Interval Analyzer
 
-Analyzes GPX files to identify intervals between waypoints and detect anomalies:
+Analyzes GPX (and FIT) files to identify intervals between waypoints and detect anomalies:
 - Missing intervals (large gaps between waypoints)
 - Inconsistent interval patterns
 
+Requires NumPy (pip install -r requirements.txt).
+
 Usage:
     python gpx_analyzer.py <path_to_gpx_file> [options]
     python gpx_analyzer.py <directory> [--recursive] [options]
@@ -13,32 +15,88 @@ Usage:
 Examples:
     python gpx_analyzer.py track.gpx
     python gpx_analyzer.py ../examples/ --recursive --threshold 120
+    python gpx_analyzer.py big_export.gpx --stream
+    python gpx_analyzer.py season_archive/ --recursive --jobs 8
+    python gpx_analyzer.py season_2023.zip Day_5.gpx.gz --jobs 0
+    python gpx_analyzer.py temp_recording.gpx --follow
+    python gpx_analyzer.py ../examples/ --profile --pstats analyzer.pstats
+    python gpx_analyzer.py season_archive/ -r --format jsonl --records anomalies > anomalies.jsonl
+    python gpx_analyzer.py detect-runs ../examples/
+    python gpx_analyzer.py session-stats season_archive/ --recursive --jobs 0
+    python gpx_analyzer.py index season_archive/ --recursive --jobs 0
+    python gpx_analyzer.py query sessions --seasons 3 --min-anomaly-pct 5
+    python gpx_analyzer.py spatial season_archive/ -r --radius 46.4297,9.8112,150
+    python gpx_analyzer.py simplify track.gpx --levels 1,0.1,0.01 --format binary -o lod/
+    python gpx_analyzer.py merge temp_recording.gpx Day_5.gpx -o Day_5_merged.gpx
+    python gpx_analyzer.py resample season_archive/ -r --interval 5 -o grids/ --jobs 0
+    python gpx_analyzer.py highscores season_archive/ -r --top 10 --jobs 0
+    python gpx_analyzer.py inspect broken_export.gpx
+    python gpx_analyzer.py serve --socket /tmp/gpx_analyzer.sock --memory 512
 """
 
 import argparse
+import cProfile
+import json
 import sys
 import os
+from collections.abc import Sequence
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
-from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from xml.etree import ElementTree as ET
-import statistics as stats_module
-import math
+import re
+import socket
+import sqlite3
+import time
+import tracemalloc
+import zipfile
+import zlib
 
+import numpy as np
 
-@dataclass
-class Waypoint:
-    """Represents a single GPS waypoint from a GPX file."""
-    lat: float
-    lon: float
-    elevation: float
-    timestamp: datetime
-    accuracy: Optional[float] = None
-    speed: Optional[float] = None
-    
-    def __repr__(self) -> str:
-        return f"Waypoint(lat={self.lat:.6f}, lon={self.lon:.6f}, time={self.timestamp.isoformat()})"
+from fit_decoder import iter_fit_points, parse_fit_file
+from gpx_archive import (
+    ARCHIVE_SUFFIX, PACKED_TRACK_SUFFIXES, archive_members, is_packed, logical_name, open_source,
+    source_exists, split_member, track_suffix,
+)
+from gpx_cache import DEFAULT_CACHE_SIZE_MB, TrackCache
+from gpx_highscores import (
+    CATEGORIES as HIGHSCORE_CATEGORIES, DEFAULT_TOP_K, Highscores, Record as HighscoreRecord, session_records
+)
+from gpx_index import GROUPINGS, IndexedSession, SessionIndex, default_index_path, file_identity, season_of
+from gpx_inspect import GpxStructure, inspect_gpx
+from gpx_merge import TrackMerger
+from gpx_output import (
+    ANOMALY_FIELDS, FILE_FIELDS, OUTPUT_FORMATS, RECORD_KINDS, anomaly_kind, anomaly_rows, file_row,
+    format_for_path, open_record_writer
+)
+from gpx_profile import FileProfile, ProfileReport
+from gpx_resample import (
+    DEFAULT_INTERVAL_S, DEFAULT_MAX_GAP_S, OUTPUT_FORMATS as RESAMPLE_FORMATS, resample, write_csv, write_npz,
+    write_resampled_gpx
+)
+from gpx_scanner import scan_gpx_file
+from gpx_server import DEFAULT_HOST, DEFAULT_MEMORY_MB, DEFAULT_PORT, AnalysisServer, init_worker
+from gpx_simplify import (
+    DEFAULT_LEVELS, METHODS, PYRAMID_SUFFIX, LodLevel, build_pyramid, write_pyramid
+)
+from gpx_spatial import parse_area, passes, query_points, read_header_bounds
+from gpx_stats import RETENTION_POLICIES, AnomalyRetention, P2Quantile, RunningStats
+from gpx_track import Track, Waypoint, datetime_to_epoch_us, epoch_us_to_datetime, haversine_distance
+from gpx_writer import write_gpx, write_gpx_stream
+from run_detector import SkiRun, detect_runs
+from session_analyzer import SPEED_BUCKET_LABELS, SessionStats, calculate_session_stats
+from stats_calculator import average_descent_slope
+
+# Interval anomaly codes stored in IntervalTable.anomaly_kind
+ANOMALY_NONE = 0
+ANOMALY_LARGE_GAP = 1
+ANOMALY_SHORT_INTERVAL = 2
+ANOMALY_INCONSISTENT = 3
 
 
 @dataclass
@@ -53,118 +111,337 @@ class IntervalAnalysis:
     anomaly_type: Optional[str] = None
 
 
+class IntervalTable:
+    """
+    Columnar interval analysis of a Track.
+    
+    Interval i spans track points i and i + 1. anomaly_kind holds one of the
+    ANOMALY_* codes; z_score is only meaningful for inconsistent intervals.
+    """
+    
+    def __init__(
+        self,
+        track: Track,
+        interval_seconds: np.ndarray,
+        distance_meters: np.ndarray,
+        speed_ms: np.ndarray,
+        anomaly_kind: np.ndarray,
+        z_score: np.ndarray,
+        anomaly_threshold_seconds: float,
+        min_interval_seconds: float
+    ):
+        self.track = track
+        self.interval_seconds = interval_seconds
+        self.distance_meters = distance_meters
+        self.speed_ms = speed_ms
+        self.anomaly_kind = anomaly_kind
+        self.z_score = z_score
+        self.anomaly_threshold_seconds = anomaly_threshold_seconds
+        self.min_interval_seconds = min_interval_seconds
+    
+    def __len__(self) -> int:
+        return len(self.interval_seconds)
+    
+    def anomaly_indices(self) -> np.ndarray:
+        """Anomalous intervals in report order: gap/short ones first, then inconsistent ones."""
+        kind = self.anomaly_kind
+        threshold_hits = np.flatnonzero((kind == ANOMALY_LARGE_GAP) | (kind == ANOMALY_SHORT_INTERVAL))
+        return np.concatenate([threshold_hits, np.flatnonzero(kind == ANOMALY_INCONSISTENT)])
+    
+    def anomaly_type(self, index: int) -> Optional[str]:
+        kind = self.anomaly_kind[index]
+        interval_seconds = float(self.interval_seconds[index])
+        if kind == ANOMALY_LARGE_GAP:
+            return f"Large gap ({interval_seconds:.1f}s > {self.anomaly_threshold_seconds}s threshold)"
+        if kind == ANOMALY_SHORT_INTERVAL:
+            return f"Very short interval ({interval_seconds:.2f}s < {self.min_interval_seconds}s minimum)"
+        if kind == ANOMALY_INCONSISTENT:
+            return f"Inconsistent interval (z-score: {float(self.z_score[index]):.2f})"
+        return None
+    
+    def interval(self, index: int) -> IntervalAnalysis:
+        """Materialise interval ``index`` as an IntervalAnalysis view."""
+        return IntervalAnalysis(
+            from_waypoint=self.track.waypoint(index),
+            to_waypoint=self.track.waypoint(index + 1),
+            interval_seconds=float(self.interval_seconds[index]),
+            distance_meters=float(self.distance_meters[index]),
+            speed_ms=float(self.speed_ms[index]),
+            is_anomaly=bool(self.anomaly_kind[index] != ANOMALY_NONE),
+            anomaly_type=self.anomaly_type(index)
+        )
+
+
+class IntervalSequence(Sequence):
+    """Read-only sequence of IntervalAnalysis views over (a selection of) an IntervalTable."""
+    
+    def __init__(self, table: IntervalTable, indices: Optional[np.ndarray] = None):
+        self.table = table
+        self.indices = indices
+    
+    def __len__(self) -> int:
+        return len(self.table) if self.indices is None else len(self.indices)
+    
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            selected = np.arange(len(self.table)) if self.indices is None else self.indices
+            return IntervalSequence(self.table, selected[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('interval index out of range')
+        return self.table.interval(index if self.indices is None else int(self.indices[index]))
+
+
 @dataclass
 class GpxAnalysisResult:
     """Complete analysis result for a GPX file."""
     filename: str
     total_waypoints: int
     total_duration_seconds: float
-    intervals: List[IntervalAnalysis] = field(default_factory=list)
-    anomalies: List[IntervalAnalysis] = field(default_factory=list)
+    intervals: Sequence = field(default_factory=list)
+    anomalies: Sequence = field(default_factory=list)
     statistics: dict = field(default_factory=dict)
+    profile: Optional[FileProfile] = None  # stage costs, with --profile
+    
+    def compact(self, keep_intervals: bool = False) -> 'GpxAnalysisResult':
+        """
+        Return a copy that is cheap to pickle: anomalies are materialised
+        into a short list and the per-interval arrays (and the Track behind
+        them) are dropped unless keep_intervals is set.
+        """
+        return GpxAnalysisResult(
+            filename=self.filename,
+            total_waypoints=self.total_waypoints,
+            total_duration_seconds=self.total_duration_seconds,
+            intervals=self.intervals if keep_intervals else [],
+            anomalies=list(self.anomalies),
+            statistics=self.statistics,
+            profile=self.profile
+        )
 
 
-def parse_gpx_file(filepath: str) -> List[Waypoint]:
-    """
-    Parse a GPX file and extract all waypoints.
+GPX_NAMESPACES = (
+    'http://www.topografix.com/GPX/1/1',   # Without trailing slash
+    'http://www.topografix.com/GPX/1/1/',  # With trailing slash
+)
+
+# Stand-in for FileProfile.stage() when not profiling (nullcontext is reusable)
+_NO_STAGE = nullcontext()
+
+# File suffixes picked up when scanning directories (FIT files go through fit_decoder);
+# compressed GPX files and zip archives are picked up as well (see gpx_archive)
+TRACK_SUFFIXES = ('.gpx', '.fit')
+
+
+# (lat, lon, elevation, epoch microseconds, accuracy, speed) for one trackpoint
+PointRow = Tuple[float, float, float, int, Optional[float], Optional[float]]
+
+
+def _point_from_trkpt(trkpt: ET.Element, ns: dict, decoder: 'TimestampDecoder') -> Optional[PointRow]:
+    """Convert a single <trkpt> element into a PointRow (None if it has no timestamp)."""
+    # Get lat/lon attributes
+    lat = float(trkpt.get('lat', 0))
+    lon = float(trkpt.get('lon', 0))
     
-    Handles GPX 1.1 format with extensions (speed, accuracy, etc.)
+    # Get elevation
+    ele_elem = trkpt.find('gpx:ele', ns)
+    if ele_elem is None:
+        ele_elem = trkpt.find('.//{http://www.topografix.com/GPX/1/1}ele')
+    if ele_elem is None:
+        ele_elem = trkpt.find('ele')
+    elevation = float(ele_elem.text) if ele_elem is not None and ele_elem.text else 0.0
+    
+    # Get timestamp
+    time_elem = trkpt.find('gpx:time', ns)
+    if time_elem is None:
+        time_elem = trkpt.find('.//{http://www.topografix.com/GPX/1/1}time')
+    if time_elem is None:
+        time_elem = trkpt.find('time')
+    time_us = decoder.decode_us(time_elem.text) if time_elem is not None and time_elem.text else None
+    
+    if time_us is None:
+        return None  # Skip waypoints without timestamps
+    
+    # Get extensions (speed, accuracy, etc.)
+    accuracy = None
+    speed = None
+    
+    extensions = trkpt.find('gpx:extensions', ns)
+    if extensions is None:
+        extensions = trkpt.find('.//{http://www.topografix.com/GPX/1/1}extensions')
+    if extensions is None:
+        extensions = trkpt.find('extensions')
+        
+    if extensions is not None:
+        # Try various extension formats
+        for child in extensions:
+            tag = child.tag.lower()
+            if 'accuracy' in tag:
+                accuracy = float(child.text) if child.text else None
+            elif 'speed' in tag and 'speed' != tag:
+                speed = float(child.text) if child.text else None
+            elif child.tag == 'speed' or tag.endswith('speed'):
+                speed = float(child.text) if child.text else None
+    
+    return lat, lon, elevation, time_us, accuracy, speed
+
+
+def iter_gpx_points(
+    filepath: str,
+    decoder: Optional['TimestampDecoder'] = None,
+    opener: Optional[Callable[[str], BinaryIO]] = None,
+    segments: bool = False
+) -> Iterator[PointRow]:
     """
-    waypoints = []
+    Stream trackpoints from a GPX file in document order as PointRow tuples.
     
-    try:
-        tree = ET.parse(filepath)
-        root = tree.getroot()
-    except ET.ParseError as e:
-        raise ValueError(f"Failed to parse GPX file: {e}")
-    except FileNotFoundError:
-        raise ValueError(f"File not found: {filepath}")
+    Built on iterparse: every <trkpt> is converted as soon as its end tag
+    is read and is then detached from its parent, so memory stays flat no
+    matter how large the file is. Unlike parse_gpx_file() the points are
+    not sorted; GPX writers emit them in time order already.
     
-    # Define namespaces (both variations with and without trailing slash)
-    ns_variations = [
-        'http://www.topografix.com/GPX/1/1',   # Without trailing slash
-        'http://www.topografix.com/GPX/1/1/',  # With trailing slash
-    ]
+    opener(filepath), if given, supplies the binary file object to read
+    instead of iterparse opening the path itself. Compressed files and zip
+    members (see gpx_archive) are opened with open_source() by default and
+    decompressed as they are parsed.
     
+    With segments set, (segment, PointRow) pairs are yielded instead, where
+    segment counts the <trkseg> elements seen so far (across all <trk>s).
+    """
+    if decoder is None:
+        decoder = TimestampDecoder()
+    if opener is None and isinstance(filepath, str) and is_packed(filepath):
+        opener = open_source
+    if opener is not None:
+        try:
+            with opener(filepath) as source:
+                yield from iter_gpx_points(source, decoder, segments=segments)
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {filepath}")
+        except (OSError, EOFError, zlib.error, zipfile.BadZipFile) as e:
+            raise ValueError(f"Failed to read {filepath}: {e}")
+        return
     ns = {
-        'gpx': 'http://www.topografix.com/GPX/1/1',
+        'gpx': GPX_NAMESPACES[0],
         'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
     }
+    open_elements = []
+    segment = 0
     
-    # Find all track points (try all namespace variations)
-    trkpts = []
-    for ns_url in ns_variations:
-        trkpts = root.findall(f'.//{{{ns_url}}}trkpt')
-        if trkpts:
-            # Update ns dict for subsequent queries
-            ns['gpx'] = ns_url
-            break
-    
-    if not trkpts:
-        trkpts = root.findall('.//trkpt')
-    
-    for trkpt in trkpts:
-        # Get lat/lon attributes
-        lat = float(trkpt.get('lat', 0))
-        lon = float(trkpt.get('lon', 0))
-        
-        # Get elevation
-        ele_elem = trkpt.find('gpx:ele', ns)
-        if ele_elem is None:
-            ele_elem = trkpt.find('.//{http://www.topografix.com/GPX/1/1}ele')
-        if ele_elem is None:
-            ele_elem = trkpt.find('ele')
-        elevation = float(ele_elem.text) if ele_elem is not None and ele_elem.text else 0.0
-        
-        # Get timestamp
-        time_elem = trkpt.find('gpx:time', ns)
-        if time_elem is None:
-            time_elem = trkpt.find('.//{http://www.topografix.com/GPX/1/1}time')
-        if time_elem is None:
-            time_elem = trkpt.find('time')
-        timestamp = parse_timestamp(time_elem.text) if time_elem is not None and time_elem.text else None
-        
-        if timestamp is None:
-            continue  # Skip waypoints without timestamps
-        
-        # Get extensions (speed, accuracy, etc.)
-        accuracy = None
-        speed = None
-        
-        extensions = trkpt.find('gpx:extensions', ns)
-        if extensions is None:
-            extensions = trkpt.find('.//{http://www.topografix.com/GPX/1/1}extensions')
-        if extensions is None:
-            extensions = trkpt.find('extensions')
+    try:
+        for event, elem in ET.iterparse(filepath, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(elem)
+                if segments and (elem.tag == 'trkseg' or elem.tag.endswith('}trkseg')):
+                    segment += 1
+                continue
             
-        if extensions is not None:
-            # Try various extension formats
-            for child in extensions:
-                tag = child.tag.lower()
-                if 'accuracy' in tag:
-                    accuracy = float(child.text) if child.text else None
-                elif 'speed' in tag and 'speed' != tag:
-                    speed = float(child.text) if child.text else None
-                elif child.tag == 'speed' or tag.endswith('speed'):
-                    speed = float(child.text) if child.text else None
-        
-        waypoints.append(Waypoint(
+            open_elements.pop()
+            if elem.tag != 'trkpt' and not elem.tag.endswith('}trkpt'):
+                continue
+            
+            # Queries below use the namespace the document actually declares
+            ns['gpx'] = elem.tag[1:elem.tag.index('}')] if elem.tag.startswith('{') else ''
+            point = _point_from_trkpt(elem, ns, decoder)
+            
+            # Drop the finished trkpt (and any earlier siblings) from the tree
+            if open_elements:
+                del open_elements[-1][:]
+            elem.clear()
+            
+            if point is not None:
+                yield (segment, point) if segments else point
+    except ET.ParseError as e:
+        raise ValueError(f"Failed to parse GPX file: {e}")
+    except FileNotFoundError:
+        raise ValueError(f"File not found: {filepath}")
+
+
+def iter_gpx_waypoints(filepath: str) -> Iterator[Waypoint]:
+    """
+    Stream waypoints from a GPX file in document order.
+    
+    Same single-pass, constant-memory parse as iter_gpx_points(), with each
+    point materialised as a Waypoint in the file's UTC offset.
+    """
+    decoder = TimestampDecoder()
+    for lat, lon, elevation, time_us, accuracy, speed in iter_gpx_points(filepath, decoder):
+        yield Waypoint(
             lat=lat,
             lon=lon,
             elevation=elevation,
-            timestamp=timestamp,
+            timestamp=epoch_us_to_datetime(time_us, decoder.tz),
             accuracy=accuracy,
             speed=speed
-        ))
+        )
+
+
+def parse_gpx_file(
+    filepath: str,
+    cache: Optional[TrackCache] = None,
+    profile: Optional[FileProfile] = None,
+    content_hash: Optional[str] = None
+) -> Track:
+    """
+    Parse a GPX file and extract all waypoints.
     
-    # Sort by timestamp to ensure proper order
-    waypoints.sort(key=lambda w: w.timestamp)
+    Handles GPX 1.1 format with extensions (speed, accuracy, etc.)
+    The points are returned as a columnar Track sorted by timestamp.
+    Files from the writers we know (Ski Tracks, the app's GpxWriter) are
+    read by the byte-level scanner in gpx_scanner; anything else, or
+    anything the scanner can't vouch for, goes through the XML parser.
+    When a TrackCache is given, an unchanged file is loaded from it
+    instead of being re-parsed (content_hash, if the caller already
+    hashed the file, saves the cache from reading it again). With a
+    FileProfile, file reads and timestamp decoding are charged to their
+    own stages.
+    """
+    if cache is not None:
+        try:
+            return cache.fetch(filepath, lambda: parse_gpx_file(filepath, profile=profile), content_hash)
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {filepath}")
     
-    return waypoints
+    track = scan_gpx_file(filepath, profile=profile)
+    if track is None:
+        decoder = TimestampDecoder()
+        track = Track.from_rows(_gpx_points(filepath, decoder, profile))
+        track.tz = decoder.tz or timezone.utc
+    return track.sorted()
+
+
+def _gpx_points(filepath: str, decoder: 'TimestampDecoder', profile: Optional[FileProfile]) -> Iterator[PointRow]:
+    """iter_gpx_points() with the profiling hooks installed when a profile is given."""
+    if profile is None:
+        return iter_gpx_points(filepath, decoder)
+    decoder.decode_us = profile.timed_call('decode', decoder.decode_us)
+    return iter_gpx_points(filepath, decoder, opener=profile.timed_open)
+
+
+def parse_track_file(
+    filepath: str,
+    cache: Optional[TrackCache] = None,
+    profile: Optional[FileProfile] = None,
+    content_hash: Optional[str] = None
+) -> Track:
+    """Parse a GPX or FIT file (chosen by suffix) into a time-ordered Track."""
+    if track_suffix(filepath) != '.fit':
+        return parse_gpx_file(filepath, cache=cache, profile=profile, content_hash=content_hash)
+    if cache is not None:
+        try:
+            return cache.fetch(filepath, lambda: parse_fit_file(filepath), content_hash)
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {filepath}")
+    return parse_fit_file(filepath)
 
 
 def parse_timestamp(time_str: str) -> Optional[datetime]:
-    """Parse various timestamp formats from GPX files."""
+    """
+    Parse various timestamp formats from GPX files.
+    
+    Explicit UTC offsets are kept; 'Z' and offset-less values are UTC.
+    """
     if not time_str:
         return None
     
@@ -179,140 +456,540 @@ def parse_timestamp(time_str: str) -> Optional[datetime]:
     
     for fmt in formats:
         try:
-            return datetime.strptime(time_str, fmt).replace(tzinfo=timezone.utc)
+            parsed = datetime.strptime(time_str, fmt)
         except ValueError:
             continue
+        return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
     
     # Try ISO format as fallback
     try:
-        return datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+        parsed = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
     except ValueError:
-        pass
+        return None
     
-    return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
 
 
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+_ISO_TIMESTAMP = re.compile(
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?P<fraction>\.\d{1,6})?(?P<zone>Z|[+-]\d{2}:?\d{2})?'
+)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class TimestampDecoder:
     """
-    Calculate the great-circle distance between two points on Earth.
-    Returns distance in meters.
+    Decode GPX timestamps straight to integer epoch microseconds.
+    
+    Writers use one timestamp layout per file, so the first value decoded
+    fixes the layout (fraction digits and zone suffix) and every later value
+    is sliced at known offsets instead of trying strptime formats in turn.
+    Values that don't fit the cached layout go through parse_timestamp()
+    and become the new layout.
+    
+    tz is the zone of the first decoded timestamp and is used to present
+    times in the file's local offset.
     """
-    R = 6371000  # Earth's radius in meters
     
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
+    def __init__(self):
+        self.tz = None
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self._layout = None
+        self._day_seconds = {}
+    
+    def decode_us(self, time_str: str) -> Optional[int]:
+        if self._layout is None and self.tz is None:
+            self._detect(time_str)
+        
+        if self._layout is not None:
+            try:
+                value = self._decode_fast(time_str)
+                self.fast_hits += 1
+                return value
+            except (ValueError, IndexError):
+                pass
+        
+        self.fallbacks += 1
+        timestamp = parse_timestamp(time_str)
+        if timestamp is None:
+            return None
+        if self.tz is None:
+            self.tz = timestamp.tzinfo
+        # The layout changed (ISO_INSTANT writers drop a zero fraction, for
+        # instance): follow it so the values after this one stay on the fast path
+        self._detect(time_str)
+        return datetime_to_epoch_us(timestamp)
+    
+    def decode(self, time_str: str) -> Optional[float]:
+        """Decode to float epoch seconds."""
+        value = self.decode_us(time_str)
+        return None if value is None else value / 1e6
+    
+    def _detect(self, time_str: str):
+        match = _ISO_TIMESTAMP.fullmatch(time_str)
+        if match is None:
+            return
+        fraction = match.group('fraction')
+        zone = match.group('zone')
+        fraction_digits = len(fraction) - 1 if fraction else 0
+        self._layout = (
+            len(time_str),
+            fraction_digits,
+            10 ** (6 - fraction_digits),
+            zone[0] if zone else '',
+            len(zone) if zone else 0
+        )
+        if self.tz is None:
+            offset = self._zone_offset_seconds(time_str)
+            self.tz = timezone.utc if offset == 0 else timezone(timedelta(seconds=offset))
     
-    a = math.sin(delta_phi / 2) ** 2 + \
-        math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    def _zone_offset_seconds(self, time_str: str) -> int:
+        _, _, _, zone_kind, zone_length = self._layout
+        if zone_kind in ('', 'Z'):
+            return 0
+        zone = time_str[-zone_length:]
+        if zone[0] not in '+-':
+            raise ValueError(time_str)
+        minutes = int(zone[1:3]) * 60 + int(zone[-2:])
+        return -minutes * 60 if zone[0] == '-' else minutes * 60
     
-    return R * c
+    def _decode_fast(self, time_str: str) -> int:
+        length, fraction_digits, fraction_scale, zone_kind, _ = self._layout
+        if len(time_str) != length or time_str[10] != 'T' or time_str[16] != ':':
+            raise ValueError(time_str)
+        if zone_kind == 'Z' and time_str[-1] != 'Z':
+            raise ValueError(time_str)
+        
+        day = time_str[:10]
+        day_seconds = self._day_seconds.get(day)
+        if day_seconds is None:
+            day_seconds = (date(int(day[:4]), int(day[5:7]), int(day[8:10])).toordinal() - _EPOCH_ORDINAL) * 86400
+            self._day_seconds[day] = day_seconds
+        
+        seconds = day_seconds + int(time_str[11:13]) * 3600 + int(time_str[14:16]) * 60 + int(time_str[17:19])
+        micros = int(time_str[20:20 + fraction_digits]) * fraction_scale if fraction_digits else 0
+        return (seconds - self._zone_offset_seconds(time_str)) * 1_000_000 + micros
+
+
+def _empty_statistics() -> dict:
+    return {
+        'mean_interval': 0,
+        'median_interval': 0,
+        'stdev_interval': 0,
+        'min_interval': 0,
+        'max_interval': 0,
+        'total_distance_m': 0,
+        'anomaly_count': 0,
+        'anomaly_percentage': 0
+    }
 
 
 def analyze_intervals(
-    waypoints: List[Waypoint],
+    waypoints: Union[Track, Iterable[Waypoint]],
     anomaly_threshold_seconds: float = 120,
     min_interval_seconds: float = 0.5
 ) -> GpxAnalysisResult:
     """
     Analyze intervals between waypoints and detect anomalies.
     
+    All durations, distances, speeds and anomaly flags are computed with
+    batched array operations over the Track columns; no per-interval
+    Python objects are created until a caller indexes the result.
+    
     Args:
-        waypoints: List of parsed waypoints
+        waypoints: A Track, or waypoints in time order (a list or a stream
+            such as iter_gpx_waypoints(), packed into a Track in one pass)
         anomaly_threshold_seconds: Intervals longer than this are considered anomalies
         min_interval_seconds: Minimum expected interval (for detecting too-frequent points)
     """
-    if len(waypoints) < 2:
+    track = waypoints if isinstance(waypoints, Track) else Track.from_waypoints(waypoints)
+    
+    if len(track) < 2:
         return GpxAnalysisResult(
             filename="",
-            total_waypoints=len(waypoints),
+            total_waypoints=len(track),
             total_duration_seconds=0,
             intervals=[],
             anomalies=[],
-            statistics={
-                'mean_interval': 0,
-                'median_interval': 0,
-                'stdev_interval': 0,
-                'min_interval': 0,
-                'max_interval': 0,
-                'total_distance_m': 0,
-                'anomaly_count': 0,
-                'anomaly_percentage': 0
-            }
+            statistics=_empty_statistics()
         )
     
-    intervals = []
-    anomalies = []
+    n = len(track) - 1
+    
+    # Integer microsecond differences keep durations identical to timedelta arithmetic
+    interval_seconds = np.diff(track.time_us) / 1e6
+    distance_meters = haversine_distance(track.lat[:-1], track.lon[:-1], track.lat[1:], track.lon[1:])
+    positive = interval_seconds > 0
+    speed_ms = np.divide(distance_meters, interval_seconds, out=np.zeros(n), where=positive)
+    
+    # Threshold anomalies
+    anomaly_kind = np.zeros(n, dtype=np.int8)
+    anomaly_kind[positive & (interval_seconds < min_interval_seconds)] = ANOMALY_SHORT_INTERVAL
+    anomaly_kind[interval_seconds > anomaly_threshold_seconds] = ANOMALY_LARGE_GAP
+    anomaly_count = int(np.count_nonzero(anomaly_kind))
+    
+    # Calculate statistics
+    interval_times = interval_seconds[positive]
+    count = len(interval_times)
+    
+    stats_dict = {
+        'mean_interval': float(interval_times.mean()) if count else 0,
+        'median_interval': float(np.median(interval_times)) if count else 0,
+        'stdev_interval': float(interval_times.std(ddof=1)) if count > 1 else 0,
+        'min_interval': float(interval_times.min()) if count else 0,
+        'max_interval': float(interval_times.max()) if count else 0,
+        'total_distance_m': float(distance_meters.sum()),
+        'anomaly_count': anomaly_count,
+        'anomaly_percentage': anomaly_count / n * 100
+    }
+    
+    # Detect inconsistent patterns (intervals that deviate significantly from mean)
+    z_score = np.zeros(n)
+    if count > 2 and stats_dict['stdev_interval'] > 0:
+        candidates = positive & (anomaly_kind == ANOMALY_NONE)
+        z_score[candidates] = np.abs(interval_seconds[candidates] - stats_dict['mean_interval']) \
+            / stats_dict['stdev_interval']
+        anomaly_kind[z_score > 3] = ANOMALY_INCONSISTENT  # More than 3 standard deviations
+    
+    table = IntervalTable(
+        track, interval_seconds, distance_meters, speed_ms, anomaly_kind, z_score,
+        anomaly_threshold_seconds, min_interval_seconds
+    )
+    
+    return GpxAnalysisResult(
+        filename="",
+        total_waypoints=len(track),
+        total_duration_seconds=track.duration_seconds,
+        intervals=IntervalSequence(table),
+        anomalies=IntervalSequence(table, table.anomaly_indices()),
+        statistics=stats_dict
+    )
+
+
+_TRKPT_FRAGMENT = re.compile(rb'<trkpt\b.*?</trkpt>', re.DOTALL)
+_GPX_ROOT_TAG = re.compile(rb'<gpx\b[^>]*>', re.DOTALL)
+
+
+class StreamingIntervalAnalyzer:
+    """
+    Single-pass interval analysis in O(1) memory.
+    
+    Points are fed one at a time with add(). Interval statistics are kept
+    in a RunningStats accumulator, the median is a P-square estimate and
+    anomalies go to a bounded AnomalyRetention, so nothing grows with the
+    number of points. Inconsistent intervals are judged against the
+    running mean/stdev at the time they arrive, so they can differ from
+    the whole-track analysis in analyze_intervals().
     
-    for i in range(len(waypoints) - 1):
-        wp1 = waypoints[i]
-        wp2 = waypoints[i + 1]
+    on_interval, if given, is called as on_interval(index, interval_seconds,
+    distance_meters, speed_ms, is_anomaly) for every interval.
+    
+    A point added with new_segment set starts a new track segment: the gap
+    to the previous point is not an interval, so it is neither measured
+    nor flagged (see gpx_merge).
+    """
+    
+    def __init__(
+        self,
+        anomaly_threshold_seconds: float = 120,
+        min_interval_seconds: float = 0.5,
+        retention: Optional[AnomalyRetention] = None,
+        on_interval=None
+    ):
+        self.anomaly_threshold_seconds = anomaly_threshold_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.retention = retention if retention is not None else AnomalyRetention()
+        self.on_interval = on_interval
+        self.tz = None
+        self.first_point = None
+        self.last_point = None
+        self.total_waypoints = 0
+        self.interval_count = 0
+        self.total_distance_m = 0.0
+        self.intervals = RunningStats()
+        self.median = P2Quantile(0.5)
+        self.threshold_anomaly_count = 0
+        self.segment_breaks = 0
+    
+    def add(self, point: PointRow, new_segment: bool = False) -> Optional[tuple]:
+        """
+        Fold in the next point. If the interval it closes is anomalous, the
+        anomaly record (see interval_analysis()) is returned.
+        """
+        self.total_waypoints += 1
+        previous, self.last_point = self.last_point, point
+        if previous is None:
+            self.first_point = point
+            return None
+        if new_segment:
+            self.segment_breaks += 1
+            return None
         
-        # Calculate time interval
-        interval_seconds = (wp2.timestamp - wp1.timestamp).total_seconds()
+        interval_seconds = (point[3] - previous[3]) / 1e6
+        distance = haversine_distance(previous[0], previous[1], point[0], point[1])
+        speed_ms = distance / interval_seconds if interval_seconds > 0 else 0
+        self.interval_count += 1
+        self.total_distance_m += distance
         
-        # Calculate distance
-        distance = haversine_distance(wp1.lat, wp1.lon, wp2.lat, wp2.lon)
+        anomaly_type = None
+        severity = 0.0
+        if interval_seconds > self.anomaly_threshold_seconds:
+            anomaly_type = f"Large gap ({interval_seconds:.1f}s > {self.anomaly_threshold_seconds}s threshold)"
+            severity = interval_seconds / self.anomaly_threshold_seconds
+            self.threshold_anomaly_count += 1
+        elif interval_seconds < self.min_interval_seconds and interval_seconds > 0:
+            anomaly_type = f"Very short interval ({interval_seconds:.2f}s < {self.min_interval_seconds}s minimum)"
+            severity = self.min_interval_seconds / interval_seconds
+            self.threshold_anomaly_count += 1
+        elif interval_seconds > 0 and self.intervals.count > 2 and self.intervals.stdev > 0:
+            z_score = abs(interval_seconds - self.intervals.mean) / self.intervals.stdev
+            if z_score > 3:  # More than 3 standard deviations
+                anomaly_type = f"Inconsistent interval (z-score: {z_score:.2f})"
+                severity = z_score / 3
         
-        # Calculate speed (m/s)
-        speed_ms = distance / interval_seconds if interval_seconds > 0 else 0
+        if interval_seconds > 0:
+            self.intervals.add(interval_seconds)
+            self.median.add(interval_seconds)
         
-        interval = IntervalAnalysis(
-            from_waypoint=wp1,
-            to_waypoint=wp2,
+        if self.on_interval is not None:
+            self.on_interval(self.interval_count - 1, interval_seconds, distance, speed_ms, anomaly_type is not None)
+        if anomaly_type is None:
+            return None
+        record = (previous, point, interval_seconds, distance, speed_ms, anomaly_type)
+        self.retention.offer(severity, record)
+        return record
+    
+    @property
+    def duration_seconds(self) -> float:
+        if self.first_point is None:
+            return 0.0
+        return (self.last_point[3] - self.first_point[3]) / 1e6
+    
+    def _waypoint(self, point: PointRow) -> Waypoint:
+        lat, lon, elevation, time_us, accuracy, speed = point
+        return Waypoint(lat, lon, elevation, epoch_us_to_datetime(time_us, self.tz or timezone.utc),
+                        accuracy, speed)
+    
+    def interval_analysis(self, record: tuple) -> IntervalAnalysis:
+        """Materialise an anomaly record as an IntervalAnalysis."""
+        previous, point, interval_seconds, distance, speed_ms, anomaly_type = record
+        return IntervalAnalysis(
+            from_waypoint=self._waypoint(previous),
+            to_waypoint=self._waypoint(point),
             interval_seconds=interval_seconds,
             distance_meters=distance,
-            speed_ms=speed_ms
+            speed_ms=speed_ms,
+            is_anomaly=True,
+            anomaly_type=anomaly_type
         )
+    
+    def anomalies(self) -> List[IntervalAnalysis]:
+        """Retained anomalies in arrival order."""
+        return [self.interval_analysis(record) for record in self.retention.items()]
+    
+    def result(self, filename: str = "") -> GpxAnalysisResult:
+        """Snapshot of everything analyzed so far."""
+        statistics = _empty_statistics()
+        if self.intervals.count:
+            statistics.update({
+                'mean_interval': self.intervals.mean,
+                'median_interval': self.median.value,
+                'stdev_interval': self.intervals.stdev,
+                'min_interval': self.intervals.min,
+                'max_interval': self.intervals.max,
+            })
+        statistics['total_distance_m'] = self.total_distance_m
+        statistics['anomaly_count'] = self.threshold_anomaly_count
+        if self.interval_count:
+            statistics['anomaly_percentage'] = self.threshold_anomaly_count / self.interval_count * 100
         
-        intervals.append(interval)
-        
-        # Detect anomalies
-        if interval_seconds > anomaly_threshold_seconds:
-            interval.is_anomaly = True
-            interval.anomaly_type = f"Large gap ({interval_seconds:.1f}s > {anomaly_threshold_seconds}s threshold)"
-            anomalies.append(interval)
-        elif interval_seconds < min_interval_seconds and interval_seconds > 0:
-            interval.is_anomaly = True
-            interval.anomaly_type = f"Very short interval ({interval_seconds:.2f}s < {min_interval_seconds}s minimum)"
-            anomalies.append(interval)
+        return GpxAnalysisResult(
+            filename=filename,
+            total_waypoints=self.total_waypoints,
+            total_duration_seconds=self.duration_seconds,
+            intervals=[],
+            anomalies=self.anomalies(),
+            statistics=statistics
+        )
+
+
+def analyze_stream(
+    points: Iterable[PointRow],
+    anomaly_threshold_seconds: float = 120,
+    min_interval_seconds: float = 0.5,
+    retention: Optional[AnomalyRetention] = None,
+    decoder: Optional['TimestampDecoder'] = None,
+    on_interval=None
+) -> GpxAnalysisResult:
+    """
+    Analyze a point stream (e.g. iter_gpx_points()) in one pass and O(1) memory.
     
-    # Calculate statistics
-    interval_times = [i.interval_seconds for i in intervals if i.interval_seconds > 0]
+    Pass the TimestampDecoder feeding the stream so anomaly times are shown
+    in the file's UTC offset.
+    """
+    analyzer = StreamingIntervalAnalyzer(
+        anomaly_threshold_seconds, min_interval_seconds, retention, on_interval
+    )
+    for point in points:
+        analyzer.add(point)
+    if decoder is not None:
+        analyzer.tz = decoder.tz
+    return analyzer.result()
+
+
+class TrackFollower:
+    """
+    Incrementally analyze a GPX file that is still being recorded.
     
-    stats_dict = {
-        'mean_interval': stats_module.mean(interval_times) if interval_times else 0,
-        'median_interval': stats_module.median(interval_times) if interval_times else 0,
-        'stdev_interval': stats_module.stdev(interval_times) if len(interval_times) > 1 else 0,
-        'min_interval': min(interval_times) if interval_times else 0,
-        'max_interval': max(interval_times) if interval_times else 0,
-        'total_distance_m': sum(i.distance_meters for i in intervals),
-        'anomaly_count': len(anomalies),
-        'anomaly_percentage': (len(anomalies) / len(intervals) * 100) if intervals else 0
-    }
+    The app rewrites temp_recording.gpx every AUTO_SAVE_INTERVAL with the
+    same content followed by the newly recorded points. Each refresh()
+    reads only the bytes after the last complete </trkpt> seen so far,
+    parses those points and feeds them to a StreamingIntervalAnalyzer, so
+    its cost depends on the new data only. If the file shrinks or the
+    bytes before the saved offset change, the follower starts over.
+    """
     
-    # Detect inconsistent patterns (intervals that deviate significantly from mean)
-    if len(interval_times) > 2 and stats_dict['stdev_interval'] > 0:
-        for interval in intervals:
-            if not interval.is_anomaly and interval.interval_seconds > 0:
-                z_score = abs(interval.interval_seconds - stats_dict['mean_interval']) / stats_dict['stdev_interval']
-                if z_score > 3:  # More than 3 standard deviations
-                    interval.is_anomaly = True
-                    interval.anomaly_type = f"Inconsistent interval (z-score: {z_score:.2f})"
-                    anomalies.append(interval)
+    FINGERPRINT_BYTES = 256
     
-    total_duration = (waypoints[-1].timestamp - waypoints[0].timestamp).total_seconds()
+    def __init__(
+        self,
+        filepath: str,
+        anomaly_threshold_seconds: float = 120,
+        min_interval_seconds: float = 0.5,
+        retention_limit: Optional[int] = None,
+        retention_policy: str = 'first'
+    ):
+        self.filepath = filepath
+        self.anomaly_threshold_seconds = anomaly_threshold_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self.retention_limit = retention_limit
+        self.retention_policy = retention_policy
+        self.restarts = 0
+        self.reset()
     
-    return GpxAnalysisResult(
-        filename="",
-        total_waypoints=len(waypoints),
-        total_duration_seconds=total_duration,
-        intervals=intervals,
-        anomalies=anomalies,
-        statistics=stats_dict
+    def reset(self):
+        self.offset = 0
+        self.fingerprint = b''
+        self.root_tag = None
+        self.decoder = TimestampDecoder()
+        self.analyzer = StreamingIntervalAnalyzer(
+            self.anomaly_threshold_seconds,
+            self.min_interval_seconds,
+            AnomalyRetention(self.retention_limit, self.retention_policy)
+        )
+    
+    @property
+    def total_waypoints(self) -> int:
+        return self.analyzer.total_waypoints
+    
+    @property
+    def duration_seconds(self) -> float:
+        return self.analyzer.duration_seconds
+    
+    def _read_tail(self) -> bytes:
+        """Bytes from the start of the saved fingerprint to the end of the file."""
+        with open(self.filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.offset:
+                return b''
+            f.seek(self.offset - len(self.fingerprint))
+            return f.read()
+    
+    def refresh(self) -> List[IntervalAnalysis]:
+        """
+        Process newly appended trackpoints; returns the anomalies they
+        produced. Raises ValueError if they don't parse, with nothing
+        consumed, so the next refresh() tries the same bytes again.
+        """
+        data = self._read_tail()
+        if self.offset and not data.startswith(self.fingerprint):
+            # The file was truncated or rewritten with different content
+            self.restarts += 1
+            self.reset()
+            data = self._read_tail()
+        start = len(self.fingerprint)
+        
+        if self.root_tag is None:
+            match = _GPX_ROOT_TAG.search(data)
+            if match is None:
+                return []
+            self.root_tag = match.group(0)
+        
+        fragments = [m.group(0) for m in _TRKPT_FRAGMENT.finditer(data, start)]
+        if not fragments:
+            return []
+        end = data.rindex(b'</trkpt>') + len(b'</trkpt>')
+        
+        try:
+            root = ET.fromstring(self.root_tag + b''.join(fragments) + b'</gpx>')
+        except ET.ParseError as e:
+            raise ValueError(f"Failed to parse appended trackpoints: {e}")
+        
+        # All points are converted before any is analyzed, so a bad value leaves the analyzer untouched
+        points = []
+        for trkpt in root:
+            ns = {'gpx': trkpt.tag[1:trkpt.tag.index('}')] if trkpt.tag.startswith('{') else ''}
+            try:
+                point = _point_from_trkpt(trkpt, ns, self.decoder)
+            except ValueError as e:
+                raise ValueError(f"Invalid appended trackpoint: {e}")
+            if point is not None:
+                points.append(point)
+        
+        new_anomalies = []
+        for point in points:
+            record = self.analyzer.add(point)
+            if record is not None:
+                new_anomalies.append(record)
+        self.analyzer.tz = self.decoder.tz
+        
+        self.offset += end - start
+        self.fingerprint = data[max(0, end - self.FINGERPRINT_BYTES):end]
+        return [self.analyzer.interval_analysis(record) for record in new_anomalies]
+    
+    def result(self) -> GpxAnalysisResult:
+        """Snapshot of everything analyzed so far."""
+        return self.analyzer.result(self.filepath)
+
+
+def follow_file(filepath: str, args):
+    """Re-analyze a growing recording every args.poll seconds until interrupted."""
+    follower = TrackFollower(
+        filepath,
+        anomaly_threshold_seconds=args.threshold,
+        min_interval_seconds=args.min_interval,
+        retention_limit=args.max_anomalies,
+        retention_policy=args.keep
     )
+    print(f"Following {filepath} (every {args.poll:g}s, Ctrl+C to stop)")
+    
+    try:
+        while True:
+            previous_total = follower.total_waypoints
+            try:
+                new_anomalies = follower.refresh()
+            except FileNotFoundError:
+                print(f"[{datetime.now():%H:%M:%S}] waiting for {filepath}")
+            except (ValueError, OSError) as e:
+                # Usually a save caught mid-write: the same bytes are read again on the next poll
+                print(f"[{datetime.now():%H:%M:%S}] warning: {e} (retrying)")
+            else:
+                analyzer = follower.analyzer
+                intervals = analyzer.intervals
+                # Threshold anomalies as in the final summary; z-score outliers are listed too but counted apart
+                inconsistent = analyzer.retention.seen - analyzer.threshold_anomaly_count
+                print(f"[{datetime.now():%H:%M:%S}] +{follower.total_waypoints - previous_total} points "
+                      f"(total {follower.total_waypoints}, {format_duration(follower.duration_seconds)}) | "
+                      f"mean {intervals.mean:.2f}s, max {max(intervals.max, 0):.0f}s | "
+                      f"anomalies {analyzer.threshold_anomaly_count} (+{inconsistent} inconsistent)")
+                for anomaly in new_anomalies:
+                    print(f"    [!] {anomaly.anomaly_type} at "
+                          f"{anomaly.from_waypoint.timestamp.strftime('%H:%M:%S')}")
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        pass
+    
+    print_analysis(follower.result())
 
 
 def format_duration(seconds: float) -> str:
@@ -368,26 +1045,1132 @@ def print_analysis(result: GpxAnalysisResult, verbose: bool = False):
     
     if verbose and result.intervals:
         print(f"\n[DETAILS] All Intervals:")
-        for i, interval in enumerate(result.intervals):
-            marker = "[!]" if interval.is_anomaly else "[ ]"
-            print(f"{marker} [{i+1}] {interval.interval_seconds:.2f}s | "
-                  f"{interval.distance_meters:.1f}m | "
-                  f"{interval.speed_ms * 3.6:.1f} km/h")
+        for chunk in _interval_listing(result.intervals):
+            sys.stdout.write(chunk)
+
+
+def _interval_line(index: int, interval_seconds: float, distance_meters: float,
+                   speed_ms: float, is_anomaly: bool) -> str:
+    marker = "[!]" if is_anomaly else "[ ]"
+    return (f"{marker} [{index+1}] {interval_seconds:.2f}s | "
+            f"{distance_meters:.1f}m | "
+            f"{speed_ms * 3.6:.1f} km/h\n")
+
+
+# Lines of the --verbose interval listing joined per write
+LISTING_CHUNK_LINES = 65536
+
+
+def _interval_listing(intervals: Sequence) -> Iterator[str]:
+    """
+    The --verbose interval listing in chunks of LISTING_CHUNK_LINES lines.
+    
+    A whole-track IntervalSequence is formatted straight from its table's
+    columns instead of materialising an IntervalAnalysis per interval.
+    """
+    if isinstance(intervals, IntervalSequence) and intervals.indices is None:
+        table = intervals.table
+        for start in range(0, len(table), LISTING_CHUNK_LINES):
+            end = min(start + LISTING_CHUNK_LINES, len(table))
+            yield ''.join(map(
+                _interval_line,
+                range(start, end),
+                table.interval_seconds[start:end].tolist(),
+                table.distance_meters[start:end].tolist(),
+                table.speed_ms[start:end].tolist(),
+                (table.anomaly_kind[start:end] != ANOMALY_NONE).tolist()
+            ))
+        return
+    for start in range(0, len(intervals), LISTING_CHUNK_LINES):
+        yield ''.join(
+            _interval_line(start + i, interval.interval_seconds, interval.distance_meters,
+                           interval.speed_ms, interval.is_anomaly)
+            for i, interval in enumerate(intervals[start:start + LISTING_CHUNK_LINES])
+        )
+
+
+class _StreamedIntervalPrinter:
+    """--verbose listing for --stream runs, written in chunks while the file is read."""
+    
+    def __init__(self):
+        self.lines: List[str] = []
+    
+    def __call__(self, index: int, interval_seconds: float, distance_meters: float,
+                 speed_ms: float, is_anomaly: bool):
+        self.lines.append(_interval_line(index, interval_seconds, distance_meters, speed_ms, is_anomaly))
+        if len(self.lines) >= LISTING_CHUNK_LINES:
+            self.flush()
+    
+    def flush(self):
+        sys.stdout.write(''.join(self.lines))
+        self.lines.clear()
+
+
+class MarkdownReport:
+    """The --output Markdown report, appended to as each file finishes."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+    
+    def write_result(self, result: GpxAnalysisResult):
+        if self.file is None:
+            self.file = open(self.path, 'w')
+            self.file.write("# GPX Interval Analysis Report\n\n")
+        
+        lines = [
+            f"## {result.filename}\n\n",
+            f"- Total waypoints: {result.total_waypoints}\n",
+            f"- Total duration: {format_duration(result.total_duration_seconds)}\n",
+            f"- Mean interval: {result.statistics['mean_interval']:.2f}s\n",
+            f"- Anomalies: {result.statistics['anomaly_count']}\n\n",
+        ]
+        if result.anomalies:
+            lines.append("### Anomalies:\n\n")
+            for anomaly in result.anomalies:
+                lines.append(f"- {anomaly.anomaly_type}\n"
+                             f"  Time: {anomaly.from_waypoint.timestamp.isoformat()} -> "
+                             f"{anomaly.to_waypoint.timestamp.isoformat()}\n"
+                             f"  Interval: {anomaly.interval_seconds:.2f}s\n\n")
+        self.file.write(''.join(lines))
+        self.file.flush()
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# One TrackCache per cache directory and size in each process, so its running size total is kept across files
+_track_caches: Dict[Tuple[Optional[str], int], TrackCache] = {}
+
+
+def track_cache_from_args(args) -> Optional[TrackCache]:
+    """The parsed-track cache selected on the command line (None with --no-cache)."""
+    if getattr(args, 'no_cache', True):
+        return None
+    key = (args.cache_dir, int(args.cache_size * (1 << 20)))
+    if key not in _track_caches:
+        _track_caches[key] = TrackCache(args.cache_dir, max_bytes=key[1])
+    return _track_caches[key]
 
 
 def analyze_file(filepath: str, args) -> GpxAnalysisResult:
-    """Analyze a single GPX file."""
-    waypoints = parse_gpx_file(filepath)
-    result = analyze_intervals(
-        waypoints,
-        anomaly_threshold_seconds=args.threshold,
-        min_interval_seconds=args.min_interval
-    )
+    """
+    Analyze a single GPX or FIT file.
+    
+    With args.profile set, the stage costs are recorded in result.profile.
+    """
+    profile = FileProfile(filepath) if getattr(args, 'profile', False) else None
+    
+    if getattr(args, 'stream', False):
+        is_fit = track_suffix(filepath) == '.fit'
+        decoder = None if is_fit else TimestampDecoder()
+        points = iter_fit_points(filepath) if is_fit else _gpx_points(filepath, decoder, profile)
+        printer = _StreamedIntervalPrinter() if args.verbose else None
+        with profile.stage('analysis') if profile else _NO_STAGE:
+            result = analyze_stream(
+                profile.timed_iter('parse', points) if profile else points,
+                anomaly_threshold_seconds=args.threshold,
+                min_interval_seconds=args.min_interval,
+                retention=AnomalyRetention(args.max_anomalies, args.keep),
+                decoder=decoder,
+                on_interval=printer
+            )
+        if printer:
+            printer.flush()
+        result.filename = filepath
+        result.profile = profile
+        return result
+    
+    with profile.stage('parse') if profile else _NO_STAGE:
+        waypoints = parse_track_file(filepath, cache=track_cache_from_args(args), profile=profile)
+    with profile.stage('analysis') if profile else _NO_STAGE:
+        result = analyze_intervals(
+            waypoints,
+            anomaly_threshold_seconds=args.threshold,
+            min_interval_seconds=args.min_interval
+        )
     result.filename = filepath
+    if profile:
+        profile.points = len(waypoints)
+        result.profile = profile
     return result
 
 
-def main():
+def _analyze_file_compact(filepath: str, args) -> GpxAnalysisResult:
+    """Process-pool entry point: analyze one file and return a compact result."""
+    keep_intervals = args.verbose or getattr(args, 'records', None) == 'intervals'
+    return analyze_file(filepath, args).compact(keep_intervals=keep_intervals)
+
+
+def analyze_files(
+    files: List[str],
+    args,
+    worker: Optional[Callable[[str, argparse.Namespace], Any]] = None
+) -> Iterator[Tuple[str, Union[GpxAnalysisResult, Exception]]]:
+    """
+    Analyze files and yield (filepath, result or exception) in input order.
+    
+    With args.jobs > 1 the files are analyzed in a process pool; workers
+    send back compact results and are collected in submission order, so
+    reports come out in the same order as a sequential run. Other modes
+    pass their own module-level worker(filepath, args) to reuse the pool.
+    """
+    jobs = getattr(args, 'jobs', 1) or os.cpu_count() or 1
+    
+    if jobs <= 1 or len(files) <= 1:
+        for filepath in files:
+            try:
+                yield filepath, (worker or analyze_file)(filepath, args)
+            except Exception as e:
+                yield filepath, e
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        futures = [executor.submit(worker or _analyze_file_compact, filepath, args) for filepath in files]
+        try:
+            for filepath, future in zip(files, futures):
+                try:
+                    yield filepath, future.result()
+                except Exception as e:
+                    yield filepath, e
+        finally:
+            # A consumer that stops early (a closed output pipe) doesn't wait for the remaining files
+            for future in futures:
+                future.cancel()
+
+
+def _track_sources(path: str) -> Optional[List[str]]:
+    """
+    The tracks a discovered file stands for: the file itself (plain or a
+    compressed GPX file), the GPX members of a zip archive, or None when
+    it is not a track file at all.
+    """
+    if path.lower().endswith(ARCHIVE_SUFFIX):
+        return archive_members(path)
+    if track_suffix(path) in (PACKED_TRACK_SUFFIXES if is_packed(path) else TRACK_SUFFIXES):
+        return [path]
+    return None
+
+
+def find_track_files(path_arg: str, recursive: bool = False) -> List[str]:
+    """
+    Resolve a file, directory or glob pattern to a sorted list of GPX/FIT files.
+    
+    Compressed GPX files (.gpx.gz, .gpx.bz2) are included as they are and
+    zip archives are expanded to their GPX members ('season.zip::Day_5.gpx'),
+    which can also be named directly.
+    
+    Raises ValueError when nothing usable matches.
+    """
+    path = Path(path_arg)
+    
+    if path.is_file():
+        sources = _track_sources(str(path))
+        if sources is None:
+            raise ValueError(f"{path} is not a GPX or FIT file (or a compressed GPX file or zip archive)")
+        if not sources:
+            raise ValueError(f"No GPX files found in {path}")
+        return sources
+    
+    if split_member(path_arg)[1] is not None:
+        if not source_exists(path_arg):
+            raise ValueError(f"No such archive member: {path_arg}")
+        return [path_arg]
+    
+    if path.is_dir():
+        pattern = '**/*' if recursive else '*'
+        candidates = sorted(str(f) for f in path.glob(pattern) if f.is_file())
+        files = [source for f in candidates for source in _track_sources(f) or ()]
+        if not files:
+            raise ValueError(f"No GPX or FIT files found in {path}")
+        return files
+    
+    # Handle glob patterns
+    import glob as glob_module
+    files = []
+    for match in sorted(glob_module.glob(path_arg)):
+        files.extend(archive_members(match) if match.lower().endswith(ARCHIVE_SUFFIX) else [match])
+    if not files:
+        raise ValueError(f"No files match pattern: {path_arg}")
+    return files
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """Options controlling the parsed-track cache, shared by every mode that parses files."""
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='Directory for the parsed-track cache '
+                             '(default: $GPX_ANALYZER_CACHE_DIR or ~/.cache/gpx_analyzer)')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f'Maximum cache size in MB (default: {DEFAULT_CACHE_SIZE_MB})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always parse from XML; neither read nor write the track cache')
+
+
+def print_runs(filepath: str, track: Track, runs: List[SkiRun]):
+    """Print the runs detected in one file."""
+    print(f"\n{'='*70}")
+    print(f"File: {os.path.basename(filepath)}")
+    print(f"{'='*70}")
+    print(f"  Points: {len(track)}")
+    print(f"  Runs detected: {len(runs)}")
+    if not runs:
+        return
+    
+    print(f"\n  {'#':>3}  {'Start':<8}  {'Duration':>9}  {'Vertical':>9}  {'Distance':>9}  "
+          f"{'Avg':>10}  {'Max':>10}  {'Slope':>6}")
+    for run in runs:
+        start = epoch_us_to_datetime(run.start_time * 1000, track.tz).strftime('%H:%M:%S')
+        print(f"  {run.run_number:>3}  {start:<8}  {format_duration(run.duration_seconds):>9}  "
+              f"{run.vertical_drop:>8.0f}m  {run.distance:>8.0f}m  "
+              f"{run.avg_speed:>5.1f} km/h  {run.max_speed:>5.1f} km/h  {run.avg_slope:>5.1f}%")
+    
+    total_vertical = sum(run.vertical_drop for run in runs)
+    total_distance = sum(run.distance for run in runs)
+    print(f"\n  Total: {total_vertical:.0f}m vertical over {total_distance / 1000:.2f} km")
+
+
+def detect_runs_main(argv: List[str]):
+    """``gpx_analyzer.py detect-runs``: the app's run detection applied to GPX files."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py detect-runs',
+        description='Detect ski runs with the same algorithm and thresholds as the app'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('--no-combine', action='store_true',
+                        help='Do not merge segments across short gaps (the app\'s live, '
+                             'incremental detection)')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    cache = track_cache_from_args(args)
+    for filepath in files:
+        try:
+            track = parse_track_file(filepath, cache=cache)
+        except Exception as e:
+            print(f"Error analyzing {filepath}: {e}", file=sys.stderr)
+            continue
+        print_runs(filepath, track, detect_runs(track, combine=not args.no_combine))
+
+
+def _session_stats_for_file(filepath: str, args) -> Tuple[SessionStats, dict]:
+    """
+    Process-pool entry point for session-stats: the app's statistics and
+    the extras the app does not show.
+    """
+    track = parse_track_file(filepath, cache=track_cache_from_args(args))
+    return calculate_session_stats(track), {'avg_descent_slope': average_descent_slope(track)}
+
+
+def print_session_stats(filepath: str, stats: SessionStats, extra: Optional[dict] = None):
+    """Print the session screen's statistics for one file, then any extras (not in the app)."""
+    print(f"\n{'='*70}")
+    print(f"Session: {os.path.basename(filepath)}")
+    print(f"{'='*70}")
+    print(f"  Duration:        {format_duration(stats.total_duration)}")
+    print(f"  Runs:            {stats.run_count}")
+    print(f"  Distance:        {stats.total_distance / 1000:.2f} km "
+          f"(ski {stats.ski_distance / 1000:.2f} km, lift {stats.lift_distance / 1000:.2f} km)")
+    print(f"  Ski vertical:    {stats.ski_vertical:.0f}m")
+    print(f"  Ascent/descent:  {stats.total_ascent:.0f}m / {stats.total_descent:.0f}m")
+    print(f"  Altitude:        {stats.min_altitude:.0f}m - {stats.max_altitude:.0f}m")
+    print(f"  Speed:           max {stats.max_speed:.1f} km/h, avg {stats.avg_speed:.1f} km/h, "
+          f"avg ski {stats.avg_ski_speed:.1f} km/h")
+    print(f"  Performance:     {stats.performance_score:.0f}/100")
+    
+    print("\n  Time distribution:")
+    for label, seconds in (('Moving', stats.moving_time), ('Stationary', stats.stationary_time),
+                           ('Ascending', stats.ascending_time), ('Descending', stats.descending_time)):
+        share = seconds / stats.total_duration * 100 if stats.total_duration else 0
+        print(f"    {label:<11} {format_duration(seconds):>11}  ({share:4.1f}%)")
+    
+    print("\n  Speed distribution (points):")
+    total_points = sum(stats.speed_distribution) or 1
+    for label, count in zip(SPEED_BUCKET_LABELS, stats.speed_distribution):
+        print(f"    {label + ' km/h':<11} {count:>7}  {'#' * round(count / total_points * 40)}")
+    
+    if extra:
+        print("\n  Extra (not in the app):")
+        print(f"    Descent slope  {extra['avg_descent_slope']:.1f}% average")
+
+
+def session_stats_main(argv: List[str]):
+    """``gpx_analyzer.py session-stats``: the app's session statistics for GPX files."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py session-stats',
+        description='Compute the session statistics the app shows (distance, time distribution, '
+                    'performance score, speed histogram)'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print one JSON object per file instead of the text report')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    sessions = []
+    for filepath, outcome in analyze_files(files, args, worker=_session_stats_for_file):
+        if isinstance(outcome, Exception):
+            print(f"Error analyzing {filepath}: {outcome}", file=sys.stderr)
+            continue
+        stats, extra = outcome
+        sessions.append(stats)
+        if args.json:
+            print(json.dumps({'file': filepath, **stats.to_dict(), 'extra': extra}))
+        else:
+            print_session_stats(filepath, stats, extra)
+    
+    if len(sessions) > 1 and not args.json:
+        print(f"\n{'='*70}")
+        print(f"SUMMARY: {len(sessions)} sessions")
+        print(f"{'='*70}")
+        print(f"  Runs: {sum(s.run_count for s in sessions)}")
+        print(f"  Ski vertical: {sum(s.ski_vertical for s in sessions):.0f}m")
+        print(f"  Ski distance: {sum(s.ski_distance for s in sessions) / 1000:.2f} km")
+        print(f"  Max speed: {max(s.max_speed for s in sessions):.1f} km/h")
+
+
+def _indexed_session(filepath: str, args) -> IndexedSession:
+    """Process-pool entry point for index: the summary and anomaly rows of one file."""
+    # The file is hashed once (or not at all, if plan() already did) for both the index row and the cache key
+    path, size, mtime_ns, content_hash = file_identity(filepath, args.content_hashes.get(filepath))
+    track = parse_track_file(filepath, cache=track_cache_from_args(args), content_hash=content_hash)
+    result = analyze_intervals(track, anomaly_threshold_seconds=args.threshold,
+                               min_interval_seconds=args.min_interval)
+    stats = calculate_session_stats(track)
+    
+    offset = track.tz.utcoffset(None) if track.tz is not None else None
+    start = epoch_us_to_datetime(int(track.time_us[0]), track.tz) if len(track) else None
+    anomalies = []
+    if isinstance(result.anomalies, IntervalSequence):
+        table = result.anomalies.table
+        for index in result.anomalies.indices.tolist():
+            description = table.anomaly_type(index)
+            anomalies.append((
+                index, anomaly_kind(description), description,
+                int(track.time_us[index]), int(track.time_us[index + 1]),
+                float(table.interval_seconds[index]), float(table.distance_meters[index]),
+                float(table.speed_ms[index]), float(track.lat[index]), float(track.lon[index])
+            ))
+    
+    statistics = result.statistics
+    return IndexedSession(
+        path=path,
+        size=size,
+        mtime_ns=mtime_ns,
+        content_hash=content_hash,
+        start_time_us=int(track.time_us[0]) if len(track) else None,
+        end_time_us=int(track.time_us[-1]) if len(track) else None,
+        utc_offset_seconds=int(offset.total_seconds()) if offset is not None else 0,
+        start_date=start.date().isoformat() if start else None,
+        season=season_of(start.date()) if start else None,
+        waypoints=result.total_waypoints,
+        duration_seconds=float(result.total_duration_seconds),
+        total_distance_m=float(statistics['total_distance_m']),
+        mean_interval=float(statistics['mean_interval']),
+        median_interval=float(statistics['median_interval']),
+        stdev_interval=float(statistics['stdev_interval']),
+        min_interval=float(statistics['min_interval']),
+        max_interval=float(statistics['max_interval']),
+        anomaly_count=int(statistics['anomaly_count']),
+        anomaly_percentage=float(statistics['anomaly_percentage']),
+        run_count=stats.run_count,
+        ski_vertical=stats.ski_vertical,
+        ski_distance=stats.ski_distance,
+        total_ascent=stats.total_ascent,
+        total_descent=stats.total_descent,
+        max_speed_kmh=stats.max_speed,
+        anomalies=anomalies
+    )
+
+
+def add_index_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--db', type=str, default=None,
+                        help='Index database (default: sessions.sqlite in the cache directory)')
+
+
+def index_main(argv: List[str]):
+    """``gpx_analyzer.py index``: add new and changed files to the session index."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py index',
+        description='Store per-file summaries and anomalies in a SQLite index for the query '
+                    'subcommand. Unchanged files (same size and mtime, or same content) are skipped.'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('-t', '--threshold', type=float, default=120,
+                        help='Anomaly threshold in seconds (default: 120); changing it re-indexes every file')
+    parser.add_argument('--min-interval', type=float, default=0.5,
+                        help='Minimum expected interval in seconds (default: 0.5)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--prune', action='store_true',
+                        help='Also remove sessions whose file no longer exists')
+    add_index_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    with SessionIndex(args.db, args.threshold, args.min_interval) as index:
+        stale = index.plan(files)
+        args.content_hashes = index.content_hashes
+        indexed = failed = 0
+        for filepath, outcome in analyze_files(stale, args, worker=_indexed_session):
+            if isinstance(outcome, Exception):
+                print(f"Error analyzing {filepath}: {outcome}", file=sys.stderr)
+                failed += 1
+                continue
+            index.store(outcome)
+            indexed += 1
+        pruned = index.prune() if args.prune else 0
+        
+        print(f"Indexed {indexed} file(s), {len(files) - len(stale)} unchanged"
+              + (f", {failed} failed" if failed else "")
+              + (f", {pruned} pruned" if args.prune else "")
+              + f" -> {index.path} ({len(index)} sessions)")
+
+
+def print_rows(columns: List[str], rows: List[tuple], as_json: bool = False):
+    """Print query results as an aligned table, or one JSON object per row."""
+    if as_json:
+        sys.stdout.write(''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows))
+        return
+    cells = [[('' if value is None else str(value)) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    numeric = [all(isinstance(row[i], (int, float)) or row[i] is None for row in rows) for i in range(len(columns))]
+    
+    def line(values):
+        return '  '.join(value.rjust(width) if right else value.ljust(width)
+                         for value, width, right in zip(values, widths, numeric)).rstrip()
+    
+    print(line(columns))
+    print(line(['-' * width for width in widths]))
+    for row in cells:
+        print(line(row))
+    print(f"({len(rows)} row{'s' if len(rows) != 1 else ''})")
+
+
+def query_main(argv: List[str]):
+    """``gpx_analyzer.py query``: aggregate questions answered from the session index."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py query',
+        description='Query the session index built by the index subcommand',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python gpx_analyzer.py query sessions --seasons 3 --min-anomaly-pct 5
+  python gpx_analyzer.py query totals --by week
+  python gpx_analyzer.py query anomalies --kind large_gap --limit 20
+  python gpx_analyzer.py query sql "SELECT season, sum(ski_vertical) FROM sessions GROUP BY season"
+        """
+    )
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument('--since', type=str, help='First local date (YYYY-MM-DD)')
+    filters.add_argument('--until', type=str, help='Last local date (YYYY-MM-DD)')
+    filters.add_argument('--seasons', type=int, help='Only the N most recent seasons in the index')
+    output = argparse.ArgumentParser(add_help=False)
+    add_index_arguments(output)
+    output.add_argument('--json', action='store_true', help='Print one JSON object per row')
+    
+    queries = parser.add_subparsers(dest='query', required=True)
+    sessions = queries.add_parser('sessions', parents=[filters, output], help='List sessions')
+    sessions.add_argument('--min-anomaly-pct', type=float,
+                          help='Only sessions with more than this percentage of anomalous intervals')
+    totals = queries.add_parser('totals', parents=[filters, output],
+                                help='Sessions, runs, vertical and distance per period')
+    totals.add_argument('--by', choices=GROUPINGS, default='week', help='Period (default: week)')
+    anomalies = queries.add_parser('anomalies', parents=[filters, output], help='List anomalies, longest first')
+    anomalies.add_argument('--kind', choices=('large_gap', 'short_interval', 'inconsistent'))
+    anomalies.add_argument('--min-seconds', type=float, help='Only intervals at least this long')
+    anomalies.add_argument('--limit', type=int, help='At most N rows')
+    sql = queries.add_parser('sql', parents=[output], help='Run an SQL statement against the index')
+    sql.add_argument('statement', help='Tables: sessions, anomalies (see gpx_index.py)')
+    args = parser.parse_args(argv)
+    
+    db = args.db if args.db is not None else default_index_path()
+    if not os.path.exists(db):
+        print(f"Error: no index at {db} (run: gpx_analyzer.py index <path>)", file=sys.stderr)
+        sys.exit(1)
+    
+    try:
+        index = SessionIndex(db, read_only=True)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    with index:
+        try:
+            if args.query == 'sessions':
+                columns, rows = index.sessions(args.since, args.until, args.seasons, args.min_anomaly_pct)
+            elif args.query == 'totals':
+                columns, rows = index.totals(args.by, args.since, args.until, args.seasons)
+            elif args.query == 'anomalies':
+                columns, rows = index.anomalies(args.kind, args.min_seconds, args.since, args.until,
+                                                args.seasons, args.limit)
+            else:
+                columns, rows = index.sql(args.statement)
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+    print_rows(columns, rows, args.json)
+
+
+def _spatial_matches(filepath: str, args) -> Tuple[Optional[timezone], List[List[Tuple[int, int, int]]]]:
+    """
+    Process-pool entry point for spatial: the track's UTC offset and, per
+    query area, the passes through it as (start us, end us, points).
+    """
+    track = parse_track_file(filepath, cache=track_cache_from_args(args))
+    matches = []
+    for area in args.areas:
+        indices = query_points(area, track.lat, track.lon)
+        visits = passes(indices, track.time_us, max_gap_seconds=args.gap)
+        bounds = np.searchsorted(indices, [last for _, last in visits], side='right')
+        counts = np.diff(np.concatenate([[0], bounds]))
+        matches.append([(int(track.time_us[first]), int(track.time_us[last]), int(count))
+                        for (first, last), count in zip(visits, counts)])
+    return track.tz, matches
+
+
+def spatial_main(argv: List[str]):
+    """``gpx_analyzer.py spatial``: sessions that passed through an area, and when."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py spatial',
+        description='Find the sessions passing through bounding boxes or circles. Files whose '
+                    '<metadata><bounds> miss every area are skipped without being parsed.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python gpx_analyzer.py spatial ../examples/ --bbox 46.440,9.810,46.446,9.816
+  python gpx_analyzer.py spatial season_archive/ -r --radius 46.4297,9.8112,150 --json
+        """
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('--bbox', action='append', default=[], metavar='MINLAT,MINLON,MAXLAT,MAXLON',
+                        help='Bounding box to search (repeatable)')
+    parser.add_argument('--radius', action='append', default=[], metavar='LAT,LON,METRES',
+                        help='Circle to search (repeatable)')
+    parser.add_argument('--gap', type=float, default=60,
+                        help='Seconds outside an area that start a new pass (default: 60)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--json', action='store_true',
+                        help='Print one JSON object per matching file and area')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    try:
+        args.areas = ([parse_area('bbox', text) for text in args.bbox] +
+                      [parse_area('radius', text) for text in args.radius])
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.areas:
+        parser.error('give at least one --bbox or --radius')
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # Header-only pruning: files whose declared bounds miss every area are never parsed
+    candidates = []
+    for filepath in files:
+        bounds = read_header_bounds(filepath) if track_suffix(filepath) == '.gpx' else None
+        if bounds is None or any(area.intersects(bounds) for area in args.areas):
+            candidates.append(filepath)
+    
+    if not args.json:
+        print(f"\n{'='*70}")
+        print(f"Spatial query: {len(files)} file(s), {len(files) - len(candidates)} pruned by header bounds")
+        print(f"{'='*70}")
+        for number, area in enumerate(args.areas, 1):
+            print(f"  Area {number}: {area}")
+    
+    matched = 0
+    for filepath, outcome in analyze_files(candidates, args, worker=_spatial_matches):
+        if isinstance(outcome, Exception):
+            print(f"Error analyzing {filepath}: {outcome}", file=sys.stderr)
+            continue
+        tz, matches = outcome
+        if not any(matches):
+            continue
+        matched += 1
+        if args.json:
+            for number, visits in enumerate(matches, 1):
+                if visits:
+                    print(json.dumps({
+                        'file': filepath, 'area': number, 'points': sum(n for _, _, n in visits),
+                        'passes': [{'start': epoch_us_to_datetime(start, tz).isoformat(),
+                                    'end': epoch_us_to_datetime(end, tz).isoformat(), 'points': n}
+                                   for start, end, n in visits]
+                    }))
+            continue
+        print(f"\n{os.path.basename(filepath)}")
+        for number, visits in enumerate(matches, 1):
+            if not visits:
+                continue
+            print(f"  Area {number}: {sum(n for _, _, n in visits)} points in {len(visits)} pass(es)")
+            for start, end, n in visits:
+                print(f"    {epoch_us_to_datetime(start, tz):%Y-%m-%d %H:%M:%S} - "
+                      f"{epoch_us_to_datetime(end, tz):%H:%M:%S}  ({n} point{'s' if n != 1 else ''})")
+    
+    if not args.json:
+        print(f"\n  Sessions matched: {matched}/{len(files)}")
+
+
+def _simplify_file(filepath: str, args) -> List[Tuple[LodLevel, str]]:
+    """Process-pool entry point for simplify: write one file's pyramid, return (level, output path)."""
+    track = parse_track_file(filepath, cache=track_cache_from_args(args))
+    levels = build_pyramid(track, args.levels, method=args.method, max_error_m=args.max_error)
+    stem = os.path.join(args.output_dir, Path(logical_name(filepath)).stem)
+    if args.format == 'binary':
+        write_pyramid(levels, stem + PYRAMID_SUFFIX)
+        return [(level, stem + PYRAMID_SUFFIX) for level in levels]
+    outputs = []
+    for level in levels:
+        output = f'{stem}.lod{level.label}.gpx'
+        write_gpx(level.track, output, name=f'{Path(logical_name(filepath)).stem} ({level.label}%)')
+        outputs.append((level, output))
+    return outputs
+
+
+def _parse_levels(text: str) -> List[float]:
+    try:
+        levels = [float(value) for value in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid levels {text!r}')
+    if not levels or any(not 0 < level <= 1 for level in levels):
+        raise argparse.ArgumentTypeError('levels are fractions in (0, 1]')
+    return levels
+
+
+def simplify_main(argv: List[str]):
+    """``gpx_analyzer.py simplify``: level-of-detail pyramids of tracks."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py simplify',
+        description='Write simplified copies of tracks at several levels of detail, as GPX files '
+                    'or one binary pyramid per track'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('--method', choices=METHODS, default='dp',
+                        help='dp = Douglas-Peucker (bounded distance), vw = Visvalingam-Whyatt '
+                             '(area based, smoother shapes) (default: dp)')
+    parser.add_argument('--levels', type=_parse_levels, default=list(DEFAULT_LEVELS),
+                        help='Comma-separated fractions of the points to keep (default: 1,0.1,0.01)')
+    parser.add_argument('--max-error', type=float, default=None, metavar='METRES',
+                        help='Keep more points where needed so no level deviates more than this')
+    parser.add_argument('--format', choices=('gpx', 'binary'), default='gpx',
+                        help=f'One GPX file per level, or one {PYRAMID_SUFFIX} file per track (default: gpx)')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='Directory for the simplified tracks (default: current directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    for filepath, outcome in analyze_files(files, args, worker=_simplify_file):
+        if isinstance(outcome, Exception):
+            print(f"Error simplifying {filepath}: {outcome}", file=sys.stderr)
+            continue
+        print(f"\n{os.path.basename(filepath)}")
+        for level, output in outcome:
+            print(f"  {level.label:>5}%  {len(level.track):>9} points  "
+                  f"max error {level.max_error_m:>7.2f}m  -> {output}")
+
+
+def _resample_file(filepath: str, args) -> Tuple[int, int, str]:
+    """Process-pool entry point for resample: write one file's grid, return (samples, gap samples, path)."""
+    track = parse_track_file(filepath, cache=track_cache_from_args(args))
+    resampled = resample(track, args.interval, max_gap_s=args.threshold)
+    stem = Path(logical_name(filepath)).stem
+    output = os.path.join(args.output_dir, f'{stem}.{args.format}')
+    if args.format == 'npz':
+        write_npz(resampled, output)
+    elif args.format == 'csv':
+        write_csv(resampled, output)
+    else:
+        write_resampled_gpx(resampled, output, name=f'{stem} ({args.interval:g}s)')
+    return len(resampled), resampled.gap_samples, output
+
+
+def resample_main(argv: List[str]):
+    """``gpx_analyzer.py resample``: tracks on a uniform time grid."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py resample',
+        description='Interpolate tracks onto a uniform time grid for comparing sessions. '
+                    'Gaps longer than the anomaly threshold are left empty, not interpolated.'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('-i', '--interval', type=float, default=DEFAULT_INTERVAL_S,
+                        help=f'Grid interval in seconds (default: {DEFAULT_INTERVAL_S:g}, i.e. 1 Hz; '
+                             f'5 for 0.2 Hz)')
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_MAX_GAP_S,
+                        help=f'Anomaly threshold in seconds: longer gaps are not interpolated '
+                             f'(default: {DEFAULT_MAX_GAP_S:g})')
+    parser.add_argument('--format', choices=RESAMPLE_FORMATS, default='npz',
+                        help='npz = fixed-stride NumPy arrays, csv = one row per grid time, '
+                             'gpx = the samples between gaps (default: npz)')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='Directory for the resampled tracks (default: current directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.interval <= 0:
+        parser.error('--interval must be positive')
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    for filepath, outcome in analyze_files(files, args, worker=_resample_file):
+        if isinstance(outcome, Exception):
+            print(f"Error resampling {filepath}: {outcome}", file=sys.stderr)
+            continue
+        samples, gap_samples, output = outcome
+        print(f"{os.path.basename(filepath)}: {samples} samples every {args.interval:g}s, "
+              f"{gap_samples} in gaps -> {output}")
+
+
+def _highscore_records(filepath: str, args) -> List[HighscoreRecord]:
+    """Process-pool entry point for highscores: one session's candidate records."""
+    return session_records(filepath, parse_track_file(filepath, cache=track_cache_from_args(args)), k=args.top)
+
+
+def print_highscores(highscores: Highscores):
+    for category, (label, unit) in HIGHSCORE_CATEGORIES.items():
+        print(f"\n{label}")
+        records = highscores.table(category)
+        if not records:
+            print("  (none)")
+        for rank, record in enumerate(records, 1):
+            print(f"  {rank:>2}. {record.value:>9.1f} {unit:<4}  {record.time:%Y-%m-%d %H:%M:%S}  "
+                  f"{record.lat:.5f},{record.lon:.5f}  {os.path.basename(record.file)}"
+                  + (f"  ({record.detail})" if record.detail else ""))
+
+
+def highscores_main(argv: List[str]):
+    """``gpx_analyzer.py highscores``: personal records across an archive."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py highscores',
+        description='Top speed, longest run, biggest vertical and other records over all sessions, '
+                    'with the session, time and position each was set at'
+    )
+    parser.add_argument('path', help='Path to GPX/FIT file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('-k', '--top', type=int, default=DEFAULT_TOP_K,
+                        help=f'Records kept per category (default: {DEFAULT_TOP_K})')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--json', action='store_true', help='Print the records as JSON')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.top < 1:
+        parser.error('--top must be at least 1')
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    highscores = Highscores(args.top)
+    for filepath, outcome in analyze_files(files, args, worker=_highscore_records):
+        if isinstance(outcome, Exception):
+            print(f"Error analyzing {filepath}: {outcome}", file=sys.stderr)
+            continue
+        highscores.update(outcome)
+    
+    if args.json:
+        print(json.dumps(highscores.to_dict(), indent=2))
+    else:
+        print(f"Personal records over {len(files)} session(s)")
+        print_highscores(highscores)
+
+
+def print_structure(structure: GpxStructure):
+    print(f"\n{structure.filepath}  ({structure.bytes_read} bytes read)")
+    print(f"  Root: <{structure.root}> version {structure.version}, XML encoding {structure.xml_encoding}")
+    print(f"  Namespace: {structure.namespace or '(none)'}")
+    for prefix, uri in structure.namespaces.items():
+        print(f"    xmlns{':' + prefix if prefix else ''}={uri}")
+    print(f"  Creator: {structure.creator}")
+    print(f"  Fast-path writer profile: {structure.writer_profile or '(none, XML parser)'}")
+    
+    print(f"  Tracks: {structure.tracks}, segments: {structure.segments}, track points: {structure.trackpoints}")
+    if structure.segments:
+        listed = ', '.join(str(n) for n in structure.segment_points)
+        more = ', ...' if structure.segments > len(structure.segment_points) else ''
+        print(f"    Points per segment: {listed}{more} "
+              f"(min {structure.min_segment_points}, max {structure.max_segment_points})")
+    for label, count in (('outside any <trkseg>', structure.points_outside_segments),
+                         ('without lat/lon', structure.points_without_position),
+                         ('without <time>', structure.points_without_time)):
+        if count:
+            print(f"    Points {label}: {count}")
+    
+    print("  Timestamp formats:")
+    for shape, count in structure.time_formats.items():
+        print(f"    {count:>9}  {shape}  (e.g. {structure.time_examples[shape]})")
+    if structure.other_time_formats:
+        print(f"    {structure.other_time_formats:>9}  (other formats)")
+    
+    print("  Elements:")
+    for name, count in sorted(structure.elements.items(), key=lambda item: -item[1]):
+        print(f"    {count:>9}  {name}")
+    if structure.extensions:
+        print("  Extension elements:")
+        for name, count in sorted(structure.extensions.items(), key=lambda item: -item[1]):
+            print(f"    {count:>9}  {name}")
+    
+    error = structure.error
+    if error is None:
+        print("  Well-formed: yes")
+    else:
+        print(f"  Well-formed: NO - {error.message} at byte {error.offset} "
+              f"(line {error.line}, column {error.column})")
+        print(f"    near: {error.context!r}")
+
+
+def inspect_main(argv: List[str]):
+    """``gpx_analyzer.py inspect``: structure of GPX files, for files that won't parse."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py inspect',
+        description='Report the namespace, creator, element and extension counts, segment layout, '
+                    'timestamp formats and the first malformed offset of GPX files, in one streaming '
+                    'pass with bounded memory'
+    )
+    parser.add_argument('path', help='Path to GPX file, directory or glob pattern')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per file')
+    args = parser.parse_args(argv)
+    
+    try:
+        files = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    for filepath in files:
+        if track_suffix(filepath) != '.gpx':
+            print(f"Skipping {filepath}: not a GPX file", file=sys.stderr)
+            continue
+        try:
+            structure = inspect_gpx(filepath)
+        except (OSError, EOFError, zlib.error, zipfile.BadZipFile) as e:
+            print(f"Error reading {filepath}: {e}", file=sys.stderr)
+            continue
+        if args.json:
+            print(json.dumps(structure.to_dict()))
+        else:
+            print_structure(structure)
+
+
+def _segment_points(filepath: str, decoder: 'TimestampDecoder') -> Iterator[Tuple[int, PointRow]]:
+    """(segment, point) stream of one file for merging (a FIT file is one segment)."""
+    if track_suffix(filepath) == '.fit':
+        return ((0, point) for point in iter_fit_points(filepath))
+    return iter_gpx_points(filepath, decoder, segments=True)
+
+
+def merge_main(argv: List[str]):
+    """``gpx_analyzer.py merge``: combine split or overlapping recordings into one track."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py merge',
+        description='Merge several recordings of the same day (e.g. temp_recording.gpx and the final '
+                    'export, or two phones) in time order, dropping duplicate points and keeping '
+                    'segment boundaries. Writes the merged GPX with -o, else analyzes it.'
+    )
+    parser.add_argument('paths', nargs='+', help='GPX/FIT files, directories or glob patterns to merge')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Recursively search for GPX files in directories')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Write the merged track to this GPX file instead of analyzing it')
+    parser.add_argument('--name', type=str, default=None,
+                        help='Track name in the merged GPX (default: the output file name)')
+    parser.add_argument('-t', '--threshold', type=float, default=120,
+                        help='Anomaly threshold in seconds (default: 120)')
+    parser.add_argument('--min-interval', type=float, default=0.5,
+                        help='Minimum expected interval in seconds (default: 0.5)')
+    args = parser.parse_args(argv)
+    
+    try:
+        files = [f for path in args.paths for f in find_track_files(path, args.recursive)]
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    decoders = [TimestampDecoder() for _ in files]
+    merger = TrackMerger([_segment_points(f, decoder) for f, decoder in zip(files, decoders)], names=files)
+    try:
+        if args.output:
+            name = args.name or Path(args.output).stem
+            write_gpx_stream(merger, args.output, name)
+        else:
+            analyzer = StreamingIntervalAnalyzer(args.threshold, args.min_interval)
+            for point, new_segment in merger:
+                analyzer.add(point, new_segment)
+            analyzer.tz = next((decoder.tz for decoder in decoders if decoder.tz), None)
+            print_analysis(analyzer.result(' + '.join(os.path.basename(f) for f in files)))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(f"\nMerged {len(files)} file(s): {sum(merger.points_read)} points read, "
+          f"{merger.duplicates} duplicate(s) dropped, {merger.points} points in {merger.segments} segment(s)"
+          + (f" -> {args.output}" if args.output else ""))
+
+
+# Operations answered by serve: name -> parameters with their defaults
+SERVE_OPERATIONS = {
+    'analyze': {'threshold': 120.0, 'min_interval': 0.5},
+    'stats': {},
+}
+
+
+def _serve_request(cache: Optional[TrackCache], operation: str, filepath: str, params: dict,
+                   track: Optional[Track]) -> Tuple[Optional[Track], dict]:
+    """
+    Process-pool entry point for serve: answer one operation, parsing the
+    file unless the server already holds its track. Returns the track if
+    it was parsed (for the server's memory cache) and the JSON payload.
+    """
+    parsed = None
+    if track is None:
+        track = parsed = parse_track_file(filepath, cache=cache)
+    
+    if operation == 'stats':
+        return parsed, {'file': filepath, **calculate_session_stats(track).to_dict()}
+    
+    result = analyze_intervals(track, anomaly_threshold_seconds=params['threshold'],
+                               min_interval_seconds=params['min_interval'])
+    result.filename = filepath
+    return parsed, {
+        **dict(zip(FILE_FIELDS, file_row(result))),
+        'anomalies': [dict(zip(ANOMALY_FIELDS[1:], row[1:])) for row in anomaly_rows(result)],
+    }
+
+
+def serve_main(argv: List[str]):
+    """``gpx_analyzer.py serve``: answer analyze/stats requests from a warm process."""
+    parser = argparse.ArgumentParser(
+        prog='gpx_analyzer.py serve',
+        description='Answer analyze and stats requests from a long-running process that keeps '
+                    'parsed tracks and results in memory',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Requests (parameters default to the command line's defaults):
+  HTTP         GET /analyze?path=track.gpx&threshold=60&min_interval=0.5
+               GET /stats?path=track.gpx
+               GET /status
+  Unix socket  one JSON object per line, answered with one JSON line:
+               {"op": "analyze", "path": "track.gpx", "threshold": 60}
+
+Examples:
+  python gpx_analyzer.py serve
+  python gpx_analyzer.py serve --socket /tmp/gpx_analyzer.sock --jobs 4 --memory 512
+  curl 'http://127.0.0.1:8765/stats?path=/data/Day_7.gpx'
+        """
+    )
+    listen = parser.add_mutually_exclusive_group()
+    listen.add_argument('--socket', metavar='PATH',
+                        help='Listen on a Unix socket instead of HTTP')
+    listen.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'HTTP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f'HTTP address (default: {DEFAULT_HOST})')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Worker processes for parsing and analysis (0 = one per CPU, default: 0)')
+    parser.add_argument('--memory', type=float, default=DEFAULT_MEMORY_MB,
+                        help=f'In-memory cache of tracks and results in MB (default: {DEFAULT_MEMORY_MB})')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    if args.socket and not hasattr(socket, 'AF_UNIX'):
+        parser.error('Unix sockets are not available on this platform')
+    
+    def ready(server):
+        address = args.socket or 'http://{}:{}/'.format(*server.sockets[0].getsockname()[:2])
+        print(f"Serving on {address} (Ctrl-C to stop)", file=sys.stderr, flush=True)
+    
+    server = AnalysisServer(
+        partial(_serve_request, track_cache_from_args(args)),
+        SERVE_OPERATIONS,
+        partial(ProcessPoolExecutor, max_workers=args.jobs or os.cpu_count() or 1, initializer=init_worker),
+        memory_bytes=int(args.memory * (1 << 20))
+    )
+    try:
+        server.run(args.socket, args.host, args.port, on_ready=ready)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+# Subcommands selected by the first command-line argument; anything else is
+# the interval analysis taking a path, as before.
+SUBCOMMANDS = {
+    'detect-runs': detect_runs_main,
+    'session-stats': session_stats_main,
+    'index': index_main,
+    'query': query_main,
+    'spatial': spatial_main,
+    'simplify': simplify_main,
+    'merge': merge_main,
+    'resample': resample_main,
+    'highscores': highscores_main,
+    'inspect': inspect_main,
+    'serve': serve_main,
+}
+
+
+def main(argv: Optional[List[str]] = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
+    
     parser = argparse.ArgumentParser(
         description='Analyze GPX files for waypoint interval anomalies',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -396,10 +2179,15 @@ Examples:
   python gpx_analyzer.py track.gpx
   python gpx_analyzer.py ../examples/ --recursive
   python gpx_analyzer.py *.gpx --threshold 60 --verbose
+  python gpx_analyzer.py ../examples/ --format jsonl --records anomalies
+  python gpx_analyzer.py ../examples/ -o intervals.csv --records intervals
+  python gpx_analyzer.py detect-runs ../examples/
+  python gpx_analyzer.py session-stats ../examples/ --jobs 0
+  python gpx_analyzer.py index ../examples/ && python gpx_analyzer.py query totals --by week
         """
     )
     
-    parser.add_argument('path', help='Path to GPX file or directory')
+    parser.add_argument('path', nargs='?', help='Path to GPX/FIT file or directory')
     parser.add_argument('-r', '--recursive', action='store_true',
                         help='Recursively search for GPX files in directories')
     parser.add_argument('-t', '--threshold', type=float, default=120,
@@ -409,77 +2197,136 @@ Examples:
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Show detailed interval listing')
     parser.add_argument('-o', '--output', type=str,
-                        help='Save report to file')
+                        help='Save report to file (- for stdout with --format jsonl/csv)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=None,
+                        help='Report format: markdown, JSON Lines or CSV (default: from the --output '
+                             'suffix, .jsonl/.ndjson/.csv, else markdown). JSON Lines and CSV go to '
+                             'stdout without --output, replacing the text report')
+    parser.add_argument('--records', choices=RECORD_KINDS, default='files',
+                        help='Rows of a JSON Lines/CSV report: one per file, per anomaly or per '
+                             'interval (default: files)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Single pass in file order with constant memory: online z-scores, '
+                             'approximate median, bounded anomaly list (see --max-anomalies)')
+    parser.add_argument('--max-anomalies', type=int, default=None,
+                        help='With --stream/--follow, retain at most N anomalies for the report')
+    parser.add_argument('--keep', choices=RETENTION_POLICIES, default='first',
+                        help='Which anomalies --max-anomalies retains: the first N or the worst N '
+                             '(default: first)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Analyze files in N worker processes (0 = one per CPU, default: 1)')
+    parser.add_argument('-f', '--follow', action='store_true',
+                        help='Keep analyzing a file that is still being recorded '
+                             '(e.g. temp_recording.gpx), reading only newly appended points')
+    parser.add_argument('--poll', type=float, default=5,
+                        help='Seconds between refreshes in --follow mode (default: 5)')
+    add_cache_arguments(parser)
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='Delete all cached tracks before analyzing')
+    parser.add_argument('--profile', action='store_true',
+                        help='Report wall time and allocations per stage (read, parse, timestamp '
+                             'decode, interval analysis, rendering) per file and in total, on stderr')
+    parser.add_argument('--profile-json', type=str, metavar='FILE',
+                        help='With --profile, also save the stage profile as JSON')
+    parser.add_argument('--pstats', type=str, metavar='FILE',
+                        help='Run under cProfile and dump the statistics to FILE '
+                             '(with --jobs only the main process is profiled)')
+    
+    args = parser.parse_args(argv)
     
-    args = parser.parse_args()
+    if args.clear_cache:
+        removed = TrackCache(args.cache_dir).clear()
+        print(f"Cleared {removed} cached track(s)")
+        if args.path is None:
+            return
+    if args.path is None:
+        parser.error('the following arguments are required: path')
+    if args.format is None:
+        args.format = format_for_path(args.output)
+    if args.format == 'markdown' and args.records != 'files':
+        parser.error('--records needs --format jsonl or csv')
+    if args.records == 'intervals' and args.stream:
+        parser.error('--records intervals needs the whole-track analysis (not --stream)')
+    
+    if args.follow and (is_packed(args.path) or args.path.lower().endswith(ARCHIVE_SUFFIX)):
+        parser.error('--follow needs a plain GPX file (compressed files and archives are not appended to)')
+    if args.follow:
+        follow_file(args.path, args)
+        return
     
     # Collect files to analyze
-    files_to_analyze = []
-    path = Path(args.path)
+    try:
+        files_to_analyze = find_track_files(args.path, args.recursive)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
     
-    if path.is_file():
-        if path.suffix.lower() == '.gpx':
-            files_to_analyze.append(str(path))
-        else:
-            print(f"Error: {path} is not a GPX file", file=sys.stderr)
-            sys.exit(1)
-    elif path.is_dir():
-        pattern = '**/*.gpx' if args.recursive else '*.gpx'
-        files_to_analyze = [str(f) for f in path.glob(pattern)]
-        
-        if not files_to_analyze:
-            print(f"No GPX files found in {path}", file=sys.stderr)
-            sys.exit(1)
+    # Analyze all files
+    if args.profile and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profile_report = ProfileReport() if args.profile else None
+    profiler = cProfile.Profile() if args.pstats else None
+    if profiler:
+        profiler.enable()
+    
+    # Reports are written as each file finishes; only the summary counts are kept
+    if args.format == 'markdown':
+        report = MarkdownReport(args.output) if args.output else None
     else:
-        # Handle glob patterns
-        import glob as glob_module
-        files_to_analyze = glob_module.glob(args.path)
-        if not files_to_analyze:
-            print(f"No files match pattern: {args.path}", file=sys.stderr)
-            sys.exit(1)
+        report = open_record_writer(args.output, args.format, args.records)
+    # JSON Lines/CSV on stdout replace the text report
+    text_report = args.format == 'markdown' or args.output not in (None, '-')
     
-    # Analyze all files
-    results = []
-    for filepath in files_to_analyze:
-        try:
-            result = analyze_file(filepath, args)
-            results.append(result)
-            print_analysis(result, args.verbose)
-        except Exception as e:
-            print(f"Error analyzing {filepath}: {e}", file=sys.stderr)
+    analyzed = total_waypoints = total_anomalies = files_with_anomalies = 0
+    for filepath, outcome in analyze_files(files_to_analyze, args):
+        if isinstance(outcome, Exception):
+            print(f"Error analyzing {filepath}: {outcome}", file=sys.stderr)
+            continue
+        analyzed += 1
+        total_waypoints += outcome.total_waypoints
+        total_anomalies += outcome.statistics['anomaly_count']
+        files_with_anomalies += bool(outcome.anomalies)
+        with outcome.profile.stage('render') if outcome.profile else _NO_STAGE:
+            if text_report:
+                print_analysis(outcome, args.verbose)
+            if report:
+                report.write_result(outcome)
+        if profile_report:
+            profile_report.add(outcome.profile)
+    if report:
+        report.close()
+    
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.pstats)
     
     # Summary
-    if len(results) > 1:
+    if analyzed > 1 and text_report:
         print(f"\n{'='*70}")
-        print(f"SUMMARY: Analyzed {len(results)} files")
+        print(f"SUMMARY: Analyzed {analyzed} files")
         print(f"{'='*70}")
-        total_anomalies = sum(r.statistics['anomaly_count'] for r in results)
-        total_waypoints = sum(r.total_waypoints for r in results)
         print(f"  Total waypoints: {total_waypoints}")
         print(f"  Total anomalies: {total_anomalies}")
-        print(f"  Files with anomalies: {sum(1 for r in results if r.anomalies)}/{len(results)}")
-    
-    # Save to file if requested
-    if args.output and results:
-        with open(args.output, 'w') as f:
-            f.write("# GPX Interval Analysis Report\n\n")
-            for result in results:
-                f.write(f"## {result.filename}\n\n")
-                f.write(f"- Total waypoints: {result.total_waypoints}\n")
-                f.write(f"- Total duration: {format_duration(result.total_duration_seconds)}\n")
-                f.write(f"- Mean interval: {result.statistics['mean_interval']:.2f}s\n")
-                f.write(f"- Anomalies: {result.statistics['anomaly_count']}\n\n")
-                
-                if result.anomalies:
-                    f.write("### Anomalies:\n\n")
-                    for anomaly in result.anomalies:
-                        f.write(f"- {anomaly.anomaly_type}\n")
-                        f.write(f"  Time: {anomaly.from_waypoint.timestamp.isoformat()} -> "
-                               f"{anomaly.to_waypoint.timestamp.isoformat()}\n")
-                        f.write(f"  Interval: {anomaly.interval_seconds:.2f}s\n\n")
-        
+        print(f"  Files with anomalies: {files_with_anomalies}/{analyzed}")
+    
+    if report and text_report and analyzed:
         print(f"\nReport saved to: {args.output}")
+    
+    if profile_report:
+        profile_report.print()
+        if args.profile_json:
+            with open(args.profile_json, 'w') as f:
+                json.dump(profile_report.to_dict(), f, indent=2)
+    if profiler:
+        print(f"cProfile statistics saved to: {args.pstats} "
+              f"(python -m pstats {args.pstats})", file=sys.stderr)
 
 
 if __name__ == '__main__':
-    main()
+    try:
+        main()
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`): stop quietly, with stdout pointed at devnull so the
+        # interpreter's final flush doesn't fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
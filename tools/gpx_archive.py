@@ -0,0 +1,148 @@
+"""
+Track sources inside compressed files and zip archives.
+
+Season archives are stored compressed. Besides plain files, a track path
+can name
+
+    Day_5.gpx.gz, Day_5.gpx.bz2     a compressed GPX file
+    season.zip::2024/Day_5.gpx      a GPX member of a zip archive
+
+open_source() opens any of them for binary reading and decompresses as
+the caller reads, so the parsers consume them in one streaming pass with
+no temporary files and no inflated copy in memory. archive_members()
+lists the tracks in a zip for file discovery.
+
+Cache and index keys come from source_stat() and source_hash() without
+inflating anything: a compressed file is identified by its own size,
+mtime and content hash; a zip member by its size and CRC-32 from the
+zip directory. source_stat() reports the archive's mtime for a member,
+but the track cache leaves it out of a member's key and the session
+index falls back to the CRC when it moves, so rewriting an archive only
+invalidates the members that actually changed.
+"""
+
+import bz2
+import gzip
+import hashlib
+import os
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+
+# Separates a zip archive's path from the member name
+MEMBER_SEPARATOR = '::'
+ARCHIVE_SUFFIX = '.zip'
+COMPRESSED_SUFFIXES = ('.gz', '.bz2')
+# Track formats read from compressed files and archives (FIT files are decoded from a memory map)
+PACKED_TRACK_SUFFIXES = ('.gpx',)
+
+_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open}
+
+
+def split_member(path: str) -> Tuple[str, Optional[str]]:
+    """(archive path, member name) of an archive member path, else (path, None)."""
+    archive, separator, member = path.partition(MEMBER_SEPARATOR)
+    return (archive, member) if separator else (path, None)
+
+
+def member_path(archive: str, member: str) -> str:
+    return f'{archive}{MEMBER_SEPARATOR}{member}'
+
+
+def _compression(path: str) -> Optional[str]:
+    suffix = os.path.splitext(path)[1].lower()
+    return suffix if suffix in COMPRESSED_SUFFIXES else None
+
+
+def is_packed(path: str) -> bool:
+    """Whether path is a compressed file or an archive member (not readable with a plain open())."""
+    return split_member(path)[1] is not None or _compression(path) is not None
+
+
+def logical_name(path: str) -> str:
+    """The track's own file name: the member name, or the path without its compression suffix."""
+    archive, member = split_member(path)
+    if member is not None:
+        return member
+    return path[:-len(_compression(path))] if _compression(path) else path
+
+
+def track_suffix(path: str) -> str:
+    """Lower-case suffix of the track inside path ('.gpx' for 'Day_5.gpx.gz')."""
+    return PurePosixPath(logical_name(path).replace('\\', '/')).suffix.lower()
+
+
+def absolute_source(path: str) -> str:
+    archive, member = split_member(path)
+    archive = os.path.abspath(archive)
+    return archive if member is None else member_path(archive, member)
+
+
+def _member_info(archive: str, member: str) -> zipfile.ZipInfo:
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            return zf.getinfo(member)
+        except KeyError:
+            raise FileNotFoundError(f'{member} not found in {archive}')
+
+
+def open_source(path: str) -> BinaryIO:
+    """Open a plain, compressed or archived track for streaming binary reads."""
+    archive, member = split_member(path)
+    if member is not None:
+        zf = zipfile.ZipFile(archive)
+        try:
+            # The member keeps the archive's file open until it is closed itself
+            return zf.open(member)
+        except KeyError:
+            raise FileNotFoundError(f'{member} not found in {archive}')
+        finally:
+            zf.close()
+    compression = _compression(path)
+    if compression is not None:
+        return _OPENERS[compression](path, 'rb')
+    return open(path, 'rb')
+
+
+def source_stat(path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of a track source; for a member, its uncompressed size and the archive's mtime."""
+    archive, member = split_member(path)
+    stat = os.stat(archive)
+    if member is None:
+        return stat.st_size, stat.st_mtime_ns
+    return _member_info(archive, member).file_size, stat.st_mtime_ns
+
+
+def file_content_hash(filepath: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(path: str) -> str:
+    """Content fingerprint: the file's hash, or a member's CRC-32 from the zip directory."""
+    archive, member = split_member(path)
+    if member is None:
+        return file_content_hash(path)
+    return f'crc32:{_member_info(archive, member).CRC:08x}'
+
+
+def source_exists(path: str) -> bool:
+    try:
+        source_stat(path)
+    except (OSError, zipfile.BadZipFile):
+        return False
+    return True
+
+
+def archive_members(archive: str, suffixes: Sequence[str] = PACKED_TRACK_SUFFIXES) -> List[str]:
+    """Member paths of the tracks in a zip archive, in archive order (raises ValueError if it isn't a zip)."""
+    try:
+        with zipfile.ZipFile(archive) as zf:
+            names = [info.filename for info in zf.infolist() if not info.is_dir()]
+    except zipfile.BadZipFile as e:
+        raise ValueError(f'{archive}: {e}')
+    return [member_path(archive, name) for name in names
+            if PurePosixPath(name).suffix.lower() in suffixes and not name.startswith('__MACOSX/')]
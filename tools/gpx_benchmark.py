@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+GPX Analyzer Benchmarks
+
+Generates deterministic synthetic ski days of any size and measures the
+analyzer's stages on them: GPX parsing (the known-writer scanner and the
+XML path), timestamp parsing, distance computation, interval analysis
+and the whole per-file analysis. Every benchmark runs in a fresh interpreter so its peak RSS is its own, and
+reports throughput (points/s), peak RSS and the tracemalloc peak as JSON.
+
+Usage:
+    python gpx_benchmark.py [--points N ...] [options]
+
+Examples:
+    python gpx_benchmark.py --points 100000 1000000 -o results.json
+    python gpx_benchmark.py --points 10000000 --only parse_gpx_file analyze_intervals
+    python gpx_benchmark.py --points 100000 --compare results.json
+    python gpx_benchmark.py --generate day.gpx --points 500000
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from gpx_cache import decode_track, encode_track
+from gpx_track import Track, haversine_distance
+from gpx_writer import iso_instant, write_gpx
+
+SCHEMA_VERSION = 1
+DEFAULT_SEED = 2025
+SYNTHETIC_NAME = 'Synthetic_Ski_Day'
+# 2025-01-15T08:30:00Z, the start of every synthetic day
+DEFAULT_START_US = 1736929800 * 1_000_000
+
+# Synthetic ski area: valley station and summit
+BASE_LAT, BASE_LON = 46.0, 7.5
+BASE_ELEVATION = 1800.0
+SUMMIT_ELEVATION = 2750.0
+METERS_PER_DEGREE = 111320.0
+
+# Probability per point of a recording gap, and the gap length range (s)
+GAP_PROBABILITY = 1 / 3000
+GAP_SECONDS = (150, 900)
+# Probability per point of a short (sub-second) interval
+SHORT_INTERVAL_PROBABILITY = 1 / 2000
+
+
+def generate_ski_track(points: int, seed: int = DEFAULT_SEED, start_us: int = DEFAULT_START_US) -> Track:
+    """
+    Build a deterministic synthetic ski day with ``points`` trackpoints.
+
+    The day repeats cycles of: queue at the valley station, lift ride to
+    the summit, a short stop, then a carving descent back down. Points are
+    about one second apart (millisecond jitter), with occasional recording
+    gaps (GAP_SECONDS) and sub-second intervals. Each cycle ends where it
+    started, so positions and elevations stay within the area however long
+    the track is.
+    """
+    rng = np.random.default_rng(seed)
+    span = SUMMIT_ELEVATION - BASE_ELEVATION
+
+    # Enough cycles to cover the requested points (a cycle is at least ~605 points)
+    cycles = points // 600 + 1
+    lift_seconds = np.round(span / rng.uniform(2.0, 3.0, cycles)).astype(np.int64)
+    descent_seconds = np.round(span / rng.uniform(1.5, 4.0, cycles)).astype(np.int64)
+    queue_seconds = rng.integers(30, 180, cycles)
+    stop_seconds = rng.integers(20, 90, cycles)
+    headings = rng.uniform(0, 2 * np.pi, cycles)
+    lift_speeds = rng.uniform(3.0, 6.0, cycles)
+
+    # Phases in order queue, lift, stop, descent for each cycle
+    durations = np.stack([queue_seconds, lift_seconds, stop_seconds, descent_seconds], axis=1).ravel()
+    kind = np.tile(np.arange(4), cycles)
+    cycle = np.repeat(np.arange(cycles), 4)
+    phase = np.repeat(np.arange(len(durations)), durations)[:points]
+    phase_start = np.concatenate(([0], np.cumsum(durations)[:-1]))
+    t_in_phase = np.arange(len(phase)) - phase_start[phase]
+
+    point_kind = kind[phase]
+    point_cycle = cycle[phase]
+    duration = durations[phase].astype(np.float64)
+    heading = headings[point_cycle]
+    lift_distance = lift_speeds[point_cycle] * lift_seconds[point_cycle]
+
+    # Per-step movement along the lift line (forward) and across it (lateral)
+    forward = np.zeros(len(phase))
+    lateral = np.zeros(len(phase))
+    vertical = np.zeros(len(phase))
+    is_lift = point_kind == 1
+    is_descent = point_kind == 3
+    forward[is_lift] = lift_distance[is_lift] / duration[is_lift]
+    vertical[is_lift] = span / duration[is_lift]
+    forward[is_descent] = -lift_distance[is_descent] / duration[is_descent]
+    vertical[is_descent] = -span / duration[is_descent]
+    # Carving: lateral speed is a whole number of sine periods, so it integrates back to zero
+    turns = np.maximum(np.round(duration[is_descent] / 25), 1)
+    lateral[is_descent] = 12.0 * np.sin(2 * np.pi * turns * t_in_phase[is_descent] / duration[is_descent])
+
+    east = np.cumsum(forward * np.sin(heading) + lateral * np.cos(heading))
+    north = np.cumsum(forward * np.cos(heading) - lateral * np.sin(heading))
+    elevation = BASE_ELEVATION + np.cumsum(vertical)
+
+    # GPS noise (not accumulated)
+    east += rng.normal(0, 1.5, len(phase))
+    north += rng.normal(0, 1.5, len(phase))
+    elevation += rng.normal(0, 0.8, len(phase))
+
+    # 1 s fixes with millisecond jitter, as the app's location updates arrive
+    intervals_us = (1000 + rng.integers(-25, 26, len(phase))) * 1000
+    gaps = rng.random(len(phase)) < GAP_PROBABILITY
+    intervals_us[gaps] = rng.integers(*GAP_SECONDS, gaps.sum()) * 1_000_000
+    short = rng.random(len(phase)) < SHORT_INTERVAL_PROBABILITY
+    intervals_us[short] = rng.integers(100, 500, short.sum()) * 1000
+    intervals_us[0] = 0
+
+    lat = BASE_LAT + north / METERS_PER_DEGREE
+    lon = BASE_LON + east / (METERS_PER_DEGREE * np.cos(np.radians(BASE_LAT)))
+    accuracy = np.round(rng.uniform(3.0, 15.0, len(phase)), 1)
+    return Track(
+        lat=np.round(lat, 7),
+        lon=np.round(lon, 7),
+        ele=np.round(elevation, 1),
+        time_us=start_us + np.cumsum(intervals_us),
+        accuracy=np.ma.MaskedArray(accuracy, mask=np.zeros(len(phase), dtype=bool))
+    )
+
+
+# Benchmarks: each takes the paths of the GPX file and of the same track in
+# cache format, does its untimed setup and returns (timed callable, points).
+
+def _bench_parse_gpx_file(gpx_path: str, track_path: str):
+    from gpx_analyzer import parse_gpx_file
+    points = len(_load_track(track_path))
+    return (lambda: parse_gpx_file(gpx_path)), points
+
+
+def _bench_parse_gpx_xml(gpx_path: str, track_path: str):
+    from gpx_analyzer import iter_gpx_points
+    points = len(_load_track(track_path))
+    return (lambda: Track.from_rows(iter_gpx_points(gpx_path))), points
+
+
+def _bench_parse_timestamp(gpx_path: str, track_path: str):
+    from gpx_analyzer import parse_timestamp
+    track = _load_track(track_path)
+    # One string per point is a lot of memory at 10M points; a fixed sample is representative
+    sample = [iso_instant(t) for t in track.time_us[:200_000].tolist()]
+    return (lambda: [parse_timestamp(s) for s in sample]), len(sample)
+
+
+def _bench_timestamp_decoder(gpx_path: str, track_path: str):
+    from gpx_analyzer import TimestampDecoder
+    track = _load_track(track_path)
+    sample = [iso_instant(t) for t in track.time_us[:200_000].tolist()]
+
+    def run():
+        decoder = TimestampDecoder()
+        return [decoder.decode_us(s) for s in sample]
+    return run, len(sample)
+
+
+def _bench_haversine_distance(gpx_path: str, track_path: str):
+    track = _load_track(track_path)
+    lat1, lon1, lat2, lon2 = track.lat[:-1], track.lon[:-1], track.lat[1:], track.lon[1:]
+    return (lambda: haversine_distance(lat1, lon1, lat2, lon2)), len(track)
+
+
+def _bench_analyze_intervals(gpx_path: str, track_path: str):
+    from gpx_analyzer import analyze_intervals
+    track = _load_track(track_path)
+    return (lambda: analyze_intervals(track)), len(track)
+
+
+def _analysis_args(**overrides) -> argparse.Namespace:
+    defaults = dict(threshold=120, min_interval=0.5, verbose=False, stream=False,
+                    max_anomalies=None, keep='first', no_cache=True, jobs=1)
+    defaults.update(overrides)
+    return argparse.Namespace(**defaults)
+
+
+def _bench_end_to_end(gpx_path: str, track_path: str):
+    from gpx_analyzer import analyze_file
+    points = len(_load_track(track_path))
+    return (lambda: analyze_file(gpx_path, _analysis_args())), points
+
+
+def _bench_end_to_end_stream(gpx_path: str, track_path: str):
+    from gpx_analyzer import analyze_file
+    points = len(_load_track(track_path))
+    return (lambda: analyze_file(gpx_path, _analysis_args(stream=True, max_anomalies=1000))), points
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'parse_gpx_file': _bench_parse_gpx_file,
+    'parse_gpx_xml': _bench_parse_gpx_xml,
+    'parse_timestamp': _bench_parse_timestamp,
+    'timestamp_decoder': _bench_timestamp_decoder,
+    'haversine_distance': _bench_haversine_distance,
+    'analyze_intervals': _bench_analyze_intervals,
+    'end_to_end': _bench_end_to_end,
+    'end_to_end_stream': _bench_end_to_end_stream,
+}
+
+
+def _load_track(track_path: str) -> Track:
+    with open(track_path, 'rb') as f:
+        return decode_track(f.read())
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_benchmark(name: str, gpx_path: str, track_path: str, repeat: int = 3) -> dict:
+    """
+    Run one benchmark in the current process.
+
+    Timing is the best of ``repeat`` untraced runs; the tracemalloc peak
+    comes from one extra traced run, since tracing slows allocation down.
+    """
+    run, points = BENCHMARKS[name](gpx_path, track_path)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'name': name,
+        'points': points,
+        'seconds': best,
+        'seconds_all': timings,
+        'points_per_second': points / best if best > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'tracemalloc_peak_mb': traced_peak / (1 << 20),
+    }
+
+
+def run_suite(
+    sizes: List[int],
+    names: List[str],
+    workdir: str,
+    seed: int = DEFAULT_SEED,
+    repeat: int = 3,
+    isolate: bool = True,
+    log: Callable[[str], None] = lambda message: None
+) -> dict:
+    """Generate one track per size and run every named benchmark against it."""
+    results = []
+    for size in sizes:
+        gpx_path = os.path.join(workdir, f'synthetic_{size}_{seed}.gpx')
+        track_path = os.path.join(workdir, f'synthetic_{size}_{seed}.track')
+        if not (os.path.exists(gpx_path) and os.path.exists(track_path)):
+            log(f"Generating {size:,} points...")
+            track = generate_ski_track(size, seed)
+            write_gpx(track, gpx_path, SYNTHETIC_NAME)
+            with open(track_path, 'wb') as f:
+                f.write(encode_track(track))
+            del track
+
+        for name in names:
+            log(f"  {name} ({size:,} points)...")
+            if isolate:
+                # A fresh interpreter per benchmark so peak RSS is not inherited from earlier ones
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                    result = executor.submit(run_benchmark, name, gpx_path, track_path, repeat).result()
+            else:
+                result = run_benchmark(name, gpx_path, track_path, repeat)
+            result['track_points'] = size
+            results.append(result)
+            log(f"    {result['seconds']:.3f}s  {result['points_per_second'] or 0:,.0f} points/s  "
+                f"RSS {result['peak_rss_mb']:.0f} MB  traced {result['tracemalloc_peak_mb']:.1f} MB")
+
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Describe benchmarks that got slower than baseline by more than ``tolerance`` (a fraction)."""
+    previous = {(r['name'], r['track_points']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['name'], result['track_points']))
+        if before is None or not before['seconds']:
+            continue
+        change = result['seconds'] / before['seconds'] - 1
+        if change > tolerance:
+            regressions.append(f"{result['name']} ({result['track_points']:,} points): "
+                               f"{before['seconds']:.3f}s -> {result['seconds']:.3f}s (+{change:.0%})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the GPX analyzer on synthetic ski tracks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python gpx_benchmark.py --points 100000 1000000 -o results.json
+  python gpx_benchmark.py --points 100000 --compare results.json
+  python gpx_benchmark.py --generate day.gpx --points 500000
+        """
+    )
+    parser.add_argument('--points', type=int, nargs='+', default=[100_000],
+                        help='Track sizes to benchmark (default: 100000)')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), default=None,
+                        help='Run only these benchmarks')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f'Seed of the track generator (default: {DEFAULT_SEED})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per benchmark; the best is reported (default: 3)')
+    parser.add_argument('--workdir', type=str, default=None,
+                        help='Keep generated tracks here and reuse them between runs '
+                             '(default: a temporary directory)')
+    parser.add_argument('-o', '--output', type=str,
+                        help='Write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', type=str,
+                        help='Baseline JSON results; exit with status 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against --compare as a fraction (default: 0.2)')
+    parser.add_argument('--no-isolate', action='store_true',
+                        help='Run benchmarks in this process (faster, but peak RSS accumulates)')
+    parser.add_argument('--generate', type=str, metavar='GPX',
+                        help='Only write a synthetic track of the first --points size to GPX')
+
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        write_gpx(generate_ski_track(args.points[0], args.seed), args.generate, SYNTHETIC_NAME)
+        print(f"Wrote {args.points[0]:,} points to {args.generate}")
+        return
+
+    names = args.only or list(BENCHMARKS)
+    log = lambda message: print(message, file=sys.stderr)
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        report = run_suite(args.points, names, args.workdir, args.seed, args.repeat,
+                           isolate=not args.no_isolate, log=log)
+    else:
+        with tempfile.TemporaryDirectory(prefix='gpx_benchmark_') as workdir:
+            report = run_suite(args.points, names, workdir, args.seed, args.repeat,
+                               isolate=not args.no_isolate, log=log)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"Results saved to: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(json.load(f), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+On-disk cache of parsed tracks.
+
+Each entry holds one Track in a small binary layout (a fixed header
+followed by the raw column arrays) so a hit costs a file read and a few
+np.frombuffer calls instead of an XML parse. Entries are keyed by the
+source file's absolute path, size, mtime and content hash, so editing or
+replacing a file never serves stale points. A zip member (gpx_archive)
+is keyed without the archive's mtime, by its path, size and CRC-32, so
+rewriting an archive keeps the entries of the members that did not
+change. The cache directory is bounded in size: a running total of the
+entry sizes, seeded by one directory scan, is kept as entries are
+written, and only when it goes over the budget is the directory scanned
+again and the least recently used entries evicted.
+"""
+
+import hashlib
+import os
+import struct
+from datetime import timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from gpx_archive import absolute_source, source_hash, source_stat, split_member
+from gpx_track import Track
+
+CACHE_MAGIC = b'GPXTRK'
+# Bump when the entry layout or the parser's output changes
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = '.track'
+DEFAULT_CACHE_SIZE_MB = 512
+
+# magic, version, point count, UTC offset of the track in seconds
+_HEADER = struct.Struct('<6sHqi')
+
+
+def default_cache_dir() -> Path:
+    """$GPX_ANALYZER_CACHE_DIR, else $XDG_CACHE_HOME/gpx_analyzer, else ~/.cache/gpx_analyzer."""
+    if os.environ.get('GPX_ANALYZER_CACHE_DIR'):
+        return Path(os.environ['GPX_ANALYZER_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'gpx_analyzer'
+
+
+def encode_track(track: Track) -> bytes:
+    offset = track.tz.utcoffset(None) if track.tz is not None else None
+    offset_seconds = int(offset.total_seconds()) if offset is not None else 0
+    header = _HEADER.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(track), offset_seconds)
+    return b''.join([
+        header,
+        track.lat.tobytes(),
+        track.lon.tobytes(),
+        track.ele.tobytes(),
+        track.time_us.tobytes(),
+        track.accuracy.filled(np.nan).tobytes(),
+        track.speed.filled(np.nan).tobytes(),
+    ])
+
+
+def decode_track(data: bytes) -> Track:
+    """Rebuild a Track from encode_track() output (raises ValueError on a bad entry)."""
+    if len(data) < _HEADER.size:
+        raise ValueError('Truncated cache entry')
+    magic, version, count, offset_seconds = _HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+        raise ValueError('Unsupported cache entry')
+    if len(data) != _HEADER.size + count * 8 * 6:
+        raise ValueError('Truncated cache entry')
+
+    def column(index: int, dtype) -> np.ndarray:
+        return np.frombuffer(data, dtype=dtype, count=count, offset=_HEADER.size + index * count * 8)
+
+    accuracy = column(4, np.float64)
+    speed = column(5, np.float64)
+    return Track(
+        lat=column(0, np.float64),
+        lon=column(1, np.float64),
+        ele=column(2, np.float64),
+        time_us=column(3, np.int64),
+        accuracy=np.ma.MaskedArray(accuracy, mask=np.isnan(accuracy)),
+        speed=np.ma.MaskedArray(speed, mask=np.isnan(speed)),
+        tz=timezone.utc if offset_seconds == 0 else timezone(timedelta(seconds=offset_seconds))
+    )
+
+
+class TrackCache:
+    """Size-bounded LRU cache of parsed tracks stored as files in cache_dir."""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = DEFAULT_CACHE_SIZE_MB << 20):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Size of the entries, seeded by one directory scan on the first put() and kept up to date
+        # from there; entries other processes write are counted at the next scan (in evict())
+        self._total_bytes: Optional[int] = None
+
+    def key(self, filepath: str, content_hash: Optional[str] = None) -> str:
+        """
+        Cache key for the file's current path, size, mtime and content (an
+        archive member's path, size and CRC). Pass content_hash when the
+        caller already has source_hash() of the file, to avoid reading it twice.
+        """
+        path = absolute_source(filepath)
+        size, mtime_ns = source_stat(path)
+        if split_member(path)[1] is not None:
+            # Rewriting an archive moves its mtime for every member; the CRC-32 tells which ones changed
+            mtime_ns = 0
+        identity = f'{CACHE_FORMAT_VERSION}\0{path}\0{size}\0{mtime_ns}\0{content_hash or source_hash(path)}'
+        return hashlib.blake2b(identity.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}{CACHE_SUFFIX}'
+
+    def get(self, key: str) -> Optional[Track]:
+        entry = self._entry_path(key)
+        try:
+            track = decode_track(entry.read_bytes())
+        except (OSError, ValueError):
+            return None
+        # Refresh the entry's mtime so eviction sees it as recently used
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return track
+
+    def put(self, key: str, track: Track):
+        entry = self._entry_path(key)
+        try:
+            replaced = entry.stat().st_size
+        except OSError:
+            replaced = 0
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            data = encode_track(track)
+            tmp = entry.with_name(f'{entry.name}.{os.getpid()}.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, entry)
+        except OSError:
+            return  # A cache that can't be written is just a slower run
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(data) - replaced
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def fetch(self, filepath: str, parse: Callable[[], Track], content_hash: Optional[str] = None) -> Track:
+        """Return the cached track for filepath, or parse() it and store the result."""
+        key = self.key(filepath, content_hash)
+        track = self.get(key)
+        if track is not None:
+            self.hits += 1
+            return track
+        self.misses += 1
+        track = parse()
+        self.put(key, track)
+        return track
+
+    def _entries(self):
+        entries = []
+        for entry in self.cache_dir.glob(f'*{CACHE_SUFFIX}'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+    def clear(self) -> int:
+        """Delete every entry; returns the number removed."""
+        removed = 0
+        for _, _, entry in self._entries():
+            try:
+                entry.unlink()
+                removed += 1
+            except OSError:
+                pass
+        self._total_bytes = None
+        return removed
@@ -0,0 +1,123 @@
+"""
+Personal records across an archive (the ``highscores`` subcommand).
+
+The app's Highscore screen shows records such as top speed and biggest
+vertical for the sessions on the phone. Here they are computed over
+years of archived tracks in one pass: each file is parsed once, its runs
+are detected once (run_detector) and it contributes at most k candidate
+records per category, so workers can process files in parallel and send
+back a handful of small Record tuples each.
+
+Highscores folds the candidates into one bounded min-heap of the k best
+records per category, so memory does not grow with the archive. Every
+record keeps the session file, the time and the position it was set at.
+
+Speeds are km/h and computed as in the app (stats_calculator): a
+session's top speed is its highest smoothed speed (the speed a run's
+max_speed is taken from, which evens out single-point GPS jumps), a
+run's speed its distance-weighted average speed.
+"""
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple
+
+import numpy as np
+
+from gpx_track import Track, epoch_us_to_datetime
+from run_detector import detect_runs
+from session_analyzer import calculate_session_stats
+from stats_calculator import point_speeds, smooth_speeds
+
+DEFAULT_TOP_K = 5
+
+# Category -> (label, unit); top speed, day vertical and highest altitude are one record per session,
+# the others one per run
+CATEGORIES = {
+    'top_speed': ('Top speed', 'km/h'),
+    'fastest_run': ('Fastest run (average)', 'km/h'),
+    'longest_run': ('Longest run', 'm'),
+    'biggest_vertical': ('Biggest run vertical', 'm'),
+    'day_vertical': ('Most vertical in a day', 'm'),
+    'highest_altitude': ('Highest altitude', 'm'),
+}
+
+
+class Record(NamedTuple):
+    """One record: its value and where and when it was set."""
+    category: str
+    value: float
+    file: str
+    time: datetime
+    lat: float
+    lon: float
+    detail: str = ''
+
+
+def _record(category: str, value: float, filepath: str, track: Track, index: int, detail: str = '') -> Record:
+    return Record(category, float(value), filepath, epoch_us_to_datetime(track.time_us[index], track.tz),
+                  float(track.lat[index]), float(track.lon[index]), detail)
+
+
+def session_records(filepath: str, track: Track, k: int = DEFAULT_TOP_K) -> List[Record]:
+    """A session's candidate records: its best value per session category, its k best runs per run category."""
+    if len(track) < 2:
+        return []
+    speeds = point_speeds(track)
+    runs = detect_runs(track, raw_speeds=speeds)
+    stats = calculate_session_stats(track, runs=runs, speeds=speeds)
+
+    # Smoothed like the runs' max_speed: a single-point GPS jump is not a record
+    smoothed = smooth_speeds(track, speeds)
+    top = int(np.argmax(smoothed))
+    highest = int(np.argmax(track.ele))
+    records = [
+        _record('top_speed', smoothed[top], filepath, track, top),
+        _record('highest_altitude', track.ele[highest], filepath, track, highest),
+    ]
+    if runs:
+        records.append(_record('day_vertical', stats.ski_vertical, filepath, track, runs[0].start_index,
+                               f'{len(runs)} runs'))
+
+    for category, value in (('fastest_run', lambda run: run.avg_speed),
+                            ('longest_run', lambda run: run.distance),
+                            ('biggest_vertical', lambda run: run.vertical_drop)):
+        for run in heapq.nlargest(k, runs, key=value):
+            records.append(_record(category, value(run), filepath, track, run.start_index,
+                                   f'run {run.run_number}, {run.duration_seconds // 60} min'))
+    return records
+
+
+class Highscores:
+    """The k best records per category, kept in bounded min-heaps."""
+
+    def __init__(self, k: int = DEFAULT_TOP_K):
+        self.k = k
+        self.heaps: Dict[str, list] = {category: [] for category in CATEGORIES}
+        # Ties go to the record offered first
+        self._order = itertools.count()
+        self.offered = 0
+
+    def offer(self, record: Record):
+        self.offered += 1
+        heap = self.heaps[record.category]
+        entry = (record.value, -next(self._order), record)
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    def update(self, records: Iterable[Record]):
+        for record in records:
+            self.offer(record)
+
+    def table(self, category: str) -> List[Record]:
+        """A category's records, best first."""
+        return [record for *_, record in sorted(self.heaps[category], key=lambda entry: entry[:2], reverse=True)]
+
+    def to_dict(self) -> dict:
+        return {
+            category: [{**record._asdict(), 'time': record.time.isoformat()} for record in self.table(category)]
+            for category in CATEGORIES
+        }
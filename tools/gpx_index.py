@@ -0,0 +1,369 @@
+"""
+SQLite index of analyzed sessions (the ``index`` and ``query`` subcommands).
+
+Every indexed file has one row in 'sessions' holding the interval
+statistics of analyze_intervals() and the app's session statistics, and
+one row per anomalous interval in 'anomalies'. Aggregate questions
+("sessions with more than 5% anomalies in the last 3 seasons", "vertical
+per week") then run as SQL against the index instead of re-parsing
+every file.
+
+Updates are incremental. A file whose size and mtime match its row is
+skipped without being read; if only the mtime changed and the content
+hash is the same, just the stored mtime is refreshed. The analysis
+parameters (anomaly threshold, minimum interval) are stored with the
+index, and changing them marks every file for re-analysis.
+
+Dates are local to the track (its UTC offset), and a ski season runs
+from July to June: a session on 2025-02-02 belongs to season 2024-2025.
+"""
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from gpx_archive import absolute_source, source_exists, source_hash, source_stat
+from gpx_cache import default_cache_dir
+
+# Bump when the tables change; the index subcommand rebuilds an index with another version, queries refuse it
+SCHEMA_VERSION = 1
+DEFAULT_INDEX_NAME = 'sessions.sqlite'
+
+# First month of a ski season
+SEASON_START_MONTH = 7
+
+GROUPINGS = ('day', 'week', 'month', 'season')
+
+_STATEMENT_START = re.compile(r'(?:\s+|--[^\n]*|/\*.*?\*/)*(\w*)', re.DOTALL)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    start_time_us INTEGER,
+    end_time_us INTEGER,
+    utc_offset_seconds INTEGER NOT NULL,
+    start_date TEXT,
+    season TEXT,
+    waypoints INTEGER NOT NULL,
+    duration_seconds REAL NOT NULL,
+    total_distance_m REAL NOT NULL,
+    mean_interval REAL NOT NULL,
+    median_interval REAL NOT NULL,
+    stdev_interval REAL NOT NULL,
+    min_interval REAL NOT NULL,
+    max_interval REAL NOT NULL,
+    anomaly_count INTEGER NOT NULL,
+    anomaly_percentage REAL NOT NULL,
+    run_count INTEGER NOT NULL,
+    ski_vertical REAL NOT NULL,
+    ski_distance REAL NOT NULL,
+    total_ascent REAL NOT NULL,
+    total_descent REAL NOT NULL,
+    max_speed_kmh REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_start_date ON sessions (start_date);
+CREATE INDEX IF NOT EXISTS sessions_season ON sessions (season);
+CREATE TABLE IF NOT EXISTS anomalies (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    interval_index INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    description TEXT NOT NULL,
+    from_time_us INTEGER NOT NULL,
+    to_time_us INTEGER NOT NULL,
+    interval_seconds REAL NOT NULL,
+    distance_m REAL NOT NULL,
+    speed_ms REAL NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    PRIMARY KEY (session_id, interval_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS anomalies_kind ON anomalies (kind);
+"""
+
+# 'sessions' columns filled from an IndexedSession, in insert order
+_SESSION_COLUMNS = (
+    'path', 'size', 'mtime_ns', 'content_hash', 'start_time_us', 'end_time_us', 'utc_offset_seconds',
+    'start_date', 'season', 'waypoints', 'duration_seconds', 'total_distance_m',
+    'mean_interval', 'median_interval', 'stdev_interval', 'min_interval', 'max_interval',
+    'anomaly_count', 'anomaly_percentage', 'run_count', 'ski_vertical', 'ski_distance',
+    'total_ascent', 'total_descent', 'max_speed_kmh',
+)
+
+
+def default_index_path() -> Path:
+    """sessions.sqlite next to the track cache (see gpx_cache.default_cache_dir())."""
+    return default_cache_dir() / DEFAULT_INDEX_NAME
+
+
+def season_of(day: date) -> str:
+    """Ski season label ('2024-2025') of a local date."""
+    first_year = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+    return f'{first_year}-{first_year + 1}'
+
+
+@dataclass
+class IndexedSession:
+    """Everything stored for one file: its identity, summary row and anomaly rows."""
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    start_time_us: Optional[int]
+    end_time_us: Optional[int]
+    utc_offset_seconds: int
+    start_date: Optional[str]
+    season: Optional[str]
+    waypoints: int
+    duration_seconds: float
+    total_distance_m: float
+    mean_interval: float
+    median_interval: float
+    stdev_interval: float
+    min_interval: float
+    max_interval: float
+    anomaly_count: int
+    anomaly_percentage: float
+    run_count: int
+    ski_vertical: float
+    ski_distance: float
+    total_ascent: float
+    total_descent: float
+    max_speed_kmh: float
+    # (interval index, kind, description, from/to epoch us, seconds, metres, m/s, lat, lon)
+    anomalies: List[tuple] = field(default_factory=list)
+
+
+def file_identity(filepath: str, content_hash: Optional[str] = None) -> Tuple[str, int, int, str]:
+    """(absolute path, size, mtime_ns, content hash) as stored in the index; content_hash if already known."""
+    path = absolute_source(filepath)
+    size, mtime_ns = source_stat(path)
+    return path, size, mtime_ns, content_hash or source_hash(path)
+
+
+class SessionIndex:
+    """
+    Connection to an index database, created or upgraded on open.
+
+    Pass the analysis parameters when updating the index. Queries open it
+    read_only: nothing is created or migrated, and a database that is not
+    an index of this schema version raises ValueError.
+    """
+
+    def __init__(self, path: Optional[str] = None, anomaly_threshold_seconds: Optional[float] = None,
+                 min_interval_seconds: Optional[float] = None, read_only: bool = False):
+        self.path = Path(path) if path is not None else default_index_path()
+        self.content_hashes: Dict[str, str] = {}  # Hashes plan() computed for the files it found changed
+        if read_only:
+            self.db = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True)
+            try:
+                version = self.db.execute('PRAGMA user_version').fetchone()[0]
+            except sqlite3.Error as e:
+                self.db.close()
+                raise ValueError(f'{self.path}: {e}') from e
+            if version != SCHEMA_VERSION:
+                self.db.close()
+                raise ValueError(f'{self.path} is not a session index of this version '
+                                 f'(schema {version}, expected {SCHEMA_VERSION}; rebuild it with the index subcommand)')
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.db.executescript('DROP TABLE IF EXISTS anomalies; DROP TABLE IF EXISTS sessions; '
+                                  'DROP TABLE IF EXISTS meta;')
+        self.db.executescript(_SCHEMA)
+        self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        parameters = {key: repr(float(value)) for key, value in (
+            ('anomaly_threshold_seconds', anomaly_threshold_seconds),
+            ('min_interval_seconds', min_interval_seconds),
+        ) if value is not None}
+        stored = dict(self.db.execute('SELECT key, value FROM meta'))
+        if any(stored.get(key) != value for key, value in parameters.items()):
+            # Anomaly rows depend on the parameters: make every file look modified
+            self.db.execute("UPDATE sessions SET mtime_ns = -1, content_hash = ''")
+            self.db.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', parameters.items())
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.db.execute('SELECT count(*) FROM sessions').fetchone()[0]
+
+    def plan(self, files: Iterable[str]) -> List[str]:
+        """
+        The files that need (re-)analysis. Files whose content is unchanged
+        but whose mtime moved get their stored mtime refreshed here; the
+        hashes computed for that are kept in content_hashes (file -> hash)
+        so the files found changed need not be hashed again.
+        """
+        self.content_hashes = {}
+        known: Dict[str, tuple] = {
+            path: (size, mtime_ns, content_hash)
+            for path, size, mtime_ns, content_hash in self.db.execute(
+                'SELECT path, size, mtime_ns, content_hash FROM sessions')
+        }
+        stale = []
+        for filepath in files:
+            path = absolute_source(filepath)
+            row = known.get(path)
+            try:
+                current_size, current_mtime_ns = source_stat(path)
+            except OSError:
+                stale.append(filepath)  # reported when it is analyzed
+                continue
+            if row is None:
+                stale.append(filepath)
+                continue
+            size, mtime_ns, content_hash = row
+            if size == current_size and mtime_ns == current_mtime_ns:
+                continue
+            if size == current_size:
+                current_hash = source_hash(path)
+                if current_hash == content_hash:
+                    self.db.execute('UPDATE sessions SET mtime_ns = ? WHERE path = ?', (current_mtime_ns, path))
+                    continue
+                self.content_hashes[filepath] = current_hash
+            stale.append(filepath)
+        self.db.commit()
+        return stale
+
+    def store(self, session: IndexedSession):
+        """Insert or replace the rows of one file."""
+        with self.db:
+            self.db.execute('DELETE FROM sessions WHERE path = ?', (session.path,))
+            cursor = self.db.execute(
+                f"INSERT INTO sessions ({', '.join(_SESSION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_SESSION_COLUMNS))})",
+                [getattr(session, column) for column in _SESSION_COLUMNS]
+            )
+            self.db.executemany(
+                'INSERT INTO anomalies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(cursor.lastrowid, *row) for row in session.anomalies]
+            )
+
+    def prune(self) -> int:
+        """Remove sessions whose file no longer exists; returns the number removed."""
+        gone = [(path,) for path, in self.db.execute('SELECT path FROM sessions') if not source_exists(path)]
+        with self.db:
+            self.db.executemany('DELETE FROM sessions WHERE path = ?', gone)
+        return len(gone)
+
+    # -- Queries: each returns (column names, rows) --------------------------
+
+    def _run(self, sql: str, parameters: Sequence = ()) -> Tuple[List[str], List[tuple]]:
+        cursor = self.db.execute(sql, parameters)
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+
+    @staticmethod
+    def _filters(since: Optional[str], until: Optional[str], seasons: Optional[int],
+                 alias: str = '') -> Tuple[List[str], List]:
+        where, parameters = [], []
+        if since:
+            where.append(f'{alias}start_date >= ?')
+            parameters.append(since)
+        if until:
+            where.append(f'{alias}start_date <= ?')
+            parameters.append(until)
+        if seasons:
+            where.append(f'{alias}season IN (SELECT DISTINCT season FROM sessions '
+                         f'WHERE season IS NOT NULL ORDER BY season DESC LIMIT ?)')
+            parameters.append(seasons)
+        return where, parameters
+
+    def sessions(self, since: Optional[str] = None, until: Optional[str] = None,
+                 seasons: Optional[int] = None, min_anomaly_percentage: Optional[float] = None):
+        """Per-session summaries, oldest first."""
+        where, parameters = self._filters(since, until, seasons)
+        if min_anomaly_percentage is not None:
+            where.append('anomaly_percentage > ?')
+            parameters.append(min_anomaly_percentage)
+        return self._run(
+            'SELECT path, start_date, season, round(duration_seconds / 3600.0, 2) AS hours, '
+            'round(total_distance_m / 1000.0, 2) AS distance_km, round(ski_vertical) AS ski_vertical_m, '
+            'run_count AS runs, anomaly_count AS anomalies, round(anomaly_percentage, 2) AS anomaly_pct '
+            'FROM sessions' + (' WHERE ' + ' AND '.join(where) if where else '') +
+            ' ORDER BY start_date, path',
+            parameters
+        )
+
+    def totals(self, by: str = 'week', since: Optional[str] = None, until: Optional[str] = None,
+               seasons: Optional[int] = None):
+        """Session totals per day, week (starting Monday), month or season."""
+        period = {
+            'day': 'start_date',
+            'week': "date(start_date, 'weekday 0', '-6 days')",
+            'month': 'substr(start_date, 1, 7)',
+            'season': 'season',
+        }[by]
+        where, parameters = self._filters(since, until, seasons)
+        where.append('start_date IS NOT NULL')
+        return self._run(
+            f'SELECT {period} AS {by}, count(*) AS sessions, sum(run_count) AS runs, '
+            'round(sum(ski_vertical)) AS ski_vertical_m, round(sum(total_distance_m) / 1000.0, 2) AS distance_km, '
+            'round(sum(duration_seconds) / 3600.0, 2) AS hours, sum(anomaly_count) AS anomalies, '
+            'round(max(max_speed_kmh), 1) AS max_speed_kmh '
+            f"FROM sessions WHERE {' AND '.join(where)} GROUP BY 1 ORDER BY 1",
+            parameters
+        )
+
+    def anomalies(self, kind: Optional[str] = None, min_seconds: Optional[float] = None,
+                  since: Optional[str] = None, until: Optional[str] = None, seasons: Optional[int] = None,
+                  limit: Optional[int] = None):
+        """Anomalous intervals, longest first."""
+        where, parameters = self._filters(since, until, seasons, alias='s.')
+        if kind:
+            where.append('a.kind = ?')
+            parameters.append(kind)
+        if min_seconds is not None:
+            where.append('a.interval_seconds >= ?')
+            parameters.append(min_seconds)
+        sql = ("SELECT s.path, a.interval_index, a.kind, "
+               "strftime('%Y-%m-%dT%H:%M:%SZ', a.from_time_us / 1000000, 'unixepoch') AS from_time, "
+               "a.interval_seconds, round(a.distance_m, 1) AS distance_m, a.lat, a.lon "
+               "FROM anomalies a JOIN sessions s ON s.id = a.session_id" +
+               (' WHERE ' + ' AND '.join(where) if where else '') +
+               ' ORDER BY a.interval_seconds DESC')
+        if limit:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        return self._run(sql, parameters)
+
+    def sql(self, statement: str):
+        """Run one SELECT (or WITH ... SELECT) statement; anything else raises ValueError."""
+        if _first_keyword(statement) not in ('SELECT', 'WITH'):
+            raise ValueError('only a single SELECT or WITH statement can be run against the index')
+        # WITH can also start a DELETE or UPDATE: refuse writes for the statement itself too
+        self.db.execute('PRAGMA query_only = ON')
+        try:
+            return self._run(statement)
+        finally:
+            self.db.execute('PRAGMA query_only = OFF')
+
+
+def _first_keyword(statement: str) -> str:
+    """The statement's first word, after any leading whitespace and comments."""
+    return _STATEMENT_START.match(statement).group(1).upper()
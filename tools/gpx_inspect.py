@@ -0,0 +1,242 @@
+"""
+Structural inspection of GPX files (the ``inspect`` subcommand).
+
+When a file will not parse, or parses to fewer points than expected, the
+questions are about its structure: which namespace and creator it
+declares, which elements and extensions it uses, how its points are
+split into segments, how its timestamps are written and where exactly
+it stops being well-formed. inspect_gpx() answers them in one streaming
+pass: the file (or a compressed file or archive member, see gpx_archive)
+is fed to an expat parser in CHUNK_BYTES blocks and only counters are
+kept, so memory stays bounded on files of any size.
+
+Timestamps are classified by their shape, every digit replaced by 'd'
+('dddd-dd-ddTdd:dd:ddZ'), which separates layouts with and without
+fractions or zone offsets. A parse error is reported with its byte
+offset (expat's own error index, exact for multi-byte text), line and
+column, and the parse stops there; everything counted up to that point
+is still reported.
+"""
+
+import re
+import xml.parsers.expat
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from gpx_archive import open_source
+from gpx_scanner import detect_writer
+
+CHUNK_BYTES = 1 << 20
+
+# Distinct timestamp shapes and segment sizes kept in the report
+MAX_TIME_SHAPES = 16
+MAX_LISTED_SEGMENTS = 20
+
+_DIGIT = re.compile(r'\d')
+
+
+@dataclass
+class ParseFailure:
+    """The first point where the document is not well-formed."""
+    offset: int
+    line: int
+    column: int
+    message: str
+    context: str  # Text around the offset
+
+
+@dataclass
+class GpxStructure:
+    """What one pass over a GPX document found."""
+    filepath: str
+    bytes_read: int = 0
+    xml_encoding: Optional[str] = None
+    root: Optional[str] = None
+    namespace: Optional[str] = None
+    version: Optional[str] = None
+    creator: Optional[str] = None
+    writer_profile: Optional[str] = None  # gpx_scanner fast-path writer, if the header matches one
+    namespaces: Dict[str, str] = field(default_factory=dict)  # prefix ('' = default) -> URI
+    elements: Dict[str, int] = field(default_factory=dict)
+    extensions: Dict[str, int] = field(default_factory=dict)
+    tracks: int = 0
+    segments: int = 0
+    segment_points: List[int] = field(default_factory=list)  # First MAX_LISTED_SEGMENTS segments
+    min_segment_points: Optional[int] = None
+    max_segment_points: Optional[int] = None
+    trackpoints: int = 0
+    points_outside_segments: int = 0
+    points_without_position: int = 0
+    points_without_time: int = 0
+    time_formats: Dict[str, int] = field(default_factory=dict)  # Shape -> count
+    time_examples: Dict[str, str] = field(default_factory=dict)  # Shape -> first value seen
+    other_time_formats: int = 0
+    error: Optional[ParseFailure] = None
+
+    @property
+    def well_formed(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), 'well_formed': self.well_formed}
+
+
+class _Inspector:
+    """expat handlers updating a GpxStructure."""
+
+    def __init__(self, structure: GpxStructure):
+        self.structure = structure
+        self.prefixes: Dict[str, str] = {}  # URI -> prefix of its first declaration
+        self.depth = 0
+        self.extension_depth = None  # Depth of the open <extensions>, if any
+        self.segment_points = None  # Points in the open <trkseg>
+        self.point_has_time = False
+        self.time_text = None  # Character data of the open <time> inside a <trkpt>
+        self.in_point = False
+
+    def name(self, expat_name: str) -> str:
+        """'uri local' as 'local' in the GPX (default) namespace, else 'prefix:local'."""
+        uri, _, local = expat_name.rpartition(' ')
+        if not uri or uri == self.structure.namespace:
+            return local
+        prefix = self.prefixes.get(uri)
+        return f'{prefix}:{local}' if prefix else f'{{{uri}}}{local}'
+
+    def xml_declaration(self, version, encoding, standalone):
+        self.structure.xml_encoding = encoding
+
+    def namespace_declaration(self, prefix, uri):
+        prefix = prefix or ''
+        self.structure.namespaces.setdefault(prefix, uri)
+        self.prefixes.setdefault(uri, prefix)
+
+    def start(self, expat_name: str, attributes: dict):
+        structure = self.structure
+        self.depth += 1
+        uri, _, local = expat_name.rpartition(' ')
+        if structure.root is None:
+            structure.root = local
+            structure.namespace = uri or None
+            structure.version = attributes.get('version')
+            structure.creator = attributes.get('creator')
+        name = self.name(expat_name)
+        structure.elements[name] = structure.elements.get(name, 0) + 1
+        if self.extension_depth is not None:
+            structure.extensions[name] = structure.extensions.get(name, 0) + 1
+
+        if local == 'extensions' and self.extension_depth is None:
+            self.extension_depth = self.depth
+        elif local == 'trk':
+            structure.tracks += 1
+        elif local == 'trkseg':
+            self.segment_points = 0
+        elif local == 'trkpt':
+            self.in_point = True
+            self.point_has_time = False
+            structure.trackpoints += 1
+            if self.segment_points is None:
+                structure.points_outside_segments += 1
+            else:
+                self.segment_points += 1
+            if 'lat' not in attributes or 'lon' not in attributes:
+                structure.points_without_position += 1
+        elif local == 'time' and self.in_point:
+            self.time_text = []
+
+    def end(self, expat_name: str):
+        structure = self.structure
+        local = expat_name.rpartition(' ')[2]
+        if self.extension_depth == self.depth:
+            self.extension_depth = None
+        self.depth -= 1
+
+        if local == 'time' and self.time_text is not None:
+            self._count_time(''.join(self.time_text).strip())
+            self.time_text = None
+        elif local == 'trkpt':
+            self.in_point = False
+            if not self.point_has_time:
+                structure.points_without_time += 1
+        elif local == 'trkseg':
+            self.close_segment()
+
+    def close_segment(self):
+        """Record the open <trkseg>'s size (also called for one cut off by the end of the data)."""
+        structure = self.structure
+        points, self.segment_points = self.segment_points, None
+        if points is not None:
+            structure.segments += 1
+            if len(structure.segment_points) < MAX_LISTED_SEGMENTS:
+                structure.segment_points.append(points)
+            if structure.min_segment_points is None or points < structure.min_segment_points:
+                structure.min_segment_points = points
+            if structure.max_segment_points is None or points > structure.max_segment_points:
+                structure.max_segment_points = points
+
+    def text(self, data: str):
+        if self.time_text is not None:
+            self.time_text.append(data)
+
+    def _count_time(self, value: str):
+        structure = self.structure
+        if not value:
+            return
+        self.point_has_time = True
+        shape = _DIGIT.sub('d', value)
+        if shape in structure.time_formats:
+            structure.time_formats[shape] += 1
+        elif len(structure.time_formats) < MAX_TIME_SHAPES:
+            structure.time_formats[shape] = 1
+            structure.time_examples[shape] = value
+        else:
+            structure.other_time_formats += 1
+
+
+def _context(window: bytes, index: int, radius: int = 40) -> str:
+    index = max(index, 0)
+    return window[max(index - radius, 0):index + radius].decode('utf-8', 'replace')
+
+
+def inspect_gpx(filepath: str, chunk_size: int = CHUNK_BYTES) -> GpxStructure:
+    """Inspect a GPX document in one streaming pass (raises OSError if it can't be read)."""
+    structure = GpxStructure(filepath)
+    inspector = _Inspector(structure)
+    parser = xml.parsers.expat.ParserCreate(namespace_separator=' ')
+    parser.XmlDeclHandler = inspector.xml_declaration
+    parser.StartNamespaceDeclHandler = inspector.namespace_declaration
+    parser.StartElementHandler = inspector.start
+    parser.EndElementHandler = inspector.end
+    parser.CharacterDataHandler = inspector.text
+    parser.buffer_text = True
+
+    # The previous chunk is kept to show the text around an error
+    previous = b''
+    header = b''
+    with open_source(filepath) as source:
+        while True:
+            chunk = source.read(chunk_size)
+            if len(header) < chunk_size:
+                header += chunk[:chunk_size - len(header)]
+            window_start = structure.bytes_read - len(previous)
+            structure.bytes_read += len(chunk)
+            try:
+                parser.Parse(chunk, not chunk)
+            except xml.parsers.expat.ExpatError as e:
+                offset = parser.ErrorByteIndex
+                structure.error = ParseFailure(
+                    offset=offset,
+                    line=e.lineno,
+                    column=e.offset,
+                    message=xml.parsers.expat.ErrorString(e.code),
+                    context=_context(previous + chunk, offset - window_start)
+                )
+                break
+            if not chunk:
+                break
+            previous = chunk
+
+    inspector.close_segment()
+    first_point = header.find(b'<trkpt')
+    writer = detect_writer(header[:first_point]) if first_point >= 0 else None
+    structure.writer_profile = writer.name if writer else None
+    return structure
@@ -0,0 +1,89 @@
+"""
+K-way merge of split or overlapping recordings of the same day.
+
+A ski day often ends up in several files: a crash-recovered
+temp_recording.gpx next to the final export, or one recording per phone.
+TrackMerger streams them into one time-ordered point sequence with a
+heap holding the next point of each source, so memory stays O(number of
+sources) and nothing is sorted or loaded as a whole.
+
+Sources yield (segment, point) pairs in time order, where point is a
+(lat, lon, elevation, epoch_us, accuracy, speed) row and segment numbers
+the <trkseg> the point belongs to. Points with the timestamp of the last
+merged point are duplicates (the same fix in two files) and are dropped.
+
+Segment boundaries are kept: the merged stream starts a new segment
+wherever no source was recording across the interval, i.e. no source
+has a segment containing both the previous merged point and the next
+one. Gaps between segments (recording paused, phone switched off) then
+stay out of the interval analysis instead of being flagged as anomalies.
+"""
+
+import heapq
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# (segment number, (lat, lon, elevation, epoch_us, accuracy, speed))
+SegmentPoint = Tuple[int, tuple]
+
+
+class TrackMerger:
+    """
+    Heap-based merge of time-ordered point sources.
+
+    Iterating yields (point, new_segment) pairs once; the counters are
+    complete when the iteration is. A source going back in time raises
+    ValueError, as the merge cannot reorder it without loading it.
+    """
+
+    def __init__(self, sources: Sequence[Iterable[SegmentPoint]], names: Optional[Sequence[str]] = None):
+        self.sources = sources
+        self.names = list(names) if names is not None else [f'source {i + 1}' for i in range(len(sources))]
+        self.points_read = [0] * len(sources)
+        self.points = 0
+        self.duplicates = 0
+        self.segments = 0
+
+    def _next(self, index: int, iterator: Iterator[SegmentPoint], after_us: int) -> Optional[tuple]:
+        """Heap entry (epoch_us, source index, segment, point) for a source's next point."""
+        entry = next(iterator, None)
+        if entry is None:
+            return None
+        segment, point = entry
+        self.points_read[index] += 1
+        if point[3] < after_us:
+            raise ValueError(f'{self.names[index]}: points are not in time order '
+                             f'(point {self.points_read[index]} goes back in time)')
+        return point[3], index, segment, point
+
+    def __iter__(self) -> Iterator[Tuple[tuple, bool]]:
+        iterators = [iter(source) for source in self.sources]
+        heap = [entry for index, iterator in enumerate(iterators)
+                if (entry := self._next(index, iterator, -1 << 63)) is not None]
+        heapq.heapify(heap)
+
+        # Segment of each source's last merged point; a source is "open" while
+        # its next point continues that segment, i.e. it is recording right now
+        merged_segment: List[Optional[int]] = [None] * len(iterators)
+        open_sources = 0
+        last_us = None
+        while heap:
+            time_us, index, segment, point = heap[0]
+            bridged = open_sources > 0
+            was_open = merged_segment[index] == segment
+
+            entry = self._next(index, iterators[index], time_us)
+            if entry is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, entry)
+            merged_segment[index] = segment
+            open_sources += (entry is not None and entry[2] == segment) - was_open
+
+            if time_us == last_us:
+                self.duplicates += 1
+                continue
+            new_segment = last_us is None or not bridged
+            self.segments += new_segment
+            self.points += 1
+            last_us = time_us
+            yield point, new_segment
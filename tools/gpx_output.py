@@ -0,0 +1,219 @@
+"""
+Machine-readable analysis reports: JSON Lines and CSV (--format).
+
+Records are produced for each file as soon as it has been analyzed and
+written in bulk: the file's rows are formatted into one string (one per
+CHUNK_ROWS rows for interval listings) and handed to the output in a
+single write, which is then flushed. Downstream tools see every file as
+it finishes, and memory does not grow with the number of files.
+
+Record kinds (--records):
+
+    files      one summary per file
+    anomalies  one row per reported anomaly
+    intervals  one row per interval (needs the whole-track analysis)
+
+Times are ISO 8601 in UTC, with milliseconds (microseconds if the track
+has sub-millisecond timestamps).
+"""
+
+import csv
+import io
+import json
+import sys
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import numpy as np
+
+from gpx_track import datetime_to_epoch_us
+
+OUTPUT_FORMATS = ('markdown', 'jsonl', 'csv')
+RECORD_KINDS = ('files', 'anomalies', 'intervals')
+
+# Interval rows formatted per write
+CHUNK_ROWS = 65536
+
+FILE_FIELDS = (
+    'file', 'waypoints', 'duration_seconds', 'total_distance_m',
+    'mean_interval', 'median_interval', 'stdev_interval', 'min_interval', 'max_interval',
+    'anomaly_count', 'anomaly_percentage',
+)
+ANOMALY_FIELDS = (
+    'file', 'kind', 'anomaly', 'from_time', 'to_time',
+    'interval_seconds', 'distance_m', 'speed_kmh', 'lat', 'lon',
+)
+INTERVAL_FIELDS = (
+    'file', 'index', 'from_time', 'to_time',
+    'interval_seconds', 'distance_m', 'speed_kmh', 'kind',
+)
+RECORD_FIELDS = {'files': FILE_FIELDS, 'anomalies': ANOMALY_FIELDS, 'intervals': INTERVAL_FIELDS}
+
+# Anomaly description prefix -> short kind
+_ANOMALY_KINDS = (
+    ('Large gap', 'large_gap'),
+    ('Very short interval', 'short_interval'),
+    ('Inconsistent interval', 'inconsistent'),
+)
+
+
+def format_for_path(path: Optional[str]) -> str:
+    """Output format implied by a report file name (markdown unless .jsonl/.ndjson/.csv)."""
+    suffix = (path or '').rsplit('.', 1)[-1].lower()
+    if suffix in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if suffix == 'csv':
+        return 'csv'
+    return 'markdown'
+
+
+def anomaly_kind(description: Optional[str]) -> Optional[str]:
+    """Short kind ('large_gap', 'short_interval', 'inconsistent') of an anomaly description."""
+    if description:
+        for prefix, kind in _ANOMALY_KINDS:
+            if description.startswith(prefix):
+                return kind
+    return None
+
+
+def iso_times(time_us: np.ndarray) -> List[str]:
+    """Epoch microseconds as ISO 8601 UTC strings."""
+    unit = 'us' if np.any(time_us % 1000) else 'ms'
+    return [text + 'Z' for text in np.datetime_as_string(time_us.astype('datetime64[us]'), unit=unit).tolist()]
+
+
+def file_row(result) -> tuple:
+    statistics = result.statistics
+    return (
+        result.filename,
+        int(result.total_waypoints),
+        float(result.total_duration_seconds),
+        *(float(statistics[name]) for name in FILE_FIELDS[3:9]),
+        int(statistics['anomaly_count']),
+        float(statistics['anomaly_percentage']),
+    )
+
+
+def anomaly_rows(result) -> List[tuple]:
+    anomalies = list(result.anomalies)
+    if not anomalies:
+        return []
+    times = iso_times(np.array([
+        datetime_to_epoch_us(timestamp)
+        for anomaly in anomalies
+        for timestamp in (anomaly.from_waypoint.timestamp, anomaly.to_waypoint.timestamp)
+    ], dtype=np.int64))
+    return [
+        (
+            result.filename,
+            anomaly_kind(anomaly.anomaly_type),
+            anomaly.anomaly_type,
+            times[2 * i],
+            times[2 * i + 1],
+            anomaly.interval_seconds,
+            round(anomaly.distance_meters, 3),
+            round(anomaly.speed_ms * 3.6, 3),
+            anomaly.from_waypoint.lat,
+            anomaly.from_waypoint.lon,
+        )
+        for i, anomaly in enumerate(anomalies)
+    ]
+
+
+def interval_row_chunks(result, chunk_rows: int = CHUNK_ROWS) -> Iterator[List[tuple]]:
+    """
+    Interval rows from the columns of the result's IntervalTable, formatted
+    chunk_rows at a time. Results without a table (too few points, or a
+    --stream analysis) have no interval rows.
+    """
+    table = getattr(result.intervals, 'table', None)
+    if table is None or not len(table):
+        return
+    time_us = table.track.time_us
+    kinds: Dict[int, str] = {
+        index: anomaly_kind(table.anomaly_type(index))
+        for index in np.flatnonzero(table.anomaly_kind).tolist()
+    }
+    for start in range(0, len(table), chunk_rows):
+        end = min(start + chunk_rows, len(table))
+        times = iso_times(time_us[start:end + 1])
+        yield list(zip(
+            [result.filename] * (end - start),
+            range(start, end),
+            times[:-1],
+            times[1:],
+            table.interval_seconds[start:end].tolist(),
+            np.round(table.distance_meters[start:end], 3).tolist(),
+            np.round(table.speed_ms[start:end] * 3.6, 3).tolist(),
+            [kinds.get(index) for index in range(start, end)],
+        ))
+
+
+def record_chunks(result, records: str) -> Iterator[List[tuple]]:
+    """Rows of the given record kind for one result, in RECORD_FIELDS order."""
+    if records == 'files':
+        yield [file_row(result)]
+    elif records == 'anomalies':
+        rows = anomaly_rows(result)
+        if rows:
+            yield rows
+    else:
+        yield from interval_row_chunks(result)
+
+
+class RecordWriter:
+    """Base class: writes each result's records in bulk and flushes after every file."""
+
+    def __init__(self, out: TextIO, records: str = 'files'):
+        self.out = out
+        self.records = records
+        self.fields = RECORD_FIELDS[records]
+        self.rows_written = 0
+
+    def _format(self, rows: List[tuple]) -> str:
+        raise NotImplementedError
+
+    def write_result(self, result):
+        for rows in record_chunks(result, self.records):
+            self.out.write(self._format(rows))
+            self.rows_written += len(rows)
+        self.out.flush()
+
+    def close(self):
+        if self.out is sys.stdout:
+            self.out.flush()
+        else:
+            self.out.close()
+
+
+class JsonLinesWriter(RecordWriter):
+    """One JSON object per line."""
+
+    def __init__(self, out: TextIO, records: str = 'files'):
+        super().__init__(out, records)
+        self._encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def _format(self, rows: List[tuple]) -> str:
+        fields, encode = self.fields, self._encode
+        return ''.join([encode(dict(zip(fields, row))) + '\n' for row in rows])
+
+
+class CsvWriter(RecordWriter):
+    """CSV with a header row; missing values are empty cells."""
+
+    def __init__(self, out: TextIO, records: str = 'files'):
+        super().__init__(out, records)
+        self.out.write(self._format([self.fields]))
+
+    def _format(self, rows: List[tuple]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(rows)
+        return buffer.getvalue()
+
+
+WRITERS = {'jsonl': JsonLinesWriter, 'csv': CsvWriter}
+
+
+def open_record_writer(path: Optional[str], output_format: str, records: str = 'files') -> RecordWriter:
+    """A JSON Lines or CSV writer on path, or on stdout for None / '-'."""
+    out = sys.stdout if path in (None, '-') else open(path, 'w', newline='', encoding='utf-8')
+    return WRITERS[output_format](out, records)
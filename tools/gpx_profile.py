@@ -0,0 +1,217 @@
+"""
+Per-stage timing and allocation profile for the GPX analyzer (--profile).
+
+A FileProfile records, for one file, the wall time and memory allocated
+in each pipeline stage:
+
+    read      bytes pulled from the file
+    parse     XML parsing and building the Track (excluding read/decode)
+    decode    timestamp decoding
+    analysis  interval analysis
+    render    printing the report
+
+Stages nest: time spent in an inner stage (a read or a timestamp decode
+during parsing) is charged to that stage only, so the time column of a
+report adds up to the total. Memory comes from tracemalloc and includes
+nested stages: 'peak' is the highest traced memory above the stage's
+starting point and 'retained' the memory still allocated when it ends.
+Tracing allocations slows Python code down several times, so compare
+stage shares rather than absolute times against unprofiled runs.
+
+Nothing here is installed unless profiling was requested: the analyzer
+wraps its reader, decoder and point iterator only when handed a
+FileProfile, so a normal run pays no per-point cost.
+"""
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from gpx_archive import open_source
+
+STAGES = ('read', 'parse', 'decode', 'analysis', 'render')
+
+
+class StageStats:
+    """Accumulated cost of one stage."""
+
+    __slots__ = ('seconds', 'calls', 'retained', 'peak')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.retained = 0
+        self.peak = 0
+
+    def merge(self, other: 'StageStats'):
+        self.seconds += other.seconds
+        self.calls += other.calls
+        self.retained += other.retained
+        self.peak = max(self.peak, other.peak)
+
+    def to_dict(self) -> dict:
+        return {'seconds': self.seconds, 'calls': self.calls,
+                'retained_bytes': self.retained, 'peak_bytes': self.peak}
+
+
+class _TimedReader:
+    """Binary file wrapper that charges read() calls to the 'read' stage."""
+
+    def __init__(self, profile: 'FileProfile', f):
+        self._profile = profile
+        self._file = f
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        self._profile._enter()
+        try:
+            data = self._file.read(size)
+        finally:
+            self._profile._exit('read')
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FileProfile:
+    """Stage costs for one analyzed file."""
+
+    def __init__(self, filename: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.filename = filename
+        self.points = 0
+        self.stages: Dict[str, StageStats] = {name: StageStats() for name in STAGES}
+        # Open regions: [start time, seconds in children, traced memory at start, highest traced memory]
+        self._stack: List[list] = []
+
+    def _enter(self):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            # The peak is reset for the new region; keep the enclosing region's so far
+            self._stack[-1][3] = max(self._stack[-1][3], peak)
+        tracemalloc.reset_peak()
+        self._stack.append([time.perf_counter(), 0.0, current, current])
+
+    def _exit(self, name: str):
+        end = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        start, child_seconds, start_memory, highest = self._stack.pop()
+        elapsed = end - start
+        highest = max(highest, peak)
+
+        stats = self.stages[name]
+        stats.seconds += elapsed - child_seconds
+        stats.calls += 1
+        stats.retained += current - start_memory
+        stats.peak = max(stats.peak, highest - start_memory)
+        if self._stack:
+            self._stack[-1][1] += elapsed
+            self._stack[-1][3] = max(self._stack[-1][3], highest)
+
+    @contextmanager
+    def stage(self, name: str):
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit(name)
+
+    def timed_call(self, name: str, func: Callable) -> Callable:
+        """Wrap func so every call is charged to stage ``name``."""
+        def timed(*args, **kwargs):
+            self._enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(name)
+        return timed
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from iterable, charging the time spent producing each item to stage ``name``."""
+        iterator = iter(iterable)
+        while True:
+            self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit(name)
+            self.points += 1
+            yield item
+
+    def timed_open(self, filepath: str) -> _TimedReader:
+        """Open filepath (see gpx_archive.open_source) with reads, decompression included, charged to 'read'."""
+        return _TimedReader(self, open_source(filepath))
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(stats.seconds for stats in self.stages.values())
+
+    def to_dict(self) -> dict:
+        return {
+            'file': self.filename,
+            'points': self.points,
+            'total_seconds': self.total_seconds,
+            'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+        }
+
+    def __getstate__(self):
+        # Profiles travel back from --jobs workers; open regions don't
+        return {'filename': self.filename, 'points': self.points, 'stages': self.stages, '_stack': []}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+class ProfileReport:
+    """Per-file profiles plus their aggregate."""
+
+    def __init__(self):
+        self.files: List[FileProfile] = []
+        self.totals: Dict[str, StageStats] = {name: StageStats() for name in STAGES}
+
+    def add(self, profile: Optional[FileProfile]):
+        if profile is None:
+            return
+        self.files.append(profile)
+        for name, stats in profile.stages.items():
+            self.totals[name].merge(stats)
+
+    def to_dict(self) -> dict:
+        return {
+            'files': [profile.to_dict() for profile in self.files],
+            'total': {name: stats.to_dict() for name, stats in self.totals.items()},
+        }
+
+    def print(self, out: TextIO = sys.stderr):
+        """Write per-file and aggregate stage tables."""
+        print(f"\n{'='*70}", file=out)
+        print(f"PROFILE: {len(self.files)} file(s)", file=out)
+        print(f"{'='*70}", file=out)
+        if len(self.files) > 1:
+            print(f"  {'File':<30} " + ' '.join(f'{name:>9}' for name in STAGES) + f" {'total':>9}", file=out)
+            for profile in self.files:
+                name = profile.filename.replace('\\', '/').rsplit('/', 1)[-1][:30]
+                print(f"  {name:<30} " + ' '.join(f'{profile.stages[stage].seconds:>8.3f}s' for stage in STAGES) +
+                      f" {profile.total_seconds:>8.3f}s", file=out)
+            print(file=out)
+
+        total = sum(stats.seconds for stats in self.totals.values()) or 1.0
+        print(f"  {'Stage':<10} {'Time':>10} {'Share':>7} {'Calls':>10} {'Peak':>10} {'Retained':>10}", file=out)
+        for name in STAGES:
+            stats = self.totals[name]
+            print(f"  {name:<10} {stats.seconds:>9.3f}s {stats.seconds / total:>6.1%} {stats.calls:>10} "
+                  f"{stats.peak / (1 << 20):>7.1f} MB {stats.retained / (1 << 20):>7.1f} MB", file=out)
+        print(f"  {'total':<10} {total:>9.3f}s", file=out)
@@ -0,0 +1,171 @@
+"""
+Resampling onto a uniform time grid (the ``resample`` subcommand).
+
+Recorded intervals vary from under a second to minutes, so two sessions
+cannot be compared point by point. resample() interpolates a track onto
+a fixed-stride grid (1 Hz, the app's LOCATION_UPDATE_INTERVAL, by
+default) in one vectorized pass: every grid time is located among the
+recorded times with a single searchsorted, and lat/lon/elevation are
+interpolated linearly between the two recorded points around it.
+
+Speeds (m/s) are interpolated where both neighbours recorded one;
+elsewhere the sample gets the average speed over the recorded interval
+it falls in, which is the speed of the interpolated position.
+
+Nothing is invented across gaps: a grid time inside a recorded interval
+longer than max_gap_s (the analyzer's anomaly threshold) is a gap sample,
+NaN in every column and False in ``valid``. Grid times are whole
+multiples of the interval since the epoch, so grids of different
+sessions line up without any shifting.
+"""
+
+import csv
+from dataclasses import dataclass
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from gpx_output import CHUNK_ROWS, iso_times
+from gpx_track import Track, haversine_distance
+from gpx_writer import write_gpx_stream
+
+DEFAULT_INTERVAL_S = 1.0  # Constants.LOCATION_UPDATE_INTERVAL
+DEFAULT_MAX_GAP_S = 120.0  # The analyzer's default anomaly threshold
+OUTPUT_FORMATS = ('npz', 'csv', 'gpx')
+CSV_FIELDS = ('time', 'lat', 'lon', 'ele', 'speed_ms')
+
+
+@dataclass
+class ResampledTrack:
+    """Columns sampled every interval_us from start_us; gap samples are NaN and not valid."""
+    start_us: int
+    interval_us: int
+    lat: np.ndarray
+    lon: np.ndarray
+    ele: np.ndarray
+    speed: np.ndarray
+    valid: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    @property
+    def time_us(self) -> np.ndarray:
+        return self.start_us + np.arange(len(self), dtype=np.int64) * self.interval_us
+
+    @property
+    def gap_samples(self) -> int:
+        return int(len(self) - np.count_nonzero(self.valid))
+
+
+def resample(
+    track: Track,
+    interval_s: float = DEFAULT_INTERVAL_S,
+    max_gap_s: float = DEFAULT_MAX_GAP_S
+) -> ResampledTrack:
+    """Interpolate a time-ordered track onto a uniform grid, leaving gaps over max_gap_s empty."""
+    interval_us = int(round(interval_s * 1e6))
+    if interval_us <= 0:
+        raise ValueError(f'interval must be positive (got {interval_s}s)')
+    if len(track) == 0:
+        empty = np.zeros(0)
+        return ResampledTrack(0, interval_us, empty, empty, empty, empty, np.zeros(0, dtype=bool))
+
+    time_us = track.time_us
+    start_us = -(-int(time_us[0]) // interval_us) * interval_us
+    grid = np.arange(start_us, int(time_us[-1]) + 1, interval_us, dtype=np.int64)
+    if len(track) == 1:
+        # A single point only fills a grid time it sits on exactly
+        left = right = np.zeros(len(grid), dtype=np.intp)
+    else:
+        # Recorded interval [left, right] holding each grid time (duplicate times resolve to the later point)
+        left = np.clip(np.searchsorted(time_us, grid, side='right') - 1, 0, len(track) - 2)
+        right = left + 1
+
+    span_us = time_us[right] - time_us[left]
+    on_point = grid == time_us[left]
+    bridged = (span_us > 0) & (span_us <= max_gap_s * 1e6)
+    valid = on_point | bridged
+    fraction = np.zeros(len(grid))
+    np.divide(grid - time_us[left], span_us, out=fraction, where=bridged)
+
+    def interpolate(column: np.ndarray) -> np.ndarray:
+        values = column[left] + fraction * (column[right] - column[left])
+        values[~valid] = np.nan
+        return values
+
+    distance = haversine_distance(track.lat[left], track.lon[left], track.lat[right], track.lon[right])
+    interval_speed = np.zeros(len(grid))
+    np.divide(distance, span_us / 1e6, out=interval_speed, where=bridged)
+    recorded = ~np.ma.getmaskarray(track.speed)
+    speed = np.where(recorded[left] & (recorded[right] | on_point),
+                     interpolate(track.speed.filled(0.0)), interval_speed)
+    speed[~valid] = np.nan
+
+    return ResampledTrack(
+        start_us=start_us,
+        interval_us=interval_us,
+        lat=interpolate(track.lat),
+        lon=interpolate(track.lon),
+        ele=interpolate(track.ele),
+        speed=speed,
+        valid=valid
+    )
+
+
+def write_npz(resampled: ResampledTrack, filepath: str):
+    """Save the fixed-stride columns (plus start_us and interval_us) with np.savez_compressed."""
+    np.savez_compressed(
+        filepath,
+        start_us=np.int64(resampled.start_us),
+        interval_us=np.int64(resampled.interval_us),
+        lat=resampled.lat,
+        lon=resampled.lon,
+        ele=resampled.ele,
+        speed=resampled.speed,
+        valid=resampled.valid
+    )
+
+
+def read_npz(filepath: str) -> ResampledTrack:
+    with np.load(filepath) as data:
+        return ResampledTrack(
+            start_us=int(data['start_us']),
+            interval_us=int(data['interval_us']),
+            lat=data['lat'],
+            lon=data['lon'],
+            ele=data['ele'],
+            speed=data['speed'],
+            valid=data['valid']
+        )
+
+
+def write_csv(resampled: ResampledTrack, filepath: str):
+    """One row per grid time; the value cells of gap samples are empty."""
+    with open(filepath, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(CSV_FIELDS)
+        time_us = resampled.time_us
+        for start in range(0, len(resampled), CHUNK_ROWS):
+            chunk = slice(start, start + CHUNK_ROWS)
+            columns = [np.where(resampled.valid[chunk], column[chunk], None).tolist()
+                       for column in (resampled.lat, resampled.lon, resampled.ele, resampled.speed)]
+            writer.writerows(zip(iso_times(time_us[chunk]), *columns))
+
+
+def _segment_points(resampled: ResampledTrack) -> Iterator[Tuple[tuple, bool]]:
+    """Valid samples as (point, new_segment), with a new segment after every gap."""
+    valid = resampled.valid
+    new_segment = np.ones(len(valid), dtype=bool)
+    new_segment[1:] = ~valid[:-1]
+    keep = np.flatnonzero(valid)
+    for lat, lon, ele, time_us, speed, new in zip(
+        resampled.lat[keep].tolist(), resampled.lon[keep].tolist(), resampled.ele[keep].tolist(),
+        resampled.time_us[keep].tolist(), resampled.speed[keep].tolist(), new_segment[keep].tolist()
+    ):
+        yield (lat, lon, ele, time_us, None, speed), new
+
+
+def write_resampled_gpx(resampled: ResampledTrack, filepath: str, name: str):
+    """The valid samples as GPX, one <trkseg> per stretch between gaps."""
+    write_gpx_stream(_segment_points(resampled), filepath, name)
@@ -0,0 +1,289 @@
+"""
+Byte-level trackpoint scanner for GPX files from known writers.
+
+The general GPX path (iterparse plus up to nine element lookups per
+<trkpt>, to cope with every namespace layout) is the slowest part of an
+analysis. Nearly every file we ingest comes from one of two writers,
+each with a fixed per-point layout:
+
+    Ski Tracks        <trkpt lat=".." lon="..">\\n<ele>..</ele>\\n<time>..</time></trkpt>
+    GpxWriter.kt      <trkpt lat=".." lon=".."> <ele/> <time/> [<extensions><accuracy/>]
+
+scan_gpx_file() sniffs the writer from the <gpx creator=...> header of a
+memory-mapped file (or of the decompressed stream of a .gpx.gz, .gpx.bz2
+or zip member) and then pulls every point's fields out with that
+writer's precompiled pattern, a chunk at a time. Columns are converted
+in bulk with NumPy and timestamps are decoded per fixed-width layout
+(see decode_iso_times()), so no per-point Python objects are built
+beyond the matched byte strings.
+
+The scanner only answers when it can vouch for the result: it returns
+None, and the caller falls back to the XML parser, for unknown creators,
+a different default namespace, comments or CDATA sections, a <trkpt>
+its pattern does not match exactly (extra elements, missing time), a
+value that does not convert, or a document that does not end in </gpx>
+(the XML parser reports truncated files).
+"""
+
+import mmap
+import re
+import zipfile
+import zlib
+from contextlib import nullcontext
+from datetime import timedelta, timezone
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from gpx_archive import is_packed, open_source
+from gpx_profile import FileProfile
+from gpx_track import Track
+
+# Bytes of matched document scanned per findall() call (chunks end on a <trkpt)
+CHUNK_BYTES = 8 << 20
+
+_CREATOR = re.compile(rb'<gpx\b[^>]*?\bcreator\s*=\s*["\']([^"\']*)["\']', re.DOTALL)
+_DEFAULT_NAMESPACE = re.compile(rb'<gpx\b[^>]*?\bxmlns\s*=\s*["\']([^"\']*)["\']', re.DOTALL)
+_GPX_NAMESPACE = b'http://www.topografix.com/GPX/1/1'
+
+# Fields captured by every writer pattern: lat, lon, ele, time, accuracy ('' when absent)
+_FIELDS = rb'<trkpt lat="([^"<]*)" lon="([^"<]*)">\s*<ele>([^<]*)</ele>\s*<time>([^<]*)</time>\s*'
+
+
+class WriterProfile(NamedTuple):
+    name: str
+    creator_prefix: bytes
+    trkpt: 're.Pattern[bytes]'
+
+
+WRITER_PROFILES = (
+    WriterProfile('Ski Tracks', b'Ski Tracks', re.compile(_FIELDS + rb'()</trkpt>')),
+    WriterProfile('GpxWriter', b'Ski GPX Recorder', re.compile(
+        _FIELDS + rb'(?:<extensions>\s*<accuracy>([^<]*)</accuracy>\s*</extensions>\s*)?</trkpt>')),
+)
+
+_ISO_LAYOUT = re.compile(
+    rb'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?P<fraction>\.\d{1,6})?(?P<zone>Z|[+-]\d{2}:?\d{2})?'
+)
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+_NO_STAGE = nullcontext()
+
+
+def detect_writer(header: bytes) -> Optional[WriterProfile]:
+    """The profile of the writer named in a GPX header (None if unknown or not plain GPX 1.1)."""
+    creator = _CREATOR.search(header)
+    namespace = _DEFAULT_NAMESPACE.search(header)
+    if creator is None or namespace is None or namespace.group(1).rstrip(b'/') != _GPX_NAMESPACE:
+        return None
+    for profile in WRITER_PROFILES:
+        if creator.group(1).startswith(profile.creator_prefix):
+            return profile
+    return None
+
+
+def _digits(digits: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Integer value of the columns start:stop of an (n, width) matrix of digit values."""
+    value = np.zeros(len(digits), dtype=np.int64)
+    for column in range(start, stop):
+        value = value * 10 + digits[:, column]
+    return value
+
+
+def _decode_layout(chars: np.ndarray, layout: 're.Match[bytes]') -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Epoch microseconds and UTC offsets (seconds) of same-layout timestamps, or None."""
+    fraction, zone = layout.group('fraction'), layout.group('zone')
+    width = len(layout.group(0))
+    separators = {4: b'-', 7: b'-', 10: b'T', 13: b':', 16: b':'}
+    if fraction:
+        separators[19] = b'.'
+    zone_start = width - len(zone) if zone else width
+    if zone == b'Z':
+        separators[zone_start] = b'Z'
+    elif zone:
+        separators[zone_start + 3] = b':' if len(zone) == 6 else None
+    separators = {column: char for column, char in separators.items() if char is not None}
+
+    if any((chars[:, column] != ord(char)).any() for column, char in separators.items()):
+        return None
+    digits = chars.astype(np.int64) - ord('0')
+    digit_columns = [column for column in range(zone_start) if column not in separators]
+    if zone and zone != b'Z':
+        digit_columns += [column for column in range(zone_start + 1, width) if column not in separators]
+        if not np.isin(chars[:, zone_start], (ord('+'), ord('-'))).all():
+            return None
+    if ((digits[:, digit_columns] < 0) | (digits[:, digit_columns] > 9)).any():
+        return None
+
+    year, month, day = _digits(digits, 0, 4), _digits(digits, 5, 7), _digits(digits, 8, 10)
+    hour, minute, second = _digits(digits, 11, 13), _digits(digits, 14, 16), _digits(digits, 17, 19)
+    if ((month < 1) | (month > 12) | (day < 1) | (hour > 23) | (minute > 59) | (second > 59)).any():
+        return None
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    if (day > _DAYS_IN_MONTH[month - 1] + ((month == 2) & leap)).any():
+        return None
+
+    # Days since the epoch (proleptic Gregorian, as date.toordinal())
+    shifted = year - (month <= 2)
+    era = shifted // 400
+    year_of_era = shifted - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    micros = np.zeros(len(chars), dtype=np.int64)
+    if fraction:
+        fraction_digits = len(fraction) - 1
+        micros = _digits(digits, 20, 20 + fraction_digits) * 10 ** (6 - fraction_digits)
+
+    offsets = np.zeros(len(chars), dtype=np.int64)
+    if zone and zone != b'Z':
+        minutes = _digits(digits, zone_start + 1, zone_start + 3) * 60 + _digits(digits, width - 2, width)
+        offsets = np.where(chars[:, zone_start] == ord('-'), -minutes, minutes) * 60
+
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second - offsets
+    return seconds * 1_000_000 + micros, offsets
+
+
+def decode_iso_times(values: np.ndarray) -> Optional[Tuple[np.ndarray, timezone]]:
+    """
+    Decode an array of ISO 8601 byte strings to epoch microseconds, plus
+    the zone of the first value (the file's local offset, as
+    TimestampDecoder reports it). Values are grouped by length and each
+    group, which shares one layout, is decoded column-wise. None if any
+    value does not fit the layout of its group.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.int64), timezone.utc
+    lengths = np.char.str_len(values)
+    chars = values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+    time_us = np.empty(len(values), dtype=np.int64)
+    first_offset = 0
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        layout = _ISO_LAYOUT.fullmatch(values[rows[0]])
+        if layout is None:
+            return None
+        decoded = _decode_layout(chars[rows, :length], layout)
+        if decoded is None:
+            return None
+        time_us[rows], offsets = decoded
+        if rows[0] == 0:
+            first_offset = int(offsets[0])
+    tz = timezone.utc if first_offset == 0 else timezone(timedelta(seconds=first_offset))
+    return time_us, tz
+
+
+def _mapped_chunks(buffer: mmap.mmap, start: int, profile: Optional[FileProfile]) -> Iterator[bytes]:
+    """Chunks of a memory-mapped document from start on, each ending just before a <trkpt."""
+    position = start
+    while position >= 0:
+        # Copying the chunk out of the map is where the file is actually read
+        with profile.stage('read') if profile else _NO_STAGE:
+            end = buffer.find(b'<trkpt', position + CHUNK_BYTES)
+            chunk = buffer[position:end if end >= 0 else len(buffer)]
+        yield chunk
+        position = end
+
+
+def _streamed_chunks(source: BinaryIO, pending: bytes, profile: Optional[FileProfile]) -> Iterator[bytes]:
+    """The same chunks read from a stream (a decompressing file), after the bytes already read."""
+    while True:
+        with profile.stage('read') if profile else _NO_STAGE:
+            block = source.read(CHUNK_BYTES)
+        if not block:
+            if pending:
+                yield pending
+            return
+        pending += block
+        cut = pending.rfind(b'<trkpt')
+        if cut > 0:
+            yield pending[:cut]
+            pending = pending[cut:]
+
+
+def _header_writer(header: bytes) -> Optional[WriterProfile]:
+    """The writer of the bytes before the first <trkpt>, unless a comment or CDATA could hide one there."""
+    if b'<!--' in header or b'<![CDATA[' in header:
+        return None
+    return detect_writer(header)
+
+
+def _scan_columns(chunks: Iterable[bytes], pattern: 're.Pattern[bytes]') -> Optional[List[np.ndarray]]:
+    """lat, lon, ele, time (bytes), accuracy columns of the trkpts in chunks, or None."""
+    columns = [[] for _ in range(5)]
+    last = b''
+    for chunk in chunks:
+        if b'<!--' in chunk or b'<![CDATA[' in chunk:
+            return None
+        matches = pattern.findall(chunk)
+        if len(matches) != chunk.count(b'<trkpt'):
+            return None
+        if matches:
+            for column, values in zip(columns, zip(*matches)):
+                column.append(np.array(values))
+        last = chunk
+    if not last.rstrip().endswith(b'</gpx>'):
+        return None
+    return [np.concatenate(column) if column else np.zeros(0, dtype='S1') for column in columns]
+
+
+def _floats(values: np.ndarray, missing_ok: bool = False) -> np.ndarray:
+    if missing_ok:
+        values = np.where(values == b'', b'nan', values)
+    return values.astype(np.float64)
+
+
+def _read_columns(filepath: str, profile: Optional[FileProfile]) -> Optional[List[np.ndarray]]:
+    if is_packed(filepath):
+        with open_source(filepath) as source:
+            with profile.stage('read') if profile else _NO_STAGE:
+                head = source.read(CHUNK_BYTES)
+            first_point = head.find(b'<trkpt')
+            writer = _header_writer(head[:first_point]) if first_point >= 0 else None
+            if writer is None:
+                return None
+            return _scan_columns(_streamed_chunks(source, head[first_point:], profile), writer.trkpt)
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        first_point = buffer.find(b'<trkpt')
+        writer = _header_writer(buffer[:first_point]) if first_point >= 0 else None
+        if writer is None:
+            return None
+        return _scan_columns(_mapped_chunks(buffer, first_point, profile), writer.trkpt)
+
+
+def scan_gpx_file(filepath: str, profile: Optional[FileProfile] = None) -> Optional[Track]:
+    """
+    Read a GPX file from a known writer into a Track in document order
+    (None when the file has to go through the XML parser instead). Plain
+    files are memory-mapped; compressed files and archive members
+    (gpx_archive) are scanned as they are decompressed. With a
+    FileProfile, file reads and timestamp decoding get their own stages.
+    """
+    try:
+        columns = _read_columns(filepath, profile)
+    except (OSError, ValueError, EOFError, zlib.error, zipfile.BadZipFile):
+        return None  # Unreadable, empty or corrupt: let the XML parser report it
+    if columns is None:
+        return None
+
+    lat, lon, ele, time_text, accuracy = columns
+    with profile.stage('decode') if profile else _NO_STAGE:
+        times = decode_iso_times(time_text)
+    if times is None:
+        return None
+    try:
+        lat, lon, ele = _floats(lat), _floats(lon), _floats(ele)
+        accuracy = _floats(accuracy, missing_ok=True) if len(accuracy) else np.zeros(0)
+    except ValueError:
+        return None
+    time_us, tz = times
+    return Track(
+        lat=lat,
+        lon=lon,
+        ele=ele,
+        time_us=time_us,
+        accuracy=np.ma.MaskedArray(accuracy, mask=np.isnan(accuracy)),
+        tz=tz
+    )
@@ -0,0 +1,330 @@
+"""
+Long-running analysis server (the ``serve`` subcommand).
+
+Dashboards that run gpx_analyzer.py as a subprocess pay interpreter
+startup, imports, argument parsing and a full parse on every call. The
+server pays them once:
+
+- An asyncio loop accepts requests on localhost HTTP
+  (GET /<operation>?path=...&param=value) or on a Unix socket (one JSON
+  object per line in each direction, {"op": ..., "path": ..., ...}).
+- Parsed tracks and encoded responses are kept in an in-memory LRU cache
+  bounded in bytes and keyed by the file's path, size and mtime, so a
+  repeated query is answered from memory and an edited file is re-read.
+- Parsing and analysis run in a worker pool, so the loop keeps answering
+  cached queries while a large file is parsed. Concurrent requests for
+  the same answer share one computation, and a pool broken by a dead
+  worker (killed, out of memory) is replaced for the next request.
+
+The operations are supplied by the caller (gpx_analyzer.py): their names,
+their parameters with default values (which also give the parameter
+types), and a module-level handler(operation, filepath, params, track)
+returning (the track if it had to be parsed, JSON-ready payload), so it
+can run in a worker process. GET /status (op "status") reports the cache.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import stat
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Executor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from gpx_archive import absolute_source, source_stat, split_member
+from gpx_track import Track
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MEMORY_MB = 256
+
+Handler = Callable[[str, str, Dict[str, Any], Optional[Track]], Tuple[Optional[Track], Any]]
+
+_HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+class RequestError(Exception):
+    """A request that cannot be answered, with the HTTP status to report."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def track_nbytes(track: Track) -> int:
+    """Memory held by a track's columns."""
+    columns = (track.lat, track.lon, track.ele, track.time_us, track.accuracy, track.speed)
+    masks = (np.ma.getmask(track.accuracy), np.ma.getmask(track.speed))
+    return sum(column.nbytes for column in columns) + sum(mask.nbytes for mask in masks)
+
+
+def _cached_size(value) -> int:
+    return len(value) if isinstance(value, bytes) else track_nbytes(value)
+
+
+def init_worker():
+    """
+    Worker initializer. Ctrl-C is left to the server, which shuts the pool
+    down; workers forked after the loop installed its handlers get the
+    default SIGTERM back so they can still be killed on their own.
+    """
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+class LruCache:
+    """In-memory LRU mapping bounded by the total size of its values."""
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = _cached_size):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries: 'OrderedDict[Hashable, Tuple[Any, int]]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value):
+        size = self.sizeof(value)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class AnalysisServer:
+    """Answers operation requests for track files from memory or a worker pool."""
+
+    def __init__(
+        self,
+        handler: Handler,
+        operations: Dict[str, Dict[str, Any]],
+        make_executor: Callable[[], Executor],
+        memory_bytes: int = DEFAULT_MEMORY_MB << 20
+    ):
+        self.handler = handler
+        self.operations = operations
+        self.make_executor = make_executor
+        self.executor = make_executor()
+        self.cache = LruCache(memory_bytes)
+        self.pending: Dict[Hashable, asyncio.Future] = {}
+        self.requests = 0
+        self.computed = 0
+
+    def status(self) -> dict:
+        return {
+            'requests': self.requests,
+            'computed': self.computed,
+            'pending': len(self.pending),
+            'cache_entries': len(self.cache),
+            'cache_bytes': self.cache.bytes,
+            'cache_max_bytes': self.cache.max_bytes,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
+
+    def _parameters(self, operation: str, values: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """The file path and the operation's full, typed parameters from request values."""
+        if operation not in self.operations:
+            raise RequestError(404, f'unknown operation {operation!r} '
+                                    f'(expected one of: {", ".join(self.operations)}, status)')
+        path = values.get('path')
+        if not path or not isinstance(path, str):
+            raise RequestError(400, 'missing path')
+
+        params = {}
+        for name, default in self.operations[operation].items():
+            value = values.get(name, default)
+            try:
+                params[name] = type(default)(value)
+            except (TypeError, ValueError):
+                raise RequestError(400, f'invalid {name} {value!r}')
+        unknown = set(values) - set(params) - {'path'}
+        if unknown:
+            raise RequestError(400, f'unknown parameter(s): {", ".join(sorted(unknown))}')
+        return path, params
+
+    async def answer(self, operation: str, values: Dict[str, Any]) -> bytes:
+        """The JSON-encoded answer to one request (raises RequestError)."""
+        self.requests += 1
+        if operation == 'status':
+            return json.dumps(self.status()).encode()
+        path, params = self._parameters(operation, values)
+
+        path = absolute_source(path)
+        if not os.path.isfile(split_member(path)[0]):
+            raise RequestError(404, f'{path}: no such file')
+        try:
+            size, mtime_ns = source_stat(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            raise RequestError(404, f'{path}: {e}')
+        identity = (path, size, mtime_ns)
+
+        key = (operation, identity, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self.pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._compute(key, operation, identity, params))
+            self.pending[key] = pending
+            pending.add_done_callback(lambda _: self.pending.pop(key, None))
+        # A client hanging up must not cancel work other requests are waiting for
+        return await asyncio.shield(pending)
+
+    async def _compute(self, key: Hashable, operation: str, identity: tuple, params: Dict[str, Any]) -> bytes:
+        track_key = ('track', identity)
+        track = self.cache.get(track_key)
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            parsed, payload = await loop.run_in_executor(
+                executor, self.handler, operation, identity[0], params, track)
+        except BrokenExecutor as e:
+            if self.executor is executor:
+                executor.shutdown(wait=False)
+                self.executor = self.make_executor()
+            raise RequestError(500, f'{os.path.basename(identity[0])}: {e}')
+        except Exception as e:
+            raise RequestError(500, f'{os.path.basename(identity[0])}: {e}')
+        self.computed += 1
+        if parsed is not None:
+            self.cache.put(track_key, parsed)
+        response = json.dumps(payload).encode()
+        self.cache.put(key, response)
+        return response
+
+    async def respond(self, operation: str, values: Dict[str, Any]) -> Tuple[int, bytes]:
+        """(HTTP status, JSON body) for one request; errors become {"error": message}."""
+        try:
+            return 200, await self.answer(operation, values)
+        except RequestError as e:
+            return e.status, json.dumps({'error': str(e)}).encode()
+
+    async def _serve_lines(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Unix socket protocol: one JSON request per line, answered in order."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if isinstance(request, dict):
+                    _, body = await self.respond(str(request.pop('op', '')), request)
+                else:
+                    body = json.dumps({'error': 'expected one JSON object per line'}).encode()
+                writer.write(body + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # Client went away, or sent an over-long line
+        finally:
+            writer.close()
+
+    async def _serve_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 (GET only, keep-alive) for localhost clients."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                # Bodies carry nothing we use, but must be consumed to keep the connection in step
+                if int(headers.get('content-length') or 0):
+                    await reader.readexactly(int(headers['content-length']))
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, body = 400, json.dumps({'error': 'malformed request line'}).encode()
+                elif parts[0] not in ('GET', 'HEAD'):
+                    status, body = 405, json.dumps({'error': f'method {parts[0]} not allowed'}).encode()
+                else:
+                    url = urlsplit(parts[1])
+                    status, body = await self.respond(url.path.strip('/'), dict(parse_qsl(url.query)))
+
+                keep_alive = (len(parts) == 3 and parts[2] == 'HTTP/1.1' and
+                              headers.get('connection', '').lower() != 'close')
+                writer.write(
+                    f'HTTP/1.1 {status} {_HTTP_REASONS.get(status, "")}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(body)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1')
+                )
+                if parts[0] != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, socket_path: Optional[str] = None, host: str = DEFAULT_HOST,
+                    port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        """Start listening on socket_path (Unix socket) or host:port (HTTP)."""
+        if socket_path:
+            return await asyncio.start_unix_server(self._serve_lines, path=socket_path)
+        return await asyncio.start_server(self._serve_http, host, port)
+
+    def run(self, socket_path: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+            on_ready: Optional[Callable[[asyncio.AbstractServer], None]] = None):
+        """Serve until Ctrl-C or SIGTERM."""
+        async def serve():
+            server = await self.start(socket_path, host, port)
+            stopped = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(signum, stopped.set)
+                except (NotImplementedError, RuntimeError):
+                    pass  # No loop signal handlers here; Ctrl-C still raises KeyboardInterrupt
+            async with server:
+                if on_ready:
+                    on_ready(server)
+                await stopped.wait()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown()
+            if socket_path and os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.unlink(socket_path)
@@ -0,0 +1,165 @@
+"""
+Spatial queries over tracks: which sessions passed through an area, and when.
+
+A query is a bounding box or a circle (centre and radius in metres). It
+runs in two stages:
+
+1. File pruning. GPX exports from Ski Tracks carry
+   <metadata><bounds minlat= minlon= maxlat= maxlon=/>; read_header_bounds()
+   reads it from the first few kilobytes of the file, and files whose
+   bounds miss every query area are never parsed. Files without bounds
+   (the app's own GpxWriter output, FIT files) are always parsed.
+
+2. Point lookup. query_points() masks a surviving track's lat/lon
+   columns (usually straight from the track cache) against the area's
+   bounding box in one vectorized pass; only the points inside it are
+   tested exactly against a circle. A per-track spatial index would have
+   to be built (sorted) on every query, which costs more than the mask.
+
+The Ski Tracks exports we have seen (creator "Ski Tracks - Android") get
+minlat, minlon and maxlon exactly right but write a maxlat south of the
+track's northernmost point, so that one value is not trusted for pruning
+(see _UNRELIABLE_BOUNDS). Areas crossing the antimeridian are not
+supported.
+"""
+
+import math
+import re
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from gpx_archive import open_source
+from gpx_track import haversine_distance
+
+# Bytes read when looking for <metadata><bounds>
+HEADER_BYTES = 16384
+
+EARTH_RADIUS_M = 6371000
+
+_BOUNDS_TAG = re.compile(rb'<bounds\b([^>]*)>')
+_BOUNDS_ATTRIBUTE = re.compile(rb'\b(minlat|minlon|maxlat|maxlon)\s*=\s*["\']([^"\']*)["\']')
+_CREATOR = re.compile(rb'<gpx\b[^>]*?\bcreator\s*=\s*["\']([^"\']*)["\']', re.DOTALL)
+
+# Creator prefix -> bounds attributes that writer gets wrong
+_UNRELIABLE_BOUNDS = (
+    (b'Ski Tracks', ('maxlat',)),
+)
+# Value an unreliable attribute is widened to
+_GLOBE = {'minlat': -90.0, 'maxlat': 90.0, 'minlon': -180.0, 'maxlon': 180.0}
+
+
+class BoundingBox(NamedTuple):
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+
+    @property
+    def bounds(self) -> 'BoundingBox':
+        return self
+
+    def intersects(self, other: 'BoundingBox') -> bool:
+        return (self.min_lat <= other.max_lat and other.min_lat <= self.max_lat and
+                self.min_lon <= other.max_lon and other.min_lon <= self.max_lon)
+
+    def contains(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        return (lat >= self.min_lat) & (lat <= self.max_lat) & (lon >= self.min_lon) & (lon <= self.max_lon)
+
+    def __str__(self) -> str:
+        return f'bbox {self.min_lat:g},{self.min_lon:g},{self.max_lat:g},{self.max_lon:g}'
+
+
+class Circle(NamedTuple):
+    lat: float
+    lon: float
+    radius_m: float
+
+    @property
+    def bounds(self) -> BoundingBox:
+        """Smallest lat/lon box around the circle."""
+        delta_lat = math.degrees(self.radius_m / EARTH_RADIUS_M)
+        min_lat, max_lat = max(self.lat - delta_lat, -90.0), min(self.lat + delta_lat, 90.0)
+        widest = max(abs(min_lat), abs(max_lat))
+        if widest >= 90.0:
+            return BoundingBox(min_lat, -180.0, max_lat, 180.0)
+        delta_lon = min(delta_lat / math.cos(math.radians(widest)), 180.0)
+        return BoundingBox(min_lat, self.lon - delta_lon, max_lat, self.lon + delta_lon)
+
+    def intersects(self, other: BoundingBox) -> bool:
+        return self.bounds.intersects(other)
+
+    def contains(self, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        if not len(lat):
+            return np.zeros(0, dtype=bool)
+        return haversine_distance(lat, lon, self.lat, self.lon) <= self.radius_m
+
+    def __str__(self) -> str:
+        return f'{self.radius_m:g} m around {self.lat:g},{self.lon:g}'
+
+
+Area = Union[BoundingBox, Circle]
+
+
+def parse_area(kind: str, text: str) -> Area:
+    """A BoundingBox from 'minlat,minlon,maxlat,maxlon' or a Circle from 'lat,lon,metres'."""
+    try:
+        values = [float(value) for value in text.split(',')]
+    except ValueError:
+        raise ValueError(f'invalid {kind} {text!r}: expected comma-separated numbers')
+    if kind == 'bbox':
+        if len(values) != 4 or values[0] > values[2] or values[1] > values[3]:
+            raise ValueError(f'invalid bbox {text!r}: expected minlat,minlon,maxlat,maxlon')
+        return BoundingBox(*values)
+    if len(values) != 3 or values[2] < 0:
+        raise ValueError(f'invalid radius {text!r}: expected lat,lon,metres')
+    return Circle(*values)
+
+
+def read_header_bounds(filepath: str, header_bytes: int = HEADER_BYTES) -> Optional[BoundingBox]:
+    """
+    The <metadata><bounds> of a GPX file, read from its first header_bytes
+    only (None if the header has none). Values known to be unreliable for
+    the file's creator are widened to the whole globe.
+    """
+    with open_source(filepath) as f:
+        header = f.read(header_bytes)
+    first_point = header.find(b'<trkpt')
+    if first_point >= 0:
+        header = header[:first_point]
+    match = _BOUNDS_TAG.search(header)
+    if match is None:
+        return None
+    values = {name.decode(): value for name, value in _BOUNDS_ATTRIBUTE.findall(match.group(1))}
+    try:
+        bounds = {name: float(values[name]) for name in ('minlat', 'minlon', 'maxlat', 'maxlon')}
+    except (KeyError, ValueError):
+        return None
+
+    creator = _CREATOR.search(header)
+    for prefix, unreliable in _UNRELIABLE_BOUNDS:
+        if creator and creator.group(1).startswith(prefix):
+            for name in unreliable:
+                bounds[name] = _GLOBE[name]
+    return BoundingBox(bounds['minlat'], bounds['minlon'], bounds['maxlat'], bounds['maxlon'])
+
+
+def query_points(area: Area, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Sorted indices of the points inside area."""
+    candidates = np.flatnonzero(area.bounds.contains(lat, lon))
+    if isinstance(area, BoundingBox):
+        return candidates
+    return candidates[area.contains(lat[candidates], lon[candidates])]
+
+
+def passes(indices: np.ndarray, time_us: np.ndarray, max_gap_seconds: float = 60) -> List[Tuple[int, int]]:
+    """
+    Group matching point indices into visits: (first, last) index pairs,
+    split wherever consecutive matches are more than max_gap_seconds apart.
+    """
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(time_us[indices]) > max_gap_seconds * 1e6)
+    starts = np.concatenate([[0], breaks + 1])
+    ends = np.concatenate([breaks, [len(indices) - 1]])
+    return list(zip(indices[starts].tolist(), indices[ends].tolist()))
@@ -0,0 +1,176 @@
+"""
+Constant-memory statistics for streaming analysis.
+
+RunningStats keeps count/mean/variance (Welford), min, max and total;
+P2Quantile estimates a quantile with the P-square algorithm using five
+markers; AnomalyRetention keeps a bounded selection of anomalies. None of
+them store the observations themselves, so an unbounded point stream can
+be summarised in O(1) memory.
+"""
+
+import heapq
+import math
+from typing import Any, List, Optional
+
+RETENTION_POLICIES = ('first', 'worst')
+
+
+class RunningStats:
+    """Welford mean/variance plus count, min, max and total."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'total')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStats'):
+        """Fold another accumulator into this one (Chan et al. parallel update)."""
+        if not other.count:
+            return
+        if not self.count:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 for fewer than two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate (Jain & Chlamtac P-square algorithm).
+
+    Exact for up to five observations; afterwards five markers are moved
+    with piecewise-parabolic interpolation.
+    """
+
+    __slots__ = ('p', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p: float = 0.5):
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value: float):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or \
+                    (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + step * (heights[i + step] - heights[i]) / \
+                        (positions[i + step] - positions[i])
+                heights[i] = candidate
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> float:
+        heights = self.heights
+        if not heights:
+            return 0.0
+        if len(heights) < 5:
+            # Exact quantile of the few values seen so far (median averages the middle pair)
+            position = self.p * (len(heights) - 1)
+            lower = int(position)
+            upper = min(lower + 1, len(heights) - 1)
+            return heights[lower] + (heights[upper] - heights[lower]) * (position - lower)
+        return heights[2]
+
+
+class AnomalyRetention:
+    """
+    Bounded anomaly store.
+
+    policy 'first' keeps the first ``limit`` anomalies offered, 'worst'
+    keeps the ``limit`` with the highest severity. With no limit every
+    anomaly is kept. items() always returns them in arrival order.
+    """
+
+    def __init__(self, limit: Optional[int] = None, policy: str = 'first'):
+        if policy not in RETENTION_POLICIES:
+            raise ValueError(f"Unknown retention policy: {policy}")
+        self.limit = limit
+        self.policy = policy
+        self.seen = 0
+        self._kept = []
+
+    def offer(self, severity: float, item: Any):
+        sequence = self.seen
+        self.seen += 1
+        if self.limit is None or len(self._kept) < self.limit:
+            if self.policy == 'worst':
+                heapq.heappush(self._kept, (severity, sequence, item))
+            else:
+                self._kept.append((severity, sequence, item))
+        elif self.policy == 'worst' and self.limit and severity > self._kept[0][0]:
+            heapq.heapreplace(self._kept, (severity, sequence, item))
+
+    @property
+    def dropped(self) -> int:
+        return self.seen - len(self._kept)
+
+    def items(self) -> List[Any]:
+        return [item for _, _, item in sorted(self._kept, key=lambda entry: entry[1])]
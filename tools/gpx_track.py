@@ -0,0 +1,238 @@
+"""
+Track data model shared by the GPX tooling.
+
+A Track stores a recording as a struct of arrays instead of one object per
+point: contiguous float64 columns for lat/lon/elevation, int64 epoch
+microseconds for timestamps and masked float64 columns for the optional
+accuracy and speed extensions. Indexing or iterating a Track yields
+Waypoint views, so code written against List[Waypoint] keeps working.
+"""
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Iterable, Iterator, Optional, Union
+
+import math
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclass
+class Waypoint:
+    """Represents a single GPS waypoint from a GPX file."""
+    lat: float
+    lon: float
+    elevation: float
+    timestamp: datetime
+    accuracy: Optional[float] = None
+    speed: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return f"Waypoint(lat={self.lat:.6f}, lon={self.lon:.6f}, time={self.timestamp.isoformat()})"
+
+
+def datetime_to_epoch_us(timestamp: datetime) -> int:
+    """Convert a datetime to integer epoch microseconds (naive values are taken as UTC)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // ONE_MICROSECOND
+
+
+def epoch_us_to_datetime(epoch_us: int, tz: tzinfo = timezone.utc) -> datetime:
+    """Convert integer epoch microseconds back to an aware datetime in ``tz``."""
+    return (EPOCH + timedelta(microseconds=int(epoch_us))).astimezone(tz)
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """
+    Calculate the great-circle distance between two points on Earth.
+    Returns distance in meters.
+
+    Accepts scalars or NumPy arrays; arrays are evaluated element-wise in
+    one batch and an array of distances is returned.
+    """
+    R = 6371000  # Earth's radius in meters
+
+    if np.ndim(lat1) or np.ndim(lon1) or np.ndim(lat2) or np.ndim(lon2):
+        phi1 = np.radians(lat1)
+        phi2 = np.radians(lat2)
+        delta_phi = np.radians(np.subtract(lat2, lat1))
+        delta_lambda = np.radians(np.subtract(lon2, lon1))
+
+        a = np.sin(delta_phi / 2) ** 2 + \
+            np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+        return R * c
+
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+
+    a = math.sin(delta_phi / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return R * c
+
+
+def _masked(values: np.ndarray) -> np.ma.MaskedArray:
+    """Wrap a float64 column, masking the NaN placeholders used for missing values."""
+    return np.ma.MaskedArray(values, mask=np.isnan(values))
+
+
+class Track:
+    """
+    Columnar GPS track.
+
+    Attributes:
+        lat, lon, ele: float64 arrays
+        time_us: int64 epoch microseconds (integer, so interval arithmetic is exact)
+        accuracy, speed: masked float64 arrays, masked where the point had no value
+        tz: timezone used when materialising Waypoint views
+    """
+
+    __slots__ = ('lat', 'lon', 'ele', 'time_us', 'accuracy', 'speed', 'tz')
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        ele: np.ndarray,
+        time_us: np.ndarray,
+        accuracy: Optional[np.ma.MaskedArray] = None,
+        speed: Optional[np.ma.MaskedArray] = None,
+        tz: tzinfo = timezone.utc
+    ):
+        n = len(time_us)
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        self.ele = np.ascontiguousarray(ele, dtype=np.float64)
+        self.time_us = np.ascontiguousarray(time_us, dtype=np.int64)
+        self.accuracy = accuracy if accuracy is not None else _masked(np.full(n, np.nan))
+        self.speed = speed if speed is not None else _masked(np.full(n, np.nan))
+        self.tz = tz
+
+    @classmethod
+    def empty(cls) -> 'Track':
+        return cls(np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_waypoints(cls, waypoints: Iterable[Waypoint]) -> 'Track':
+        """
+        Build a Track from waypoints in a single pass.
+
+        Values are appended to typed array buffers as they arrive, so a
+        streaming source such as iter_gpx_waypoints() never materialises
+        per-point objects beyond the one currently being consumed.
+        """
+        first_tz = []
+
+        def rows():
+            for wp in waypoints:
+                if not first_tz:
+                    first_tz.append(wp.timestamp.tzinfo or timezone.utc)
+                yield (wp.lat, wp.lon, wp.elevation, datetime_to_epoch_us(wp.timestamp),
+                       wp.accuracy, wp.speed)
+
+        track = cls.from_rows(rows())
+        if first_tz:
+            track.tz = first_tz[0]
+        return track
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple], tz: tzinfo = timezone.utc) -> 'Track':
+        """
+        Build a Track from (lat, lon, elevation, epoch_us, accuracy, speed) tuples.
+
+        This is the allocation-light path used by the parsers: timestamps are
+        already integers, so no datetime objects are involved.
+        """
+        lat, lon, ele = array('d'), array('d'), array('d')
+        time_us = array('q')
+        accuracy, speed = array('d'), array('d')
+        nan = float('nan')
+
+        for row_lat, row_lon, row_ele, row_time_us, row_accuracy, row_speed in rows:
+            lat.append(row_lat)
+            lon.append(row_lon)
+            ele.append(row_ele)
+            time_us.append(row_time_us)
+            accuracy.append(nan if row_accuracy is None else row_accuracy)
+            speed.append(nan if row_speed is None else row_speed)
+
+        return cls(
+            lat=np.frombuffer(lat, dtype=np.float64),
+            lon=np.frombuffer(lon, dtype=np.float64),
+            ele=np.frombuffer(ele, dtype=np.float64),
+            time_us=np.frombuffer(time_us, dtype=np.int64),
+            accuracy=_masked(np.frombuffer(accuracy, dtype=np.float64)),
+            speed=_masked(np.frombuffer(speed, dtype=np.float64)),
+            tz=tz
+        )
+
+    @property
+    def time(self) -> np.ndarray:
+        """Timestamps as float64 epoch seconds."""
+        return self.time_us / 1e6
+
+    @property
+    def duration_seconds(self) -> float:
+        if len(self) < 2:
+            return 0.0
+        return int(self.time_us[-1] - self.time_us[0]) / 1e6
+
+    def take(self, indices) -> 'Track':
+        """Return a new Track holding the points selected by an index array, slice or mask."""
+        return Track(
+            lat=self.lat[indices],
+            lon=self.lon[indices],
+            ele=self.ele[indices],
+            time_us=self.time_us[indices],
+            accuracy=self.accuracy[indices],
+            speed=self.speed[indices],
+            tz=self.tz
+        )
+
+    def sorted(self) -> 'Track':
+        """Return the track in time order (stable, like list.sort on timestamps)."""
+        if len(self) < 2 or bool(np.all(self.time_us[1:] >= self.time_us[:-1])):
+            return self
+        return self.take(np.argsort(self.time_us, kind='stable'))
+
+    def waypoint(self, index: int) -> Waypoint:
+        """Materialise the point at ``index`` as a Waypoint."""
+        accuracy = self.accuracy[index]
+        speed = self.speed[index]
+        return Waypoint(
+            lat=float(self.lat[index]),
+            lon=float(self.lon[index]),
+            elevation=float(self.ele[index]),
+            timestamp=epoch_us_to_datetime(self.time_us[index], self.tz),
+            accuracy=None if accuracy is np.ma.masked else float(accuracy),
+            speed=None if speed is np.ma.masked else float(speed)
+        )
+
+    def __len__(self) -> int:
+        return len(self.time_us)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Waypoint, 'Track']:
+        if isinstance(index, slice):
+            return self.take(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('track index out of range')
+        return self.waypoint(index)
+
+    def __iter__(self) -> Iterator[Waypoint]:
+        for i in range(len(self)):
+            yield self.waypoint(i)
+
+    def __repr__(self) -> str:
+        return f"Track(points={len(self)}, duration={self.duration_seconds:.0f}s)"
@@ -0,0 +1,98 @@
+"""
+GPX output in the layout of the app's GpxWriter (GpxWriter.kt).
+
+Points are formatted with repr() so coordinates and elevations
+round-trip exactly through the parser, and written in chunks of
+chunk_size points with one writelines() call each. write_gpx_stream()
+writes a point stream (e.g. a merge) with its segments, without holding
+the points.
+"""
+
+import itertools
+import time
+from typing import Iterable, Optional, TextIO, Tuple
+
+from gpx_track import Track
+
+
+def iso_instant(epoch_us: int) -> str:
+    """java.time ISO_INSTANT formatting, as GpxWriter uses (fraction only when non-zero)."""
+    seconds, micros = divmod(int(epoch_us), 1_000_000)
+    text = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+    if micros:
+        text += f'.{micros // 1000:03d}' if micros % 1000 == 0 else f'.{micros:06d}'
+    return text + 'Z'
+
+
+def _trkpt(lat: float, lon: float, ele: float, time_us: int, accuracy: Optional[float]) -> str:
+    return (
+        f'      <trkpt lat="{lat!r}" lon="{lon!r}">\n'
+        f'        <ele>{ele!r}</ele>\n'
+        f'        <time>{iso_instant(time_us)}</time>\n'
+        + (f'        <extensions>\n          <accuracy>{accuracy!r}</accuracy>\n        </extensions>\n'
+           if accuracy is not None and accuracy > 0 else '')
+        + '      </trkpt>\n'
+    )
+
+
+def _write_header(f: TextIO, name: str, start_us: Optional[int]):
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<gpx version="1.1" creator="Ski GPX Recorder" xmlns="http://www.topografix.com/GPX/1/1">\n')
+    f.write('  <metadata>\n')
+    f.write(f'    <name>{name}</name>\n')
+    f.write(f'    <time>{iso_instant(start_us) if start_us is not None else ""}</time>\n')
+    f.write('  </metadata>\n')
+    f.write('  <trk>\n')
+    f.write(f'    <name>{name}</name>\n')
+
+
+def write_gpx(track: Track, filepath: str, name: str, chunk_size: int = 50_000):
+    """Write a track in the layout of the app's GpxWriter."""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        _write_header(f, name, track.time_us[0] if len(track) else None)
+        f.write('    <trkseg>\n')
+        accuracy = track.accuracy.filled(0.0)
+        for start in range(0, len(track), chunk_size):
+            stop = min(start + chunk_size, len(track))
+            f.writelines(
+                _trkpt(lat, lon, ele, t, acc)
+                for lat, lon, ele, t, acc in zip(
+                    track.lat[start:stop].tolist(), track.lon[start:stop].tolist(),
+                    track.ele[start:stop].tolist(), track.time_us[start:stop].tolist(),
+                    accuracy[start:stop].tolist()
+                )
+            )
+        f.write('    </trkseg>\n')
+        f.write('  </trk>\n')
+        f.write('</gpx>\n')
+
+
+def write_gpx_stream(points: Iterable[Tuple[tuple, bool]], filepath: str, name: str,
+                     chunk_size: int = 50_000) -> int:
+    """
+    Write (point, new_segment) pairs as they arrive, opening a <trkseg> at
+    each new segment; points are (lat, lon, elevation, epoch_us, accuracy,
+    speed) rows. Returns the number of points written.
+    """
+    points = iter(points)
+    first = next(points, None)
+    count = 0
+    with open(filepath, 'w', encoding='utf-8') as f:
+        _write_header(f, name, first[0][3] if first is not None else None)
+        if first is not None:
+            lines = []
+            for (lat, lon, ele, time_us, accuracy, _), new_segment in itertools.chain([first], points):
+                if not count:
+                    lines.append('    <trkseg>\n')
+                elif new_segment:
+                    lines.append('    </trkseg>\n    <trkseg>\n')
+                lines.append(_trkpt(lat, lon, ele, time_us, accuracy))
+                count += 1
+                if len(lines) >= chunk_size:
+                    f.writelines(lines)
+                    lines.clear()
+            f.writelines(lines)
+            f.write('    </trkseg>\n')
+        f.write('  </trk>\n')
+        f.write('</gpx>\n')
+    return count
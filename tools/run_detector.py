@@ -0,0 +1,180 @@
+"""
+Array port of the app's RunDetector (domain/RunDetector.kt).
+
+Same window-based algorithm and constants as the app:
+1. Smooth elevations and speeds (5-point window)
+2. Mark descent points (20-point trend window)
+3. Detect raw segments (contiguous descent regions)
+4. Combine segments (gap <120s, ascent <50m)
+5. Filter (duration >=60s, vertical >=30m)
+
+Steps 1-3 are whole-array operations (cumulative sums, shifted indexing
+and edge detection on the descent mask), so detection is linear in the
+number of points. Only the handful of segments is walked in Python.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from gpx_track import Track
+from stats_calculator import segment_distances, smooth_elevations, smooth_speeds, track_time_ms
+
+# Mirrors util/Constants.kt
+RUN_DETECTION_SPEED_THRESHOLD = 5.0  # km/h - minimum speed to be considered moving
+RUN_DETECTION_MIN_DURATION = 60  # seconds - minimum run duration
+RUN_DETECTION_MIN_VERTICAL = 30.0  # meters - minimum vertical drop
+RUN_DETECTION_TREND_WINDOW = 20  # points - window size for trend-based detection
+RUN_DETECTION_MIN_WINDOW_DROP = 10.0  # meters - minimum elevation drop in window
+RUN_DETECTION_MAX_GAP_TIME = 120  # seconds - maximum gap time to combine segments
+RUN_DETECTION_MAX_ASCENT_IN_GAP = 50.0  # meters - maximum ascent in gap to combine segments
+
+
+@dataclass
+class SkiRun:
+    """A detected ski run (downhill segment); fields mirror data/model/SkiRun.kt."""
+    run_number: int
+    start_index: int
+    end_index: int
+    start_time: int  # epoch milliseconds
+    end_time: int  # epoch milliseconds
+    start_elevation: float
+    end_elevation: float
+    max_speed: float  # km/h
+    avg_speed: float  # km/h, distance-weighted
+    distance: float  # meters
+    vertical_drop: float  # meters
+    avg_slope: float  # percent
+    point_count: int
+
+    @property
+    def duration_seconds(self) -> int:
+        return (self.end_time - self.start_time) // 1000
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def mark_descent_points(smoothed_elevations: np.ndarray, smoothed_speeds: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of points that are moving (smoothed speed >= 5 km/h) and
+    whose +/-10 point trend window drops by at least 10 m.
+    """
+    n = len(smoothed_elevations)
+    half_window = RUN_DETECTION_TREND_WINDOW // 2
+    index = np.arange(n)
+    window_start = np.maximum(index - half_window, 0)
+    window_end = np.minimum(index + half_window, n - 1)
+    elevation_drop = smoothed_elevations[window_start] - smoothed_elevations[window_end]
+    return (smoothed_speeds >= np.float32(RUN_DETECTION_SPEED_THRESHOLD)) & \
+        (elevation_drop >= np.float32(RUN_DETECTION_MIN_WINDOW_DROP))
+
+
+def detect_raw_segments(is_descending: np.ndarray) -> List[Tuple[int, int]]:
+    """Contiguous descent regions as inclusive (start, end) index pairs."""
+    edges = np.diff(np.concatenate(([0], is_descending.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def combine_segments(
+    segments: List[Tuple[int, int]],
+    time_ms: np.ndarray,
+    smoothed_elevations: np.ndarray
+) -> List[Tuple[int, int]]:
+    """Merge consecutive segments separated by <=120 s with <=50 m of ascent."""
+    if len(segments) <= 1:
+        return list(segments)
+
+    combined = []
+    current_start, current_end = segments[0]
+    for next_start, next_end in segments[1:]:
+        gap_time = int(time_ms[next_start] - time_ms[current_end]) // 1000
+        ascent = smoothed_elevations[next_start] - smoothed_elevations[current_end]
+        if gap_time <= RUN_DETECTION_MAX_GAP_TIME and ascent <= np.float32(RUN_DETECTION_MAX_ASCENT_IN_GAP):
+            current_end = next_end
+        else:
+            combined.append((current_start, current_end))
+            current_start, current_end = next_start, next_end
+    combined.append((current_start, current_end))
+    return combined
+
+
+def _is_valid(segment: Tuple[int, int], track: Track, time_ms: np.ndarray) -> bool:
+    start, end = segment
+    if end < start:
+        return False
+    if int(time_ms[end] - time_ms[start]) // 1000 < RUN_DETECTION_MIN_DURATION:
+        return False
+    return track.ele[start] - track.ele[end] >= RUN_DETECTION_MIN_VERTICAL
+
+
+def _to_ski_run(
+    run_number: int,
+    segment: Tuple[int, int],
+    track: Track,
+    time_ms: np.ndarray,
+    distances32: np.ndarray,
+    smoothed_speeds: np.ndarray
+) -> SkiRun:
+    start, end = segment
+    run_distances = distances32[start:end]
+    run_speeds = smoothed_speeds[start + 1:end + 1]
+
+    # The app accumulates Float distances one by one; accumulate keeps that order
+    distance = np.float32(np.add.accumulate(run_distances)[-1]) if len(run_distances) else np.float32(0)
+    max_speed = max(np.float32(0), run_speeds.max()) if len(run_speeds) else np.float32(0)
+    # Float products summed into a Double, one segment at a time
+    weighted_products = (run_speeds * run_distances).astype(np.float64)
+    weighted_speed = float(np.add.accumulate(weighted_products)[-1]) if len(weighted_products) else 0.0
+    avg_speed = np.float32(weighted_speed / distance) if distance > 0 else np.float32(0)
+
+    vertical_drop = np.float32(track.ele[start] - track.ele[end])
+    avg_slope = vertical_drop / distance * np.float32(100) if distance > 0 else np.float32(0)
+
+    return SkiRun(
+        run_number=run_number,
+        start_index=start,
+        end_index=end,
+        start_time=int(time_ms[start]),
+        end_time=int(time_ms[end]),
+        start_elevation=float(track.ele[start]),
+        end_elevation=float(track.ele[end]),
+        max_speed=float(max_speed),
+        avg_speed=float(avg_speed),
+        distance=float(distance),
+        vertical_drop=float(vertical_drop),
+        avg_slope=float(avg_slope),
+        point_count=end - start + 1
+    )
+
+
+def detect_runs(track: Track, combine: bool = True, raw_speeds: Optional[np.ndarray] = None) -> List[SkiRun]:
+    """
+    Detect ski runs in a time-ordered track.
+
+    combine=False matches RunDetector.detectRunsIncremental (no segment
+    combination). raw_speeds (km/h) stands in for TrackPoint.speed where a
+    smoothing window spans no time; by default the import-time speeds from
+    stats_calculator.point_speeds() are used.
+    """
+    if len(track) < RUN_DETECTION_TREND_WINDOW:
+        return []
+
+    time_ms = track_time_ms(track)
+    smoothed_elevations = smooth_elevations(track, 5)
+    smoothed_speeds = smooth_speeds(track, raw_speeds)
+    is_descending = mark_descent_points(smoothed_elevations, smoothed_speeds)
+
+    segments = detect_raw_segments(is_descending)
+    if combine:
+        segments = combine_segments(segments, time_ms, smoothed_elevations)
+    segments = [segment for segment in segments if _is_valid(segment, track, time_ms)]
+
+    distances32 = segment_distances(track).astype(np.float32)
+    return [
+        _to_ski_run(number, segment, track, time_ms, distances32, smoothed_speeds)
+        for number, segment in enumerate(segments, 1)
+    ]
@@ -0,0 +1,162 @@
+"""
+Array port of the app's SessionAnalyzer (domain/SessionAnalyzer.kt).
+
+calculate_session_stats() produces the numbers the session screen shows:
+distance and elevation totals, speed metrics, the time distribution
+(moving / stationary / ascending / descending), the performance score and
+the speed histogram. The app walks the points once per metric; here each
+metric is one array expression, with the per-state times and the speed
+histogram taken from np.bincount. Float accumulations are done in float32
+and in point order, as on the phone.
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from gpx_track import Track
+from run_detector import SkiRun, detect_runs
+from stats_calculator import point_speeds, segment_distances, track_time_ms
+
+# Upper bounds (km/h) of the speed histogram buckets: 0-10, 10-20, 20-30, 30-40, 40-50, 50+
+SPEED_BUCKET_EDGES = np.array([10, 20, 30, 40, 50], dtype=np.float32)
+SPEED_BUCKET_LABELS = ('0-10', '10-20', '20-30', '30-40', '40-50', '50+')
+
+STATIONARY_SPEED = 3.0  # km/h - below this a point counts as stationary
+VERTICAL_RATE = 1.0  # m/s - climbing or dropping faster than this is ascending/descending
+
+# Time distribution states, in the order the app tests them
+TIME_STATIONARY = 0
+TIME_ASCENDING = 1
+TIME_DESCENDING = 2
+TIME_MOVING = 3
+
+
+@dataclass
+class SessionStats:
+    """Session statistics; fields mirror data/model/SessionStats.kt (no heart rate in GPX tracks here)."""
+    total_distance: float = 0.0  # meters
+    ski_distance: float = 0.0  # meters
+    lift_distance: float = 0.0  # meters
+    ski_vertical: float = 0.0  # meters
+    total_ascent: float = 0.0  # meters
+    total_descent: float = 0.0  # meters
+    max_altitude: float = 0.0  # meters
+    min_altitude: float = 0.0  # meters
+    max_speed: float = 0.0  # km/h
+    avg_speed: float = 0.0  # km/h
+    avg_ski_speed: float = 0.0  # km/h
+    total_duration: int = 0  # seconds
+    moving_time: int = 0  # seconds
+    stationary_time: int = 0  # seconds
+    ascending_time: int = 0  # seconds
+    descending_time: int = 0  # seconds
+    performance_score: float = 0.0  # 0-100
+    speed_distribution: List[int] = field(default_factory=list)
+    run_count: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _float32_total(values: np.ndarray) -> np.float32:
+    """Sum float32 values one at a time, like a Kotlin `var total = 0f` loop."""
+    if len(values) == 0:
+        return np.float32(0)
+    return np.add.accumulate(values.astype(np.float32))[-1]
+
+
+def time_distribution(track: Track, speeds: np.ndarray) -> np.ndarray:
+    """
+    Seconds spent stationary, ascending, descending and moving (indexed by
+    the TIME_* constants). Each interval is attributed to the state of its
+    end point, with whole-second deltas as in the app.
+    """
+    if len(track) < 2:
+        return np.zeros(4, dtype=np.int64)
+
+    seconds = np.diff(track_time_ms(track)) // 1000
+    elevation_delta = np.diff(track.ele)
+    rate = np.divide(elevation_delta, seconds, out=np.zeros(len(seconds)), where=seconds > 0)
+
+    state = np.select(
+        [speeds[1:] < np.float32(STATIONARY_SPEED), rate > VERTICAL_RATE, rate < -VERTICAL_RATE],
+        [TIME_STATIONARY, TIME_ASCENDING, TIME_DESCENDING],
+        default=TIME_MOVING
+    )
+    return np.bincount(state, weights=seconds, minlength=4).astype(np.int64)
+
+
+def speed_distribution(speeds: np.ndarray) -> List[int]:
+    """Point counts in the 0-10, 10-20, 20-30, 30-40, 40-50 and 50+ km/h buckets."""
+    buckets = np.searchsorted(SPEED_BUCKET_EDGES, np.asarray(speeds, dtype=np.float32), side='right')
+    return np.bincount(buckets, minlength=len(SPEED_BUCKET_LABELS)).tolist()
+
+
+def performance_score(runs: List[SkiRun], avg_ski_speed: float, max_speed: float) -> float:
+    """0-100 score from run count, average and top speed and average vertical per run."""
+    if not runs:
+        return 0.0
+    one = np.float32(1)
+    run_score = min(np.float32(len(runs)) / np.float32(20), one) * np.float32(25)
+    speed_score = min(np.float32(avg_ski_speed) / np.float32(50), one) * np.float32(35)
+    max_speed_score = min(np.float32(max_speed) / np.float32(80), one) * np.float32(20)
+    avg_vertical = np.float32(np.mean([run.vertical_drop for run in runs]))
+    vertical_score = min(avg_vertical / np.float32(500), one) * np.float32(20)
+    return float(run_score + speed_score + max_speed_score + vertical_score)
+
+
+def calculate_session_stats(
+    track: Track,
+    runs: Optional[List[SkiRun]] = None,
+    speeds: Optional[np.ndarray] = None
+) -> SessionStats:
+    """
+    Statistics for a time-ordered track.
+
+    runs defaults to detect_runs(track); speeds (km/h per point) default to
+    the speeds the app assigns on GPX import (stats_calculator.point_speeds).
+    """
+    if len(track) == 0:
+        return SessionStats(speed_distribution=[0] * len(SPEED_BUCKET_LABELS))
+    if speeds is None:
+        speeds = point_speeds(track)
+    speeds = np.asarray(speeds, dtype=np.float32)
+    if runs is None:
+        runs = detect_runs(track, raw_speeds=speeds)
+
+    elevation = track.ele.astype(np.float32)
+    elevation_delta = np.diff(track.ele).astype(np.float32)
+    later_speeds = speeds[1:]
+    moving_speeds = later_speeds[later_speeds > 0]
+
+    total_distance = _float32_total(segment_distances(track).astype(np.float32))
+    max_speed = max(np.float32(0), later_speeds.max()) if len(later_speeds) else np.float32(0)
+    avg_speed = _float32_total(moving_speeds) / np.float32(len(moving_speeds)) if len(moving_speeds) else 0.0
+
+    ski_distance = np.float32(sum(run.distance for run in runs))
+    avg_ski_speed = np.float32(np.mean([run.avg_speed for run in runs])) if runs else np.float32(0)
+    stationary, ascending, descending, moving = time_distribution(track, speeds).tolist()
+
+    return SessionStats(
+        total_distance=float(total_distance),
+        ski_distance=float(ski_distance),
+        lift_distance=float(total_distance - ski_distance),
+        ski_vertical=float(np.float32(sum(run.vertical_drop for run in runs))),
+        total_ascent=float(_float32_total(elevation_delta[elevation_delta > 0])),
+        total_descent=float(_float32_total(-elevation_delta[elevation_delta <= 0])),
+        max_altitude=float(elevation.max()),
+        min_altitude=float(elevation.min()),
+        max_speed=float(max_speed),
+        avg_speed=float(avg_speed),
+        avg_ski_speed=float(avg_ski_speed),
+        total_duration=int(track_time_ms(track)[-1] - track_time_ms(track)[0]) // 1000,
+        moving_time=moving,
+        stationary_time=stationary,
+        ascending_time=ascending,
+        descending_time=descending,
+        performance_score=performance_score(runs, avg_ski_speed, max_speed),
+        speed_distribution=speed_distribution(speeds),
+        run_count=len(runs)
+    )
@@ -0,0 +1,115 @@
+"""
+Array port of the app's StatsCalculator (domain/StatsCalculator.kt).
+
+The app smooths speeds and elevations with a per-point loop over a
+centred window. Here every window sum is taken from a cumulative sum, so
+each kernel is O(n) regardless of the window size. Values the app stores
+as Float are rounded to float32 at the same steps so thresholds compare
+the way they do on the phone.
+
+Speeds are km/h, distances metres and timestamps epoch milliseconds, as
+in the app's TrackPoint.
+"""
+
+import numpy as np
+
+from gpx_track import Track, haversine_distance
+
+# Mirrors util/Constants.kt
+SPEED_SMOOTHING_WINDOW = 5  # points - window size for speed smoothing
+
+
+def track_time_ms(track: Track) -> np.ndarray:
+    """Timestamps as int64 epoch milliseconds (TrackPoint.timestamp)."""
+    return track.time_us // 1000
+
+
+def segment_distances(track: Track) -> np.ndarray:
+    """Haversine distance in metres between consecutive points (length n - 1)."""
+    return haversine_distance(track.lat[:-1], track.lon[:-1], track.lat[1:], track.lon[1:])
+
+
+def point_speeds(track: Track) -> np.ndarray:
+    """
+    Per-point speed in km/h as GpxParser assigns it on import: the first
+    point is 0 and every later one is distance / time to its predecessor.
+    """
+    speeds = np.zeros(len(track), dtype=np.float32)
+    if len(track) < 2:
+        return speeds
+    seconds = np.diff(track_time_ms(track)) / 1000.0
+    distances = segment_distances(track)
+    moving = seconds > 0
+    speeds[1:][moving] = (distances[moving] / seconds[moving] * 3.6).astype(np.float32)
+    return speeds
+
+
+def segment_slopes(track: Track, distances: np.ndarray = None) -> np.ndarray:
+    """
+    Slope in percent between consecutive points (length n - 1): elevation
+    change over horizontal distance, 0 where the points coincide.
+    distances defaults to segment_distances(track).
+    """
+    if distances is None:
+        distances = segment_distances(track)
+    slopes = np.zeros(len(distances))
+    np.divide(np.diff(track.ele), distances, out=slopes, where=distances != 0)
+    return (slopes * 100).astype(np.float32)
+
+
+def average_descent_slope(track: Track) -> float:
+    """
+    Distance-weighted average slope in percent of the descending segments,
+    as a positive number. Not one of the app's session statistics.
+    """
+    distances = segment_distances(track)
+    slopes = segment_slopes(track, distances)
+    downhill = slopes < 0
+    return float(-np.average(slopes[downhill], weights=distances[downhill])) if downhill.any() else 0.0
+
+
+def _window_bounds(n: int, window_size: int):
+    """Start (inclusive) and end (exclusive) of the centred window of every point."""
+    index = np.arange(n)
+    start = np.maximum(index - window_size // 2, 0)
+    end = np.minimum(index + window_size // 2 + 1, n)
+    return start, end
+
+
+def smooth_elevations(track: Track, window_size: int = SPEED_SMOOTHING_WINDOW) -> np.ndarray:
+    """Centred moving average of the elevations (window truncated at the ends)."""
+    n = len(track)
+    if n == 0:
+        return np.empty(0, dtype=np.float32)
+    if n == 1:
+        return track.ele.astype(np.float32)
+
+    start, end = _window_bounds(n, window_size)
+    cumulative = np.concatenate(([0.0], np.cumsum(track.ele)))
+    return ((cumulative[end] - cumulative[start]) / (end - start)).astype(np.float32)
+
+
+def smooth_speeds(track: Track, raw_speeds: np.ndarray = None) -> np.ndarray:
+    """
+    Windowed speed in km/h: distance over time across the SPEED_SMOOTHING_WINDOW
+    points centred on each point. Points whose window spans no time keep
+    their raw speed (point_speeds() unless given).
+    """
+    n = len(track)
+    if raw_speeds is None:
+        raw_speeds = point_speeds(track)
+    raw_speeds = np.asarray(raw_speeds, dtype=np.float32)
+    if n < 2:
+        return raw_speeds.copy()
+
+    start, end = _window_bounds(n, SPEED_SMOOTHING_WINDOW)
+    # Window j covers intervals start..end-2, i.e. cumulative[end - 1] - cumulative[start]
+    cumulative_distance = np.concatenate(([0.0], np.cumsum(segment_distances(track))))
+    cumulative_time = np.concatenate(([0], np.cumsum(np.diff(track_time_ms(track)))))
+    window_distance = cumulative_distance[end - 1] - cumulative_distance[start]
+    window_time = cumulative_time[end - 1] - cumulative_time[start]
+
+    smoothed = raw_speeds.copy()
+    timed = window_time > 0
+    smoothed[timed] = (window_distance[timed] / (window_time[timed] / 1000.0) * 3.6).astype(np.float32)
+    return smoothed
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = TOOLS_DIR.parent / 'examples'
+
+sys.path.insert(0, str(TOOLS_DIR))
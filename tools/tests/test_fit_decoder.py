@@ -0,0 +1,92 @@
+import struct
+
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from fit_decoder import FIT_EPOCH_OFFSET, FitDecodeError, parse_fit_file
+from gpx_analyzer import parse_gpx_file, parse_track_file
+
+
+def fit_file(messages: bytes) -> bytes:
+    """Wrap encoded messages in a 14-byte FIT header and a (zero) CRC."""
+    header = struct.pack('<BBHI4sH', 14, 0x20, 2132, len(messages), b'.FIT', 0)
+    return header + messages + b'\0\0'
+
+
+def definition(local: int, global_number: int, fields, big_endian: bool = False) -> bytes:
+    endian = '>' if big_endian else '<'
+    body = struct.pack(f'{endian}BBHB', 0, int(big_endian), global_number, len(fields))
+    return bytes([0x40 | local]) + body + b''.join(struct.pack('BBB', *field) for field in fields)
+
+
+# (field number, size, base type) of the record layout used below
+RECORD_FIELDS = [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (78, 4, 0x86), (3, 1, 0x02), (73, 4, 0x86)]
+
+
+def encode_record(timestamp, lat, lon, ele, speed, big_endian=False) -> bytes:
+    return struct.pack(
+        ('>' if big_endian else '<') + 'IiiIBI',
+        timestamp - FIT_EPOCH_OFFSET,
+        round(lat / 180.0 * 2 ** 31),
+        round(lon / 180.0 * 2 ** 31),
+        round((ele + 500) * 5),
+        120,  # heart rate, not decoded
+        round(speed * 1000)
+    )
+
+
+def test_fit_round_trip_of_example_track(tmp_path):
+    source = parse_gpx_file(str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx'))
+    seconds = source.time_us // 1_000_000
+    messages = [
+        definition(0, 0, [(0, 1, 0x00), (4, 4, 0x86)]),  # file_id: type, time_created
+        bytes([0]) + struct.pack('<BI', 4, int(seconds[0]) - FIT_EPOCH_OFFSET),
+        definition(1, 20, RECORD_FIELDS),
+    ]
+    for i in range(len(source)):
+        messages.append(bytes([1]) + encode_record(int(seconds[i]), source.lat[i], source.lon[i], source.ele[i], 5.0))
+    path = tmp_path / 'day7.fit'
+    path.write_bytes(fit_file(b''.join(messages)))
+
+    track = parse_track_file(str(path))
+    assert len(track) == len(source)
+    assert np.array_equal(track.time_us, seconds * 1_000_000)
+    np.testing.assert_allclose(track.lat, source.lat, atol=1e-7)
+    np.testing.assert_allclose(track.lon, source.lon, atol=1e-7)
+    np.testing.assert_allclose(track.ele, source.ele, atol=0.1)
+    assert np.allclose(track.speed, 5.0)
+    assert track.accuracy.mask.all()
+
+
+def test_compressed_timestamps_big_endian_and_invalid_fields(tmp_path):
+    base = 1_700_000_030
+    compressed_fields = [(0, 4, 0x85), (1, 4, 0x85), (2, 2, 0x84), (31, 1, 0x02)]
+    messages = b''.join([
+        definition(0, 20, RECORD_FIELDS, big_endian=True),
+        bytes([0]) + encode_record(base, 46.0, 7.0, 2000.0, 10.0, big_endian=True),
+        definition(1, 20, compressed_fields),
+        # 5-bit offsets 31, 2 (wrapped) and 3 against a full timestamp whose low bits are 30
+        bytes([0x80 | (1 << 5) | ((base + 1) & 0x1F)]) +
+        struct.pack('<iiHB', 0, 0, (1990 + 500) * 5, 4),
+        bytes([0x80 | (1 << 5) | ((base + 4) & 0x1F)]) +
+        struct.pack('<iiHB', 0x7FFFFFFF, 0x7FFFFFFF, 0xFFFF, 0xFF),  # no position fix: skipped
+        bytes([0x80 | (1 << 5) | ((base + 5) & 0x1F)]) +
+        struct.pack('<iiHB', 0, 0, 0xFFFF, 0xFF),
+    ])
+    path = tmp_path / 'compressed.fit'
+    path.write_bytes(fit_file(messages))
+
+    track = parse_fit_file(str(path))
+    assert (track.time_us // 1_000_000).tolist() == [base, base + 1, base + 5]
+    assert track.ele.tolist() == pytest.approx([2000.0, 1990.0, 0.0])
+    assert track.accuracy.tolist() == [None, 4.0, None]
+    assert track.lat[0] == pytest.approx(46.0, abs=1e-7)
+
+
+@pytest.mark.parametrize('data', [b'', b'\x0e' + b'\0' * 20, fit_file(b'\x01\0\0')])
+def test_rejects_invalid_files(tmp_path, data):
+    path = tmp_path / 'bad.fit'
+    path.write_bytes(data)
+    with pytest.raises(FitDecodeError):
+        parse_fit_file(str(path))
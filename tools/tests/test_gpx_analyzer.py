@@ -0,0 +1,222 @@
+import argparse
+import math
+import re
+import statistics
+
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import (
+    TimestampDecoder, TrackFollower, analyze_intervals, analyze_stream, follow_file, haversine_distance,
+    iter_gpx_points, iter_gpx_waypoints, parse_gpx_file, parse_timestamp
+)
+from gpx_stats import AnomalyRetention
+
+
+def reference_intervals(track, threshold, min_interval):
+    """Scalar per-pair implementation the vectorized engine must agree with."""
+    waypoints = list(track)
+    intervals = []
+    for wp1, wp2 in zip(waypoints, waypoints[1:]):
+        seconds = (wp2.timestamp - wp1.timestamp).total_seconds()
+        distance = haversine_distance(wp1.lat, wp1.lon, wp2.lat, wp2.lon)
+        kind = None
+        if seconds > threshold:
+            kind = 'gap'
+        elif 0 < seconds < min_interval:
+            kind = 'short'
+        intervals.append([seconds, distance, kind])
+
+    times = [i[0] for i in intervals if i[0] > 0]
+    mean, stdev = statistics.mean(times), statistics.stdev(times)
+    for interval in intervals:
+        if interval[2] is None and interval[0] > 0 and abs(interval[0] - mean) / stdev > 3:
+            interval[2] = 'inconsistent'
+    return intervals, times
+
+
+@pytest.fixture(scope='module')
+def day7():
+    return parse_gpx_file(str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx'))
+
+
+def test_haversine_distance_accepts_arrays(day7):
+    distances = haversine_distance(day7.lat[:-1], day7.lon[:-1], day7.lat[1:], day7.lon[1:])
+    for i in range(0, len(distances), 97):
+        expected = haversine_distance(day7.lat[i], day7.lon[i], day7.lat[i + 1], day7.lon[i + 1])
+        assert distances[i] == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+def test_vectorized_engine_matches_scalar_reference(day7):
+    result = analyze_intervals(day7, anomaly_threshold_seconds=60, min_interval_seconds=1.5)
+    intervals, times = reference_intervals(day7, 60, 1.5)
+
+    assert len(result.intervals) == len(intervals)
+    table = result.intervals.table
+    assert table.interval_seconds.tolist() == [i[0] for i in intervals]
+    assert [bool(k) for k in table.anomaly_kind] == [i[2] is not None for i in intervals]
+    assert len(result.anomalies) == sum(1 for i in intervals if i[2] is not None)
+
+    stats = result.statistics
+    assert stats['median_interval'] == statistics.median(times)
+    assert stats['min_interval'] == min(times)
+    assert stats['max_interval'] == max(times)
+    assert stats['mean_interval'] == pytest.approx(statistics.mean(times), rel=1e-12)
+    assert stats['stdev_interval'] == pytest.approx(statistics.stdev(times), rel=1e-12)
+    assert stats['total_distance_m'] == pytest.approx(math.fsum(i[1] for i in intervals), rel=1e-12)
+    assert stats['anomaly_count'] == sum(1 for i in intervals if i[2] in ('gap', 'short'))
+
+
+def test_anomalies_are_reported_threshold_first(day7):
+    result = analyze_intervals(day7)
+    types = [a.anomaly_type for a in result.anomalies]
+    first_inconsistent = next(i for i, t in enumerate(types) if t.startswith('Inconsistent'))
+    assert all(t.startswith('Inconsistent') for t in types[first_inconsistent:])
+
+
+def test_streaming_input_matches_parsed_track(day7):
+    path = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+    streamed = analyze_intervals(iter_gpx_waypoints(path))
+    parsed = analyze_intervals(day7)
+    assert streamed.statistics == parsed.statistics
+    assert streamed.total_waypoints == parsed.total_waypoints
+
+
+def test_fewer_than_two_points():
+    result = analyze_intervals([])
+    assert result.total_waypoints == 0
+    assert result.statistics['anomaly_count'] == 0
+
+
+@pytest.mark.parametrize('text', [
+    '2025-03-28T20:35:00.000+01:00',
+    '2025-03-28T19:35:00Z',
+    '2025-03-28T19:35:00.250Z',
+    '2025-03-28T17:05:00.5-0230',
+    '2025-03-28T19:35:00',
+])
+def test_timestamp_decoder_matches_parse_timestamp(text):
+    decoder = TimestampDecoder()
+    assert decoder.decode(text) == parse_timestamp(text).timestamp()
+    assert decoder.fast_hits == 1
+
+
+def test_timestamp_decoder_keeps_utc_offset():
+    decoder = TimestampDecoder()
+    first = decoder.decode_us('2025-03-28T20:35:00.000+01:00')
+    second = decoder.decode_us('2025-03-28T20:35:02.000+01:00')
+    assert second - first == 2_000_000
+    assert first == int(parse_timestamp('2025-03-28T19:35:00Z').timestamp()) * 1_000_000
+    assert decoder.tz.utcoffset(None).total_seconds() == 3600
+
+
+def test_timestamp_decoder_falls_back_on_layout_mismatch():
+    decoder = TimestampDecoder()
+    decoder.decode_us('2025-03-28T19:35:00Z')
+    assert decoder.decode('2025-03-28T19:35:00.5+00:00') == 1743190500.5
+    assert decoder.decode('not a timestamp') is None
+    assert decoder.fallbacks == 2
+
+
+def test_timestamp_decoder_follows_layout_change():
+    decoder = TimestampDecoder()
+    decoder.decode_us('2025-03-28T19:35:00Z')
+    for millis in range(1, 6):
+        assert decoder.decode_us(f'2025-03-28T19:35:01.{millis:03d}Z') == (1743190501_000 + millis) * 1000
+    assert (decoder.fast_hits, decoder.fallbacks) == (5, 1)
+
+
+def _write_recording(path, track, count):
+    """Write the first ``count`` points the way GpxWriter does on every auto-save."""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx version="1.1" creator="Ski GPX Recorder" xmlns="http://www.topografix.com/GPX/1/1">',
+        '  <trk>',
+        '    <trkseg>',
+    ]
+    for i in range(count):
+        lines.append(f'      <trkpt lat="{track.lat[i]}" lon="{track.lon[i]}">'
+                     f'<ele>{track.ele[i]}</ele><time>{track[i].timestamp.isoformat()}</time></trkpt>')
+    lines += ['    </trkseg>', '  </trk>', '</gpx>']
+    path.write_text('\n'.join(lines))
+
+
+def test_track_follower_reads_only_appended_points(tmp_path, day7):
+    recording = tmp_path / 'temp_recording.gpx'
+    follower = TrackFollower(str(recording))
+
+    _write_recording(recording, day7, 1000)
+    follower.refresh()
+    offset = follower.offset
+    follower.refresh()
+    assert follower.offset == offset and follower.total_waypoints == 1000
+
+    _write_recording(recording, day7, len(day7))
+    follower.refresh()
+    full = analyze_intervals(day7)
+    result = follower.result()
+    assert result.total_waypoints == full.total_waypoints
+    assert result.statistics['anomaly_count'] == full.statistics['anomaly_count']
+    assert result.statistics['mean_interval'] == pytest.approx(full.statistics['mean_interval'])
+    assert follower.restarts == 0
+
+    # A shorter rewrite (e.g. a new recording) starts over
+    _write_recording(recording, day7, 10)
+    follower.refresh()
+    assert follower.restarts == 1 and follower.total_waypoints == 10
+
+
+def test_follow_counts_anomalies_like_the_summary(tmp_path, day7, monkeypatch, capsys):
+    recording = tmp_path / 'temp_recording.gpx'
+    _write_recording(recording, day7, len(day7))
+
+    def stop(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr('gpx_analyzer.time.sleep', stop)
+    follow_file(str(recording), argparse.Namespace(
+        threshold=120.0, min_interval=0.1, max_anomalies=100, keep='worst', poll=1.0))
+    out = capsys.readouterr().out
+    live = int(re.search(r'\| anomalies (\d+) \(\+\d+ inconsistent\)', out).group(1))
+    assert live == int(re.search(r'Total anomalies: (\d+)', out).group(1))
+
+
+def test_follow_retries_a_point_caught_mid_write(tmp_path, day7, monkeypatch, capsys):
+    recording = tmp_path / 'temp_recording.gpx'
+    _write_recording(recording, day7, 101)
+    complete = recording.read_text()
+    last = complete.rindex('<trkpt')
+    saves = [
+        complete[:last + 40],  # Half of point 101
+        complete[:last] + complete[last:].replace('lat="', 'lat="x', 1),  # Point 101 garbled
+        complete,
+    ]
+    recording.write_text(saves.pop(0))
+
+    def next_save(seconds):
+        if not saves:
+            raise KeyboardInterrupt
+        recording.write_text(saves.pop(0))
+
+    monkeypatch.setattr('gpx_analyzer.time.sleep', next_save)
+    follow_file(str(recording), argparse.Namespace(
+        threshold=120.0, min_interval=0.5, max_anomalies=None, keep='first', poll=1.0))
+    out = capsys.readouterr().out
+    assert re.findall(r'\+(\d+) points', out) == ['100', '1']
+    assert 'warning: Invalid appended trackpoint' in out
+    assert 'Total waypoints: 101' in out
+
+
+def test_streaming_analysis_matches_batch_statistics(day7):
+    path = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+    decoder = TimestampDecoder()
+    streamed = analyze_stream(iter_gpx_points(path, decoder), retention=AnomalyRetention(5, 'worst'),
+                              decoder=decoder)
+    batch = analyze_intervals(day7)
+
+    for key in ('mean_interval', 'stdev_interval', 'min_interval', 'max_interval', 'total_distance_m'):
+        assert streamed.statistics[key] == pytest.approx(batch.statistics[key])
+    assert streamed.statistics['anomaly_count'] == batch.statistics['anomaly_count']
+    assert streamed.statistics['median_interval'] == pytest.approx(batch.statistics['median_interval'], abs=0.5)
+    assert len(streamed.anomalies) == 5
+    assert streamed.anomalies[0].from_waypoint.timestamp.utcoffset() == day7.tz.utcoffset(None)
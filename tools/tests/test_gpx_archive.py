@@ -0,0 +1,97 @@
+import bz2
+import gzip
+import shutil
+import zipfile
+
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import find_track_files, iter_gpx_points, main, parse_track_file
+from gpx_archive import archive_members, logical_name, member_path, source_hash, source_stat
+from gpx_cache import TrackCache
+from gpx_scanner import scan_gpx_file
+
+DAY5 = EXAMPLES_DIR / 'Day_5_2024-2025.gpx'
+DAY7 = EXAMPLES_DIR / 'Day_7_2024-2025.gpx'
+
+
+@pytest.fixture(scope='module')
+def packed(tmp_path_factory):
+    """Day 7 as .gpx.gz and .gpx.bz2, and Days 5 and 7 in a zip with a non-track member."""
+    root = tmp_path_factory.mktemp('packed')
+    data = DAY7.read_bytes()
+    (root / 'Day_7.gpx.gz').write_bytes(gzip.compress(data))
+    (root / 'Day_7.gpx.bz2').write_bytes(bz2.compress(data))
+    with zipfile.ZipFile(root / 'season.zip', 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(DAY5, '2024/Day_5.gpx')
+        zf.write(DAY7, '2024/Day_7.gpx')
+        zf.writestr('2024/notes.txt', 'not a track')
+    (root / 'notes.txt').write_text('not a track')
+    return root
+
+
+def assert_same_track(a, b):
+    assert np.array_equal(a.lat, b.lat) and np.array_equal(a.time_us, b.time_us)
+    assert np.array_equal(a.ele, b.ele) and a.tz == b.tz
+
+
+@pytest.mark.parametrize('name', ['Day_7.gpx.gz', 'Day_7.gpx.bz2', 'season.zip::2024/Day_7.gpx'])
+def test_packed_sources_parse_like_plain_files(packed, name):
+    path = str(packed / name)
+    plain = parse_track_file(str(DAY7))
+    # Both the byte scanner and the XML parser read the decompressed stream
+    assert_same_track(scan_gpx_file(path), plain)
+    assert len(list(iter_gpx_points(path))) == len(plain)
+    assert_same_track(parse_track_file(path), plain)
+
+
+def test_discovery_expands_archives(packed):
+    zip_path = str(packed / 'season.zip')
+    assert find_track_files(str(packed)) == [
+        str(packed / 'Day_7.gpx.bz2'), str(packed / 'Day_7.gpx.gz'),
+        member_path(zip_path, '2024/Day_5.gpx'), member_path(zip_path, '2024/Day_7.gpx'),
+    ]
+    assert find_track_files(zip_path) == archive_members(zip_path)
+    assert find_track_files(member_path(zip_path, '2024/Day_5.gpx')) == [member_path(zip_path, '2024/Day_5.gpx')]
+    assert logical_name(member_path(zip_path, '2024/Day_5.gpx')) == '2024/Day_5.gpx'
+    with pytest.raises(ValueError):
+        find_track_files(member_path(zip_path, '2024/Day_9.gpx'))
+
+
+def test_cli_analyzes_members_in_parallel(packed, capsys):
+    main([str(packed / 'season.zip'), '--jobs', '2', '--no-cache', '--format', 'jsonl'])
+    out = capsys.readouterr().out
+    assert out.count('season.zip::2024/Day_') == 2
+    assert '"waypoints":12044' in out and '"waypoints":4433' in out
+
+
+def test_member_identity_comes_from_the_zip_directory(packed, tmp_path):
+    archive = tmp_path / 'season.zip'
+    shutil.copy(packed / 'season.zip', archive)
+    day5 = member_path(str(archive), '2024/Day_5.gpx')
+    assert source_stat(day5)[0] == DAY5.stat().st_size
+    assert source_hash(day5) == f'crc32:{zipfile.crc32(DAY5.read_bytes()):08x}'
+
+    cache = TrackCache(str(tmp_path / 'cache'))
+    parse_track_file(day5, cache=cache)
+    assert cache.get(cache.key(day5)) is not None
+    assert cache.get(cache.key(member_path(str(archive), '2024/Day_7.gpx'))) is None
+
+    # Rewriting the archive with another Day 7 keeps Day 5's entry
+    day7 = member_path(str(archive), '2024/Day_7.gpx')
+    parse_track_file(day7, cache=cache)
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.write(DAY5, '2024/Day_5.gpx')
+        zf.writestr('2024/Day_7.gpx', DAY7.read_text().replace('Ski Tracks', 'Ski Tracks ', 1))
+    assert cache.get(cache.key(day5)) is not None
+    assert cache.get(cache.key(day7)) is None
+
+
+def test_truncated_compressed_file_is_an_error(packed, tmp_path):
+    data = (packed / 'Day_7.gpx.gz').read_bytes()
+    truncated = tmp_path / 'Day_7.gpx.gz'
+    truncated.write_bytes(data[:len(data) // 2])
+    assert scan_gpx_file(str(truncated)) is None
+    with pytest.raises(ValueError):
+        parse_track_file(str(truncated))
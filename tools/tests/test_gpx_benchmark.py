@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+from gpx_analyzer import analyze_intervals, parse_gpx_file
+from gpx_benchmark import GAP_SECONDS, compare_results, generate_ski_track, run_suite, write_gpx
+from run_detector import detect_runs
+
+
+def test_generator_is_deterministic_and_bounded():
+    first = generate_ski_track(20_000, seed=3)
+    second = generate_ski_track(20_000, seed=3)
+    assert len(first) == 20_000
+    assert np.array_equal(first.time_us, second.time_us)
+    assert np.array_equal(first.lat, second.lat)
+    assert not np.array_equal(first.lat, generate_ski_track(20_000, seed=4).lat)
+    assert 1790 < first.ele.min() and first.ele.max() < 2760
+    assert np.all(np.diff(first.time_us) > 0)
+
+
+def test_generated_day_has_runs_and_gaps():
+    track = generate_ski_track(50_000)
+    result = analyze_intervals(track)
+    gaps = [a for a in result.anomalies if a.anomaly_type.startswith('Large gap')]
+    assert gaps and all(GAP_SECONDS[0] <= a.interval_seconds <= GAP_SECONDS[1] for a in gaps)
+    assert len(detect_runs(track)) >= 50
+
+
+def test_written_gpx_parses_back(tmp_path):
+    track = generate_ski_track(3_000)
+    path = tmp_path / 'synthetic.gpx'
+    write_gpx(track, str(path), 'synthetic')
+    parsed = parse_gpx_file(str(path))
+    assert np.array_equal(parsed.time_us, track.time_us)
+    assert np.array_equal(parsed.lat, track.lat)
+    assert np.array_equal(parsed.ele, track.ele)
+    assert np.array_equal(parsed.accuracy.filled(0), track.accuracy.filled(0))
+
+
+def test_suite_reports_json_and_regressions(tmp_path):
+    report = run_suite([2_000], ['analyze_intervals', 'end_to_end'], str(tmp_path), repeat=1, isolate=False)
+    json.dumps(report)
+    assert [r['name'] for r in report['results']] == ['analyze_intervals', 'end_to_end']
+    for result in report['results']:
+        assert result['points'] == 2_000
+        assert result['points_per_second'] > 0
+        assert result['peak_rss_mb'] > 0
+        assert result['tracemalloc_peak_mb'] > 0
+
+    slower = json.loads(json.dumps(report))
+    slower['results'][0]['seconds'] = report['results'][0]['seconds'] * 2
+    assert compare_results(report, slower, 0.2) and not compare_results(slower, report, 0.2)
@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_gpx_file
+from gpx_cache import TrackCache, decode_track, encode_track
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+def test_encode_decode_round_trip():
+    track = parse_gpx_file(DAY7)
+    restored = decode_track(encode_track(track))
+    assert np.array_equal(restored.time_us, track.time_us)
+    assert np.array_equal(restored.lat, track.lat)
+    assert restored.tz.utcoffset(None) == track.tz.utcoffset(None)
+    assert restored[0] == track[0]
+
+
+def test_cache_hit_and_invalidation(tmp_path):
+    source = tmp_path / 'day.gpx'
+    source.write_bytes(open(DAY7, 'rb').read())
+    cache = TrackCache(tmp_path / 'cache')
+
+    first = parse_gpx_file(str(source), cache=cache)
+    second = parse_gpx_file(str(source), cache=cache)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert np.array_equal(first.time_us, second.time_us)
+
+    # Touching the file changes its identity, so it is parsed again
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    parse_gpx_file(str(source), cache=cache)
+    assert cache.misses == 2
+
+
+def test_eviction_keeps_cache_within_budget(tmp_path):
+    track = parse_gpx_file(DAY7)
+    entry_size = len(encode_track(track))
+    cache = TrackCache(tmp_path, max_bytes=entry_size * 2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, track)
+    assert cache.get('a') is None
+    assert cache.get('c') is not None
+    assert cache.clear() == 2
+
+
+def test_puts_within_budget_scan_the_directory_once(tmp_path, monkeypatch):
+    track = parse_gpx_file(DAY7)
+    cache = TrackCache(tmp_path, max_bytes=len(encode_track(track)) * 10)
+    scans = []
+    entries = TrackCache._entries
+    monkeypatch.setattr(TrackCache, '_entries', lambda self: scans.append(1) or entries(self))
+    for key in range(10):
+        cache.put(str(key), track)
+    assert len(scans) == 1
+    cache.put('10', track)
+    assert len(scans) == 2 and cache.get('0') is None and cache.get('10') is not None
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime, timezone
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import detect_runs, highscores_main, parse_track_file
+from gpx_highscores import CATEGORIES, Highscores, Record, session_records
+
+DAY5 = str(EXAMPLES_DIR / 'Day_5_2024-2025.gpx')
+
+
+def record(value, file='a.gpx', category='longest_run'):
+    return Record(category, value, file, datetime(2025, 1, 1, tzinfo=timezone.utc), 46.0, 9.8)
+
+
+def test_heaps_keep_the_k_best_per_category():
+    highscores = Highscores(3)
+    highscores.update(record(value) for value in [5, 1, 9, 7, 3, 8])
+    highscores.offer(record(8, file='later.gpx'))
+    highscores.offer(record(100, category='top_speed'))
+    assert [r.value for r in highscores.table('longest_run')] == [9, 8, 8]
+    # Equal values rank in the order they were offered
+    assert [r.file for r in highscores.table('longest_run')[1:]] == ['a.gpx', 'later.gpx']
+    assert [r.value for r in highscores.table('top_speed')] == [100]
+    assert highscores.table('highest_altitude') == []
+
+
+def test_session_records_locate_the_best_run():
+    track = parse_track_file(DAY5)
+    records = session_records(DAY5, track, k=2)
+    longest = [r for r in records if r.category == 'longest_run']
+    best = max(detect_runs(track), key=lambda run: run.distance)
+    assert len(longest) == 2 and longest[0].value == best.distance
+    assert (longest[0].lat, longest[0].lon) == (track.lat[best.start_index], track.lon[best.start_index])
+    assert longest[0].time.utcoffset().total_seconds() == 3600
+    assert {r.category for r in records} == set(CATEGORIES)
+
+
+def test_cli_parallel_matches_serial(capsys):
+    highscores_main([str(EXAMPLES_DIR), '--top', '2', '--json', '--no-cache'])
+    serial = json.loads(capsys.readouterr().out)
+    highscores_main([str(EXAMPLES_DIR), '--top', '2', '--json', '--no-cache', '--jobs', '2'])
+    assert json.loads(capsys.readouterr().out) == serial
+    assert serial['biggest_vertical'][0]['file'] == DAY5
+    assert all(len(records) == 2 for records in serial.values())
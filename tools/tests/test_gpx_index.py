@@ -0,0 +1,111 @@
+import os
+import shutil
+import sqlite3
+from datetime import date
+
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import index_main, query_main
+from gpx_archive import source_hash
+from gpx_index import SessionIndex, season_of
+
+
+@pytest.fixture
+def archive(tmp_path):
+    for name in ('Day_5_2024-2025.gpx', 'Day_7_2024-2025.gpx'):
+        shutil.copy(EXAMPLES_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+def index(archive, *options):
+    index_main([str(archive), '--db', str(archive / 'index.sqlite'), '--no-cache', *options])
+    return SessionIndex(str(archive / 'index.sqlite'))
+
+
+def test_index_is_incremental(archive):
+    day5, day7 = str(archive / 'Day_5_2024-2025.gpx'), str(archive / 'Day_7_2024-2025.gpx')
+    with index(archive) as db:
+        assert len(db) == 2
+        assert db.plan([day5, day7]) == []
+
+    os.utime(day5, ns=(0, 1_000_000_000))  # same content, new mtime
+    with archive.joinpath('Day_7_2024-2025.gpx').open('a') as f:
+        f.write('\n')
+    with SessionIndex(str(archive / 'index.sqlite'), 120, 0.5) as db:
+        assert db.plan([day5, day7]) == [day7]
+        assert db.plan([day5]) == []
+
+    with SessionIndex(str(archive / 'index.sqlite'), 60, 0.5) as db:
+        assert db.plan([day5, day7]) == [day5, day7]
+
+
+def test_changed_file_is_hashed_once(archive, monkeypatch):
+    index(archive).close()
+    day7 = archive / 'Day_7_2024-2025.gpx'
+    day7.write_text(day7.read_text().replace('<ele>', '<ele>1', 1).replace('    ', '   ', 1))  # same size
+    hashed = []
+
+    def counting_hash(path):
+        hashed.append(path)
+        return source_hash(path)
+
+    monkeypatch.setattr('gpx_index.source_hash', counting_hash)
+    monkeypatch.setattr('gpx_cache.source_hash', counting_hash)
+    index_main([str(archive), '--db', str(archive / 'index.sqlite'), '--cache-dir', str(archive / 'cache')])
+    assert hashed == [str(day7)]
+
+
+def test_queries_answer_from_the_index(archive, capsys):
+    with index(archive) as db:
+        columns, rows = db.sessions(min_anomaly_percentage=0.3)
+        assert [row[columns.index('start_date')] for row in rows] == ['2025-03-28']
+
+        columns, rows = db.totals(by='season', seasons=3)
+        assert rows[0][0] == '2024-2025' and rows[0][columns.index('sessions')] == 2
+        assert rows[0][columns.index('runs')] == 19 + 8
+
+        columns, rows = db.anomalies(kind='large_gap', limit=1)
+        assert rows[0][columns.index('interval_seconds')] == 1140.0
+
+        columns, rows = db.totals(by='week')
+        assert [row[0] for row in rows] == ['2025-01-27', '2025-03-24']
+
+    capsys.readouterr()
+    query_main(['sql', 'SELECT count(*) AS n FROM sessions', '--db', str(archive / 'index.sqlite'), '--json'])
+    assert capsys.readouterr().out.strip() == '{"n": 2}'
+
+
+def test_removed_files_are_pruned(archive):
+    index(archive).close()
+    (archive / 'Day_5_2024-2025.gpx').unlink()
+    with index(archive, '--prune') as db:
+        assert len(db) == 1
+        assert db.sql('SELECT count(*) FROM anomalies a JOIN sessions s ON s.id = a.session_id')[1] == \
+            db.sql('SELECT count(*) FROM anomalies')[1]
+
+
+def test_queries_never_write(archive, capsys):
+    index(archive).close()
+    db = str(archive / 'index.sqlite')
+    for statement in ('DELETE FROM sessions', 'SELECT 1; DELETE FROM sessions',
+                      'WITH gone AS (SELECT id FROM sessions) DELETE FROM sessions WHERE id IN gone'):
+        with pytest.raises(SystemExit):
+            query_main(['sql', statement, '--db', db])
+    with SessionIndex(db, read_only=True) as read_only:
+        assert len(read_only) == 2
+        assert read_only.sql('/* count */ WITH s AS (SELECT * FROM sessions) SELECT count(*) FROM s')[1] == [(2,)]
+
+    other = archive / 'other.sqlite'
+    with sqlite3.connect(str(other)) as connection:
+        connection.execute('CREATE TABLE meta (note TEXT)')
+    with pytest.raises(SystemExit):
+        query_main(['totals', '--db', str(other)])
+    assert 'not a session index' in capsys.readouterr().err
+    with sqlite3.connect(str(other)) as connection:
+        assert connection.execute("SELECT name FROM sqlite_master").fetchall() == [('meta',)]
+
+
+def test_season_boundary():
+    assert season_of(date(2025, 2, 2)) == '2024-2025'
+    assert season_of(date(2025, 7, 1)) == '2025-2026'
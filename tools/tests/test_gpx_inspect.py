@@ -0,0 +1,62 @@
+import json
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import inspect_main
+from gpx_inspect import inspect_gpx
+
+DAY7 = EXAMPLES_DIR / 'Day_7_2024-2025.gpx'
+
+MIXED = b'''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="Test" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <trk><trkseg>
+    <trkpt lat="46.1" lon="9.8"><time>2025-01-01T10:00:00Z</time>
+      <extensions><gpxtpx:TrackPointExtension><gpxtpx:speed>3.5</gpxtpx:speed></gpxtpx:TrackPointExtension></extensions>
+    </trkpt>
+    <trkpt lat="46.2" lon="9.8"><time>2025-01-01T10:00:01.250+01:00</time></trkpt>
+  </trkseg><trkseg>
+    <trkpt lat="46.3" lon="9.8"/>
+  </trkseg></trk>
+</gpx>
+'''
+
+
+def test_example_structure():
+    structure = inspect_gpx(str(DAY7), chunk_size=4096)
+    assert structure.well_formed and structure.bytes_read == DAY7.stat().st_size
+    assert structure.namespace == 'http://www.topografix.com/GPX/1/1'
+    assert structure.creator == 'Ski Tracks - Android (685)' and structure.writer_profile == 'Ski Tracks'
+    assert structure.trackpoints == structure.elements['trkpt'] == 4433
+    assert structure.segment_points == [4433]
+    assert structure.time_formats == {'dddd-dd-ddTdd:dd:dd.ddd+dd:dd': 4433}
+
+
+def test_segments_extensions_and_time_formats(tmp_path):
+    path = tmp_path / 'mixed.gpx'
+    path.write_bytes(MIXED)
+    structure = inspect_gpx(str(path))
+    assert structure.segments == 2 and structure.segment_points == [2, 1]
+    assert structure.extensions == {'gpxtpx:TrackPointExtension': 1, 'gpxtpx:speed': 1}
+    assert structure.time_formats == {'dddd-dd-ddTdd:dd:ddZ': 1, 'dddd-dd-ddTdd:dd:dd.ddd+dd:dd': 1}
+    assert structure.points_without_time == 1
+    assert structure.writer_profile is None
+
+
+def test_first_malformed_offset(tmp_path):
+    data = DAY7.read_bytes()
+    cut = data.index(b'<trkpt', 100_000)
+    # Multi-byte text before the error must not shift the reported byte offset
+    broken = data[:cut].replace(b'Ski Tracks', b'Ski Tr\xc3\xa4cks', 1) + b'<trkpt lat="1" <ele/></trkpt>'
+    path = tmp_path / 'broken.gpx'
+    path.write_bytes(broken)
+    structure = inspect_gpx(str(path), chunk_size=8192)
+    assert not structure.well_formed
+    assert structure.error.offset == cut + 1 + len(b'<trkpt lat="1" ')
+    assert structure.error.context.endswith('<trkpt lat="1" <ele/></trkpt>')
+    assert structure.trackpoints == data[:cut].count(b'<trkpt')
+
+
+def test_cli_json(capsys):
+    inspect_main([str(DAY7), '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert report['well_formed'] and report['tracks'] == 1 and report['error'] is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import analyze_intervals, iter_gpx_points, merge_main, parse_track_file
+from gpx_merge import TrackMerger
+from gpx_writer import write_gpx_stream
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+def rows(segment, *seconds):
+    return [(segment, (46.0, 9.0, 1800.0, int(t * 1e6), None, None)) for t in seconds]
+
+
+def merged(*sources):
+    return [(point[3] // 1_000_000, new_segment) for point, new_segment in TrackMerger(sources)]
+
+
+def test_overlapping_sources_interleave_and_drop_duplicates():
+    merger = TrackMerger([rows(1, 0, 2, 4, 6), rows(1, 1, 2, 3, 5)])
+    assert [(p[3] // 1_000_000, new) for p, new in merger] == \
+        [(0, True), (1, False), (2, False), (3, False), (4, False), (5, False), (6, False)]
+    assert (merger.points, merger.duplicates, merger.segments) == (7, 1, 1)
+
+
+def test_segments_break_only_where_no_source_is_recording():
+    # One phone pauses between 3 s and 10 s while the other keeps recording until 5 s
+    assert merged(rows(1, 0, 3) + rows(2, 10, 12), rows(1, 1, 5)) == \
+        [(0, True), (1, False), (3, False), (5, False), (10, True), (12, False)]
+    assert merged(rows(1, 0, 3) + rows(2, 10, 12)) == [(0, True), (3, False), (10, True), (12, False)]
+
+
+def test_source_going_back_in_time_is_rejected():
+    with pytest.raises(ValueError, match='source 2'):
+        merged(rows(1, 0, 5), rows(1, 2, 1))
+
+
+def test_split_recording_merges_back_to_the_export(tmp_path):
+    points = list(iter_gpx_points(DAY7, segments=True))
+    write_gpx_stream(((p, False) for _, p in points[:3000]), str(tmp_path / 'temp_recording.gpx'), 'temp')
+    output = str(tmp_path / 'merged.gpx')
+    merge_main([str(tmp_path / 'temp_recording.gpx'), DAY7, '-o', output])
+    track, export = parse_track_file(output), parse_track_file(DAY7)
+    assert np.array_equal(track.time_us, export.time_us) and np.array_equal(track.lat, export.lat)
+
+
+def test_gaps_between_segments_are_not_anomalies(tmp_path, capsys):
+    # Two segments with a ten minute pause in between
+    first = [(p, i == 0) for i, (_, p) in enumerate(rows(1, *range(0, 100)))]
+    second = [(p, i == 0) for i, (_, p) in enumerate(rows(2, *range(700, 800)))]
+    path = str(tmp_path / 'paused.gpx')
+    assert write_gpx_stream(first + second, path, 'paused') == 200
+    assert [segment for segment, _ in iter_gpx_points(path, segments=True)][99:101] == [1, 2]
+    assert analyze_intervals(parse_track_file(path)).statistics['anomaly_count'] == 1
+    merge_main([path])
+    out = capsys.readouterr().out
+    assert 'Total anomalies: 0' in out and '200 points in 2 segment(s)' in out
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+from datetime import timezone
+
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import _interval_listing, analyze_intervals, main, parse_gpx_file
+from gpx_output import CsvWriter, JsonLinesWriter, format_for_path, interval_row_chunks
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+@pytest.fixture(scope='module')
+def result():
+    result = analyze_intervals(parse_gpx_file(DAY7))
+    result.filename = DAY7
+    return result
+
+
+def test_interval_csv_matches_analysis(result):
+    out = io.StringIO()
+    CsvWriter(out, 'intervals').write_result(result)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert len(rows) == len(result.intervals)
+
+    gaps = [row for row in rows if row['kind'] == 'large_gap']
+    assert len(gaps) == sum(a.anomaly_type.startswith('Large gap') for a in result.anomalies)
+    first = result.intervals[0]
+    start = first.from_waypoint.timestamp.astimezone(timezone.utc)
+    assert float(rows[0]['interval_seconds']) == first.interval_seconds
+    assert rows[0]['from_time'] == start.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def test_interval_rows_are_chunked(result):
+    chunks = list(interval_row_chunks(result, chunk_rows=1000))
+    assert [len(chunk) for chunk in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    assert sum(map(len, chunks)) == len(result.intervals)
+    assert chunks[1][0][1] == 1000 and chunks[0][-1][3] == chunks[1][0][2]
+
+
+def test_anomaly_json_lines(result):
+    out = io.StringIO()
+    JsonLinesWriter(out, 'anomalies').write_result(result)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['anomaly'] for r in records] == [a.anomaly_type for a in result.anomalies]
+    assert {r['kind'] for r in records} <= {'large_gap', 'short_interval', 'inconsistent'}
+
+
+def test_verbose_listing_matches_per_interval_format(result):
+    expected = ''.join(
+        f"{'[!]' if i.is_anomaly else '[ ]'} [{n}] {i.interval_seconds:.2f}s | "
+        f"{i.distance_meters:.1f}m | {i.speed_ms * 3.6:.1f} km/h\n"
+        for n, i in enumerate(result.intervals, 1)
+    )
+    assert ''.join(_interval_listing(result.intervals)) == expected
+    assert ''.join(_interval_listing(list(result.intervals))) == expected
+
+
+def test_cli_streams_json_lines_to_stdout(capsys):
+    main([str(EXAMPLES_DIR), '--format', 'jsonl', '--no-cache'])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(records) == 3
+    assert all(r['waypoints'] > 0 and r['anomaly_count'] >= 0 for r in records)
+
+
+def test_closed_stdout_ends_quietly():
+    analyzer = EXAMPLES_DIR.parent / 'tools' / 'gpx_analyzer.py'
+    process = subprocess.Popen(
+        [sys.executable, str(analyzer), str(EXAMPLES_DIR), '--format', 'jsonl', '--records', 'intervals',
+         '--no-cache'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    assert json.loads(process.stdout.readline())['index'] == 0
+    process.stdout.close()  # Like `| head -1`
+    _, errors = process.communicate(timeout=60)
+    assert process.returncode == 1 and b'Traceback' not in errors
+
+
+def test_format_follows_output_suffix():
+    assert format_for_path('report.jsonl') == 'jsonl'
+    assert format_for_path('report.CSV') == 'csv'
+    assert format_for_path('report.md') == format_for_path(None) == 'markdown'
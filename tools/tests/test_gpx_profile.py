@@ -0,0 +1,46 @@
+import pickle
+import time
+from types import SimpleNamespace
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import analyze_file
+from gpx_profile import FileProfile, ProfileReport
+
+
+def test_nested_stages_are_charged_exclusively():
+    profile = FileProfile('x.gpx')
+    slow_decode = profile.timed_call('decode', lambda: time.sleep(0.02))
+    with profile.stage('parse'):
+        slow_decode()
+        slow_decode()
+        buffer = bytearray(1 << 20)
+
+    parse, decode = profile.stages['parse'], profile.stages['decode']
+    assert decode.calls == 2 and decode.seconds >= 0.04
+    assert parse.calls == 1 and parse.seconds < decode.seconds
+    assert parse.peak >= len(buffer) and parse.retained >= len(buffer)
+    assert profile.total_seconds == parse.seconds + decode.seconds
+
+
+def args(**overrides):
+    values = dict(stream=False, no_cache=True, cache_dir=None, cache_size=None, profile=False,
+                  threshold=60, min_interval=0.5)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_analyze_file_profiles_only_when_asked():
+    path = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+    assert analyze_file(path, args()).profile is None
+
+    result = analyze_file(path, args(profile=True))
+    stages = result.profile.stages
+    assert result.profile.points == result.total_waypoints
+    assert all(stages[name].calls > 0 for name in ('read', 'parse', 'decode', 'analysis'))
+
+    restored = pickle.loads(pickle.dumps(result.profile))
+    report = ProfileReport()
+    report.add(restored)
+    report.add(result.profile)
+    assert report.totals['decode'].calls == 2 * stages['decode'].calls
+    assert report.to_dict()['files'][0]['points'] == result.total_waypoints
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_track_file, resample_main
+from gpx_resample import read_npz, resample
+from gpx_track import Track
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+def make_track(seconds, speed=None):
+    seconds = np.asarray(seconds, dtype=float)
+    return Track(
+        lat=46.0 + seconds * 1e-5,
+        lon=np.full(len(seconds), 9.8),
+        ele=2000.0 - seconds,
+        time_us=(seconds * 1e6).astype(np.int64),
+        speed=np.ma.MaskedArray(speed if speed is not None else np.zeros(len(seconds)), mask=speed is None)
+    )
+
+
+def test_linear_interpolation_on_an_aligned_grid():
+    resampled = resample(make_track([0.5, 2.5, 6.5]), interval_s=1.0)
+    assert resampled.start_us == 1_000_000 and len(resampled) == 6
+    assert resampled.valid.all()
+    assert np.allclose(resampled.ele, 2000.0 - np.arange(1, 7))
+    assert np.allclose(resampled.lat, 46.0 + np.arange(1, 7) * 1e-5)
+    # Derived speed is the speed over the recorded interval
+    assert np.allclose(resampled.speed, resampled.speed[0]) and resampled.speed[0] > 0
+
+
+def test_gaps_over_the_threshold_are_not_interpolated():
+    resampled = resample(make_track([0, 10, 20, 500, 510]), interval_s=5.0, max_gap_s=120)
+    time_s = resampled.time_us // 1_000_000
+    inside_gap = (time_s > 20) & (time_s < 500)
+    assert not resampled.valid[inside_gap].any() and resampled.valid[~inside_gap].all()
+    assert np.isnan(resampled.lat[inside_gap]).all() and np.isnan(resampled.speed[inside_gap]).all()
+    # The recorded points at both ends of the gap are kept
+    assert resampled.lat[time_s == 20] == pytest.approx(46.0 + 20e-5)
+    assert resampled.gap_samples == int(inside_gap.sum())
+
+
+def test_recorded_speeds_are_interpolated():
+    resampled = resample(make_track([0, 4], speed=np.array([2.0, 6.0])), interval_s=1.0)
+    assert np.allclose(resampled.speed, [2.0, 3.0, 4.0, 5.0, 6.0])
+
+
+def test_recorded_points_on_the_grid_are_reproduced():
+    track = parse_track_file(DAY7)
+    resampled = resample(track, interval_s=1.0, max_gap_s=1e9)
+    on_grid = np.isin(resampled.time_us, track.time_us)
+    assert resampled.valid.all() and on_grid.any()
+    recorded = np.searchsorted(track.time_us, resampled.time_us[on_grid])
+    assert np.allclose(resampled.lat[on_grid], track.lat[recorded])
+    assert np.allclose(resampled.ele[on_grid], track.ele[recorded])
+
+
+def test_cli_writes_fixed_stride_arrays(tmp_path, capsys):
+    resample_main([DAY7, '--interval', '5', '-o', str(tmp_path), '--no-cache'])
+    grid = read_npz(str(tmp_path / 'Day_7_2024-2025.npz'))
+    expected = resample(parse_track_file(DAY7), interval_s=5.0)
+    assert grid.interval_us == 5_000_000 and grid.start_us == expected.start_us
+    assert np.array_equal(grid.valid, expected.valid)
+    assert np.array_equal(grid.lat, expected.lat, equal_nan=True)
+    assert f'{len(expected)} samples every 5s' in capsys.readouterr().out
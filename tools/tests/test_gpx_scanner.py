@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import TimestampDecoder, iter_gpx_points, parse_gpx_file
+from gpx_benchmark import generate_ski_track
+from gpx_scanner import decode_iso_times, detect_writer, scan_gpx_file
+from gpx_track import Track
+from gpx_writer import write_gpx
+
+
+def xml_track(path):
+    decoder = TimestampDecoder()
+    track = Track.from_rows(iter_gpx_points(str(path), decoder))
+    track.tz = decoder.tz
+    return track
+
+
+def assert_same_track(scanned, parsed):
+    for column in ('lat', 'lon', 'ele', 'time_us'):
+        assert np.array_equal(getattr(scanned, column), getattr(parsed, column)), column
+    for column in ('accuracy', 'speed'):
+        assert np.array_equal(getattr(scanned, column).mask, getattr(parsed, column).mask), column
+        assert np.array_equal(getattr(scanned, column).filled(0), getattr(parsed, column).filled(0)), column
+    assert scanned.tz == parsed.tz
+
+
+@pytest.mark.parametrize('name', ['Day_5_2024-2025.gpx', 'Day_7_2024-2025.gpx'])
+def test_ski_tracks_scan_matches_xml_parse(name):
+    path = EXAMPLES_DIR / name
+    scanned = scan_gpx_file(str(path))
+    assert scanned is not None
+    assert_same_track(scanned, xml_track(path))
+
+
+def test_gpx_writer_scan_matches_xml_parse(tmp_path):
+    track = generate_ski_track(5_000)
+    track.accuracy[::7] = np.ma.masked  # points written without <extensions>
+    path = tmp_path / 'recorded.gpx'
+    write_gpx(track, str(path), 'recorded')
+    scanned = scan_gpx_file(str(path))
+    assert scanned is not None and scanned.accuracy.mask.sum() == len(track.accuracy[::7])
+    assert_same_track(scanned, xml_track(path))
+
+
+@pytest.mark.parametrize('edit', [
+    lambda text: text.replace('Ski Tracks - Android (685)', 'Some Other App'),
+    lambda text: text.replace('<trkseg>', '<trkseg><!-- <trkpt lat="0" lon="0"> -->', 1),
+    # A whole commented-out trkpt before the first real one
+    lambda text: text.replace('<trkseg>', '<trkseg><!-- <trkpt lat="0" lon="0"><ele>1</ele>'
+                              '<time>2025-03-28T20:35:06.000+01:00</time></trkpt> -->', 1),
+    lambda text: text.replace('<trkseg>', '<trkseg><![CDATA[ <trkpt lat="0" lon="0"></trkpt> ]]>', 1),
+    lambda text: text.replace('</time></trkpt>', '</time><speed>3.5</speed></trkpt>', 1),
+    lambda text: text.replace('<time>2025-03-28T20:35:07.000+01:00</time>', '', 1),
+])
+def test_unvouched_files_fall_back_to_xml(tmp_path, edit):
+    path = tmp_path / 'edited.gpx'
+    path.write_text(edit((EXAMPLES_DIR / 'Day_7_2024-2025.gpx').read_text()))
+    assert scan_gpx_file(str(path)) is None
+    assert_same_track(parse_gpx_file(str(path)), xml_track(path).sorted())
+
+
+def test_truncated_file_is_still_an_error(tmp_path):
+    path = tmp_path / 'truncated.gpx'
+    path.write_bytes((EXAMPLES_DIR / 'Day_7_2024-2025.gpx').read_bytes()[:100_000])
+    assert scan_gpx_file(str(path)) is None
+    with pytest.raises(ValueError):
+        parse_gpx_file(str(path))
+
+
+def test_timestamp_layouts_decode_like_timestamp_decoder():
+    values = ['2024-02-29T23:59:59.5-03:30', '2025-01-15T08:30:00Z', '2025-01-15T08:30:00.250Z',
+              '2025-03-28T20:35:07.123456+0100', '2025-03-30T01:00:00+02:00']
+    decoded = decode_iso_times(np.array([value.encode() for value in values]))
+    assert decoded is not None
+    time_us, tz = decoded
+    decoder = TimestampDecoder()
+    assert time_us.tolist() == [decoder.decode_us(value) for value in values]
+    assert tz.utcoffset(None).total_seconds() == -(3 * 3600 + 1800)
+    assert decode_iso_times(np.array([b'2025-02-29T10:00:00Z'])) is None
+
+
+def test_writer_detection_needs_the_gpx_namespace():
+    header = b'<gpx version="1.1" creator="Ski GPX Recorder" xmlns="http://www.topografix.com/GPX/1/1">'
+    assert detect_writer(header).name == 'GpxWriter'
+    assert detect_writer(header.replace(b'GPX/1/1', b'GPX/1/0')) is None
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import SERVE_OPERATIONS, _serve_request, analyze_intervals, parse_track_file
+from gpx_server import AnalysisServer, LruCache
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+def make_server(calls):
+    def handler(operation, filepath, params, track):
+        calls.append((operation, params, track is not None))
+        return _serve_request(None, operation, filepath, params, track)
+    return AnalysisServer(handler, SERVE_OPERATIONS, partial(ThreadPoolExecutor, 2))
+
+
+async def http_get(port, *targets):
+    """GET each target over one keep-alive connection; returns [(status, json)]."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for target in targets:
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b'\r\n':
+            name, _, value = line.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        responses.append((status, json.loads(await reader.readexactly(int(headers['content-length'])))))
+    writer.close()
+    return responses
+
+
+def test_repeat_queries_come_from_memory():
+    calls = []
+
+    async def scenario():
+        server = make_server(calls)
+        first = json.loads(await server.answer('analyze', {'path': DAY7}))
+        again = json.loads(await server.answer('analyze', {'path': DAY7, 'threshold': '120'}))
+        other = json.loads(await server.answer('analyze', {'path': DAY7, 'threshold': 60}))
+        return first, again, other
+
+    first, again, other = asyncio.run(scenario())
+    expected = analyze_intervals(parse_track_file(DAY7), anomaly_threshold_seconds=60)
+    assert first == again and first['waypoints'] == 4433
+    assert other['anomaly_count'] == expected.statistics['anomaly_count'] == len(other['anomalies'])
+    # The second threshold reuses the parsed track held in memory
+    assert calls == [('analyze', {'threshold': 120.0, 'min_interval': 0.5}, False),
+                     ('analyze', {'threshold': 60.0, 'min_interval': 0.5}, True)]
+
+
+def test_concurrent_requests_share_one_computation():
+    calls = []
+
+    async def scenario():
+        server = make_server(calls)
+        answers = await asyncio.gather(*(server.answer('stats', {'path': DAY7}) for _ in range(5)))
+        return answers, server.status()
+
+    answers, status = asyncio.run(scenario())
+    assert len(set(answers)) == 1 and len(calls) == 1
+    assert status['computed'] == 1 and status['pending'] == 0
+
+
+def test_http_requests_and_errors():
+    async def scenario():
+        server = make_server([])
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await http_get(port, f'/stats?path={DAY7}', '/stats?path=/missing.gpx',
+                                  f'/analyze?path={DAY7}&threshold=soon', f'/runs?path={DAY7}', '/status')
+
+    (ok, stats), (missing, _), (invalid, error), (unknown, _), (_, status) = asyncio.run(scenario())
+    assert ok == 200 and stats['run_count'] == 8
+    assert (missing, invalid, unknown) == (404, 400, 404)
+    assert 'threshold' in error['error']
+    assert status['requests'] == 5 and status['computed'] == 1
+
+
+def test_unix_socket_line_protocol(tmp_path):
+    socket_path = str(tmp_path / 'serve.sock')
+
+    async def scenario():
+        server = make_server([])
+        async with await server.start(socket_path=socket_path):
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(json.dumps({'op': 'analyze', 'path': DAY7, 'min_interval': 1}).encode() + b'\n')
+            writer.write(b'not json\n')
+            lines = [json.loads(await reader.readline()) for _ in range(2)]
+            writer.close()
+            return lines
+
+    analysis, error = asyncio.run(scenario())
+    assert analysis['file'] == os.path.abspath(DAY7) and 'anomalies' in analysis
+    assert 'error' in error
+
+
+def test_lru_cache_is_bounded_in_bytes():
+    cache = LruCache(10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.get('a')
+    cache.put('c', b'1234')
+    cache.put('huge', b'x' * 11)
+    assert list(cache.entries) == ['a', 'c'] and cache.bytes == 8
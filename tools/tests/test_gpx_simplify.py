@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_track_file, simplify_main
+from gpx_simplify import (
+    build_pyramid, douglas_peucker_ranks, max_deviation, project, read_pyramid, segment_distance,
+    simplify, visvalingam_ranks, write_pyramid,
+)
+
+DAY5 = str(EXAMPLES_DIR / 'Day_5_2024-2025.gpx')
+
+
+@pytest.fixture(scope='module')
+def track():
+    return parse_track_file(DAY5)
+
+
+def recursive_dp(x, y, first, last, tolerance, keep):
+    if last - first < 2:
+        return
+    inner = np.arange(first + 1, last)
+    distance = segment_distance(x[inner], y[inner], x[first], y[first], x[last], y[last])
+    farthest = int(np.argmax(distance))
+    if distance[farthest] > tolerance:
+        split = inner[farthest]
+        keep.add(split)
+        recursive_dp(x, y, first, split, tolerance, keep)
+        recursive_dp(x, y, split, last, tolerance, keep)
+
+
+def test_dp_ranks_match_recursive_douglas_peucker():
+    rng = np.random.default_rng(7)
+    x, y = np.cumsum(rng.normal(size=(2, 400)), axis=1)
+    ranks = douglas_peucker_ranks(x, y)
+    for tolerance in (0.5, 2.0, 8.0):
+        keep = {0, len(x) - 1}
+        recursive_dp(x, y, 0, len(x) - 1, tolerance, keep)
+        assert set(np.flatnonzero(ranks > tolerance)) == keep
+
+
+def stationary_walk():
+    rng = np.random.default_rng(11)
+    x, y = np.cumsum(rng.normal(size=(2, 3000)), axis=1)
+    x[1000:2500], y[1000:2500] = x[1000], y[1000]
+    return x, y
+
+
+def test_dp_ranks_a_stationary_stretch_at_once():
+    x, y = stationary_walk()
+    ranks = douglas_peucker_ranks(x, y)
+    assert np.count_nonzero(ranks[1001:2499]) <= 2
+    for tolerance in (0.5, 4.0):
+        keep = {0, len(x) - 1}
+        recursive_dp(x, y, 0, len(x) - 1, tolerance, keep)
+        assert set(np.flatnonzero(ranks > tolerance)) == keep
+
+
+def test_vw_removes_equal_areas_in_bulk():
+    x, y = stationary_walk()
+    ranks = visvalingam_ranks(x, y)
+    assert np.isfinite(ranks[1:-1]).all()
+    # Zero areas are the smallest: most of the stationary stretch goes before any point of the walk
+    assert np.count_nonzero(ranks[1000:2500] == 0) > 1000
+    still = visvalingam_ranks(np.zeros(20_000), np.zeros(20_000))
+    assert np.isinf(still[[0, -1]]).all() and not still[1:-1].any()
+
+
+def test_simplify_stays_within_tolerance(track):
+    x, y = project(track)
+    simplified = simplify(track, 5.0)
+    keep = np.flatnonzero(np.isin(track.time_us, simplified.time_us))
+    assert len(simplified) < len(track) / 5
+    assert max_deviation(x, y, keep) <= 5.0
+
+
+def test_vw_keeps_endpoints(track):
+    ranks = visvalingam_ranks(*project(track))
+    assert np.isinf(ranks[[0, -1]]).all()
+    assert np.isfinite(ranks[1:-1]).all()
+
+
+@pytest.mark.parametrize('method', ['dp', 'vw'])
+def test_pyramid_levels(track, method):
+    levels = build_pyramid(track, (1.0, 0.1, 0.01), method)
+    assert [len(level.track) for level in levels] == [len(track), -(-len(track) // 10), -(-len(track) // 100)]
+    assert levels[0].max_error_m == 0.0
+    assert levels[1].max_error_m < levels[2].max_error_m
+
+    bounded = build_pyramid(track, (0.01,), method, max_error_m=10.0)[0]
+    assert bounded.max_error_m <= 10.0 and len(bounded.track) > len(levels[2].track)
+
+
+def test_binary_pyramid_round_trip(track, tmp_path):
+    levels = build_pyramid(track, (0.5, 0.05))
+    path = str(tmp_path / 'day5.lod')
+    write_pyramid(levels, path)
+    loaded = read_pyramid(path)
+    assert [(level.fraction, level.max_error_m) for level in loaded] == \
+        [(level.fraction, level.max_error_m) for level in levels]
+    assert np.array_equal(loaded[1].track.lat, levels[1].track.lat)
+    assert np.array_equal(loaded[1].track.time_us, levels[1].track.time_us)
+
+
+def test_cli_writes_gpx_levels(tmp_path, capsys):
+    simplify_main([DAY5, '--levels', '0.1', '-o', str(tmp_path), '--no-cache'])
+    written = tmp_path / 'Day_5_2024-2025.lod10.gpx'
+    assert written.exists()
+    assert len(parse_track_file(str(written))) == -(-len(parse_track_file(DAY5)) // 10)
+    assert 'lod10.gpx' in capsys.readouterr().out
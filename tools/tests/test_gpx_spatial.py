@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_gpx_file, spatial_main
+from gpx_spatial import BoundingBox, Circle, parse_area, passes, query_points, read_header_bounds
+from gpx_track import haversine_distance
+
+DAY7 = str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx')
+
+
+@pytest.fixture(scope='module')
+def day7():
+    return parse_gpx_file(DAY7)
+
+
+@pytest.mark.parametrize('area', [
+    BoundingBox(46.440, 9.810, 46.446, 9.816),
+    BoundingBox(46.4, 9.7, 46.5, 9.9),
+    BoundingBox(0, 0, 1, 1),
+    Circle(46.4297, 9.8112, 150),
+    Circle(46.445, 9.815, 1),
+])
+def test_query_matches_brute_force(day7, area):
+    if isinstance(area, Circle):
+        expected = np.flatnonzero(haversine_distance(day7.lat, day7.lon, area.lat, area.lon) <= area.radius_m)
+    else:
+        expected = np.flatnonzero(area.contains(day7.lat, day7.lon))
+    assert np.array_equal(query_points(area, day7.lat, day7.lon), expected)
+
+
+def test_circle_bounds_cover_the_circle():
+    circle = Circle(46.0, 9.0, 1000)
+    box = circle.bounds
+    for bearing in np.linspace(0, 2 * np.pi, 16):
+        lat = 46.0 + np.degrees(999 / 6371000 * np.cos(bearing))
+        lon = 9.0 + np.degrees(999 / 6371000 * np.sin(bearing)) / np.cos(np.radians(lat))
+        assert box.contains(np.array([lat]), np.array([lon]))[0]
+
+
+def test_header_bounds(tmp_path, day7):
+    # Ski Tracks writes a maxlat below the track's northernmost point; it is not trusted
+    bounds = read_header_bounds(DAY7)
+    assert bounds == BoundingBox(46.42970045, 9.81123093, 90.0, 9.82398941)
+    assert bounds.contains(day7.lat, day7.lon).all()
+
+    other = tmp_path / 'other.gpx'
+    other.write_text('<?xml version="1.0"?>\n<gpx creator="SomeApp" version="1.1"><metadata>'
+                     "<bounds minlon='1' minlat='2' maxlon='3' maxlat='4'/></metadata><trk><trkseg>"
+                     '<trkpt lat="2.5" lon="1.5"><time>2025-01-01T00:00:00Z</time></trkpt></trkseg></trk></gpx>')
+    assert read_header_bounds(str(other)) == BoundingBox(2, 1, 4, 3)
+    other.write_text('<gpx><trk><trkseg><trkpt lat="1" lon="1"><bounds minlat="0"/></trkpt></trkseg></trk></gpx>')
+    assert read_header_bounds(str(other)) is None
+
+
+def test_passes_split_on_time_gaps():
+    time_us = np.arange(10) * 10_000_000
+    time_us[6:] += 300_000_000
+    assert passes(np.array([1, 2, 3, 6, 7, 9]), time_us, max_gap_seconds=15) == [(1, 3), (6, 7), (9, 9)]
+    assert passes(np.array([], dtype=np.int64), time_us) == []
+
+
+def test_cli_prunes_by_header_bounds(capsys):
+    spatial_main([str(EXAMPLES_DIR), '--bbox', '46.440,9.810,46.446,9.816', '--no-cache'])
+    out = capsys.readouterr().out
+    assert '1 pruned by header bounds' in out
+    assert 'Day_7_2024-2025.gpx' in out and 'Day_5_2024-2025.gpx' not in out
+    assert 'Sessions matched: 2/3' in out
+
+    with pytest.raises(ValueError):
+        parse_area('bbox', '1,2,0,3')
@@ -0,0 +1,57 @@
+import random
+import statistics
+
+import pytest
+
+from gpx_stats import AnomalyRetention, P2Quantile, RunningStats
+
+
+def test_running_stats_matches_statistics_module():
+    rng = random.Random(7)
+    values = [rng.expovariate(0.5) for _ in range(5000)]
+    stats = RunningStats()
+    for value in values:
+        stats.add(value)
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.stdev == pytest.approx(statistics.stdev(values))
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_running_stats_merge_equals_single_pass():
+    values = [float(v) for v in range(1, 101)]
+    left, right, whole = RunningStats(), RunningStats(), RunningStats()
+    for value in values[:37]:
+        left.add(value)
+    for value in values[37:]:
+        right.add(value)
+    for value in values:
+        whole.add(value)
+    left.merge(right)
+    assert left.count == whole.count
+    assert left.mean == pytest.approx(whole.mean)
+    assert left.variance == pytest.approx(whole.variance)
+
+
+def test_p2_quantile_estimates_median():
+    rng = random.Random(3)
+    values = [rng.gauss(10, 2) for _ in range(20000)]
+    sketch = P2Quantile(0.5)
+    for value in values:
+        sketch.add(value)
+    assert sketch.value == pytest.approx(statistics.median(values), abs=0.05)
+
+
+def test_p2_quantile_is_exact_for_few_values():
+    sketch = P2Quantile(0.5)
+    for value in (4.0, 1.0, 3.0, 2.0):
+        sketch.add(value)
+    assert sketch.value == 2.5
+
+
+@pytest.mark.parametrize('policy, expected', [('first', ['a', 'b']), ('worst', ['b', 'd'])])
+def test_anomaly_retention_policies(policy, expected):
+    retention = AnomalyRetention(limit=2, policy=policy)
+    for severity, item in ((1.0, 'a'), (5.0, 'b'), (2.0, 'c'), (9.0, 'd')):
+        retention.offer(severity, item)
+    assert retention.items() == expected
+    assert retention.dropped == 2
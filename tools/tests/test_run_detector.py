@@ -0,0 +1,138 @@
+"""
+Ports of the app's RunDetectorTest.kt fixtures, plus checks that the
+cumulative-sum smoothing kernels match StatsCalculator's per-point loops.
+"""
+
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_gpx_file
+from gpx_track import Track, haversine_distance
+from run_detector import RUN_DETECTION_MIN_DURATION, RUN_DETECTION_MIN_VERTICAL, detect_runs
+from stats_calculator import SPEED_SMOOTHING_WINDOW, point_speeds, smooth_elevations, smooth_speeds
+
+
+def make_track(points):
+    """Track and raw speeds from (lat, lon, elevation, timestamp_ms, speed) tuples (createPoint)."""
+    lat, lon, ele, time_ms, speed = (np.array(column) for column in zip(*points))
+    track = Track(lat=lat, lon=lon, ele=ele, time_us=time_ms.astype(np.int64) * 1000)
+    return track, speed.astype(np.float32)
+
+
+def run_duration(run) -> int:
+    return (run.end_time - run.start_time) // 1000
+
+
+def descent(start, stop, top, lat0=46.0, step=0.0001, drop=2.0):
+    return [(lat0 + i * step, 7.0, top - (i - start) * drop, i * 1000, 10.0) for i in range(start, stop)]
+
+
+def test_empty_track_has_no_runs():
+    assert detect_runs(Track.empty()) == []
+
+
+def test_track_below_trend_window_has_no_runs():
+    track, speeds = make_track([(0.0, 0.0, 100.0 - i * 5.0, i * 1000, 10.0) for i in range(10)])
+    assert detect_runs(track, raw_speeds=speeds) == []
+
+
+def test_detects_simple_descent():
+    track, speeds = make_track([
+        (46.0 + i * 0.0001, 7.0 + i * 0.0001, 2000.0 - i * 2.0, i * 1000, 10.0) for i in range(120)
+    ])
+    runs = detect_runs(track, raw_speeds=speeds)
+    assert runs
+    assert run_duration(runs[0]) >= 60
+    assert runs[0].vertical_drop >= 30
+
+
+def test_filters_runs_shorter_than_min_duration():
+    track, speeds = make_track([(i * 0.00001, 0.0, 1000.0 - i * 1.7, i * 1000, 10.0) for i in range(30)])
+    assert detect_runs(track, raw_speeds=speeds) == []
+
+
+def test_filters_runs_with_little_vertical():
+    track, speeds = make_track([(i * 0.00001, 0.0, 1000.0 - i * 0.17, i * 1000, 10.0) for i in range(120)])
+    assert detect_runs(track, raw_speeds=speeds) == []
+
+
+def test_combines_segments_with_short_gaps():
+    gap = [(46.0 + i * 0.0001, 7.0, 1880.0 + (i - 60) * 0.5, i * 1000, 3.0) for i in range(60, 120)]
+    track, speeds = make_track(descent(0, 60, 2000.0) + gap + descent(120, 180, 1910.0))
+    runs = detect_runs(track, raw_speeds=speeds)
+    assert len(runs) == 1
+    assert runs[0].vertical_drop >= 100
+
+
+def test_does_not_combine_segments_with_large_gaps():
+    gap = [(46.0 + i * 0.0001, 7.0, 1880.0, i * 1000, 2.0) for i in range(60, 210)]
+    track, speeds = make_track(descent(0, 60, 2000.0) + gap + descent(210, 270, 1880.0))
+    assert len(detect_runs(track, raw_speeds=speeds)) == 2
+
+
+def test_runs_around_ascent_gap_meet_thresholds():
+    gap = [(46.0 + i * 0.0001, 7.0, 1880.0 + (i - 60) * 1.33, i * 1000, 2.0) for i in range(60, 120)]
+    track, speeds = make_track(descent(0, 60, 2000.0) + gap + descent(120, 180, 1880.0 + 60 * 1.33))
+    for run in detect_runs(track, raw_speeds=speeds):
+        assert run_duration(run) >= 60
+        assert run.vertical_drop >= 30
+
+
+def test_incremental_detection_skips_combination():
+    gap = [(46.0 + i * 0.0001, 7.0, 1880.0, i * 1000, 3.0) for i in range(60, 120)]
+    track, speeds = make_track(descent(0, 60, 2000.0) + gap + descent(120, 180, 1880.0))
+    assert detect_runs(track, combine=False, raw_speeds=speeds)
+    assert detect_runs(track, raw_speeds=speeds)
+
+
+@pytest.mark.parametrize('name', ['Day_7_2024-2025.gpx', 'Day_9_2024-2025.gpx'])
+def test_example_day_has_reasonable_run_count(name):
+    runs = detect_runs(parse_gpx_file(str(EXAMPLES_DIR / name)))
+    assert 5 <= len(runs) <= 20
+    for number, run in enumerate(runs, 1):
+        assert run.run_number == number
+        assert run_duration(run) >= RUN_DETECTION_MIN_DURATION
+        assert run.vertical_drop >= RUN_DETECTION_MIN_VERTICAL
+
+
+# StatsCalculator.smoothSpeeds / smoothElevations, loop for loop
+
+def reference_smooth_speeds(track, raw_speeds):
+    n = len(track)
+    time_ms = track.time_us // 1000
+    smoothed = []
+    for i in range(n):
+        start = max(i - SPEED_SMOOTHING_WINDOW // 2, 0)
+        end = min(i + SPEED_SMOOTHING_WINDOW // 2 + 1, n)
+        distance, elapsed = 0.0, 0
+        for j in range(start, end - 1):
+            distance += haversine_distance(track.lat[j], track.lon[j], track.lat[j + 1], track.lon[j + 1])
+            elapsed += int(time_ms[j + 1] - time_ms[j])
+        smoothed.append(np.float32(distance / (elapsed / 1000.0) * 3.6) if elapsed > 0 else raw_speeds[i])
+    return np.array(smoothed, dtype=np.float32)
+
+
+def reference_smooth_elevations(track, window_size):
+    n = len(track)
+    return np.array([
+        np.float32(np.mean(track.ele[max(i - window_size // 2, 0):min(i + window_size // 2 + 1, n)]))
+        for i in range(n)
+    ], dtype=np.float32)
+
+
+@pytest.fixture(scope='module')
+def day7():
+    return parse_gpx_file(str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx'))
+
+
+def test_smooth_speeds_matches_windowed_loop(day7):
+    raw_speeds = point_speeds(day7)
+    np.testing.assert_allclose(smooth_speeds(day7, raw_speeds), reference_smooth_speeds(day7, raw_speeds),
+                               rtol=1e-6, atol=1e-4)
+
+
+@pytest.mark.parametrize('window_size', [1, 5, 20])
+def test_smooth_elevations_matches_windowed_loop(day7, window_size):
+    np.testing.assert_allclose(smooth_elevations(day7, window_size),
+                               reference_smooth_elevations(day7, window_size), rtol=1e-6)
@@ -0,0 +1,107 @@
+"""Array session statistics against a point-by-point port of SessionAnalyzer.calculateSessionStats."""
+
+import numpy as np
+import pytest
+
+from conftest import EXAMPLES_DIR
+from gpx_analyzer import parse_gpx_file
+from gpx_track import Track, haversine_distance
+from run_detector import detect_runs
+from session_analyzer import calculate_session_stats, speed_distribution
+from stats_calculator import average_descent_slope, point_speeds, segment_slopes
+
+
+def reference_session_stats(track, speeds, runs):
+    f32 = np.float32
+    distance = ascent = descent = max_speed = total_speed = f32(0)
+    speed_count = 0
+    times = {'moving': 0, 'stationary': 0, 'ascending': 0, 'descending': 0}
+    time_ms = track.time_us // 1000
+    for i in range(1, len(track)):
+        distance += f32(haversine_distance(track.lat[i - 1], track.lon[i - 1], track.lat[i], track.lon[i]))
+        elevation_delta = f32(track.ele[i] - track.ele[i - 1])
+        if elevation_delta > 0:
+            ascent += elevation_delta
+        else:
+            descent += abs(elevation_delta)
+        if speeds[i] > max_speed:
+            max_speed = speeds[i]
+        if speeds[i] > 0:
+            total_speed += speeds[i]
+            speed_count += 1
+
+        seconds = int(time_ms[i] - time_ms[i - 1]) // 1000
+        rate = (track.ele[i] - track.ele[i - 1]) / seconds if seconds > 0 else 0.0
+        if speeds[i] < 3.0:
+            times['stationary'] += seconds
+        elif rate > 1.0:
+            times['ascending'] += seconds
+        elif rate < -1.0:
+            times['descending'] += seconds
+        else:
+            times['moving'] += seconds
+
+    buckets = [0] * 6
+    for speed in speeds:
+        buckets[next((b for b, edge in enumerate((10, 20, 30, 40, 50)) if speed < edge), 5)] += 1
+
+    return {
+        'total_distance': float(distance),
+        'total_ascent': float(ascent),
+        'total_descent': float(descent),
+        'max_speed': float(max_speed),
+        'avg_speed': float(total_speed / f32(speed_count)),
+        'moving_time': times['moving'],
+        'stationary_time': times['stationary'],
+        'ascending_time': times['ascending'],
+        'descending_time': times['descending'],
+        'speed_distribution': buckets,
+        'run_count': len(runs),
+    }
+
+
+@pytest.fixture(scope='module')
+def day7():
+    return parse_gpx_file(str(EXAMPLES_DIR / 'Day_7_2024-2025.gpx'))
+
+
+def test_session_stats_match_point_loop(day7):
+    speeds = point_speeds(day7)
+    runs = detect_runs(day7)
+    stats = calculate_session_stats(day7, runs, speeds).to_dict()
+    expected = reference_session_stats(day7, speeds, runs)
+    for name, value in expected.items():
+        assert stats[name] == pytest.approx(value, rel=1e-6), name
+    assert sum(stats['speed_distribution']) == len(day7)
+    assert stats['total_duration'] == int(day7.duration_seconds)
+    assert 0 < stats['performance_score'] <= 100
+
+
+def test_speed_distribution_bucket_edges():
+    speeds = np.array([0, 9.999, 10, 19.99, 20, 35, 49.999, 50, 120], dtype=np.float32)
+    assert speed_distribution(speeds) == [2, 2, 1, 1, 1, 2]
+
+
+def test_empty_session():
+    stats = calculate_session_stats(Track.empty())
+    assert stats.total_distance == 0
+    assert stats.speed_distribution == [0] * 6
+
+
+def test_segment_slopes_match_point_formula(day7):
+    slopes = segment_slopes(day7)
+    for i in range(0, len(slopes), 89):
+        distance = haversine_distance(day7.lat[i], day7.lon[i], day7.lat[i + 1], day7.lon[i + 1])
+        expected = 0.0 if distance == 0 else (day7.ele[i + 1] - day7.ele[i]) / distance * 100
+        assert slopes[i] == pytest.approx(np.float32(expected), rel=1e-6, abs=1e-6)
+
+
+def test_average_descent_slope(day7):
+    drop = distance = 0.0
+    for i in range(1, len(day7)):
+        step = haversine_distance(day7.lat[i - 1], day7.lon[i - 1], day7.lat[i], day7.lon[i])
+        if step > 0 and day7.ele[i] < day7.ele[i - 1]:
+            drop += day7.ele[i - 1] - day7.ele[i]
+            distance += step
+    assert average_descent_slope(day7) == pytest.approx(drop / distance * 100, rel=1e-5)
+    assert average_descent_slope(Track.empty()) == 0